@@ -3,6 +3,9 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from tortoise import Tortoise
 
+from app.controllers.dy_cookie import dy_cookie_controller
+from app.controllers.dy_job import dy_job_controller
+from app.controllers.dy_tracked import dy_tracked_controller
 from app.core.exceptions import SettingNotFound
 from app.core.init_app import (
     init_data,
@@ -10,6 +13,8 @@ from app.core.init_app import (
     register_exceptions,
     register_routers,
 )
+from app.spiders.client import http_clients
+from app.spiders.dy_comments_claw.signer import signer
 
 try:
     from app.settings.config import settings
@@ -20,7 +25,16 @@ except ImportError:
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_data()
+    http_clients.get()
+    await dy_cookie_controller.start_sync()
+    await dy_job_controller.start_workers()
+    await dy_tracked_controller.start_scheduler()
     yield
+    await dy_tracked_controller.stop_scheduler()
+    await dy_job_controller.stop_workers()
+    await dy_cookie_controller.stop_sync()
+    await http_clients.aclose()
+    await signer.aclose()
     await Tortoise.close_connections()
 
 
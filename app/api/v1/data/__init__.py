@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 
-from .data import router
+from .data import router, ws_router
 
 data_router = APIRouter()
 data_router.include_router(router, tags=["数据模块"])
+data_ws_router = APIRouter()
+data_ws_router.include_router(ws_router, tags=["数据模块"])
 
-__all__ = ["data_router"]
+__all__ = ["data_router", "data_ws_router"]
@@ -1,24 +1,231 @@
-from fastapi import APIRouter, Query, Body
+import asyncio
+import json
+from datetime import datetime
 
-from app.schemas import Success
+from fastapi import APIRouter, Query, Body, HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from tortoise.expressions import Q
+
+from app.schemas import Fail, Success, SuccessExtra
 
 # from app.controllers.dept import dept_controller
 # from app.schemas import Success
 # from app.schemas.depts import *
 from app.controllers.dy import dy_controller
-from app.schemas.dyVideo import claw_video_dy, ClawCommentsDySchemas
+from app.controllers.dy_cookie import dy_cookie_controller
+from app.controllers.dy_job import dy_job_controller
+from app.controllers.dy_resolver import dy_resolver_controller
+from app.controllers.dy_tracked import dy_tracked_controller
+from app.core.dependency import AuthControl, PermissionControl
+from app.core.progress import progress_broker
+from app.models.enums import CrawlJobStatus, CrawlJobType
+from app.schemas.dyVideo import (
+    AddDyCookiesSchemas,
+    claw_video_dy,
+    ClawCommentsDySchemas,
+    ResolveDyUserSchemas,
+    TrackDyCreatorsSchemas,
+)
+from app.settings import settings
+from app.spiders.cookie_pool import cookie_pool
+from app.spiders.metrics import metrics
+from app.spiders.rate_limiter import rate_limiters
+from app.spiders.retry import circuit_breakers
 
 router = APIRouter()
+# WebSocket 无法携带 token 请求头, 不经过 DependPermisson, 在接口内按 query 中的 token 鉴权
+ws_router = APIRouter()
+
+PROGRESS_HEARTBEAT = 15
+NO_COOKIE_MSG = "未提供cookie, cookie池中也没有可用账号"
 
 
 @router.post("/crawl/dy/video", summary="爬取抖音视频数据")
 # 获取 urls 入参：['','']
 async def list_dept(data: claw_video_dy):
-    await dy_controller.run_video_task(data.urls, data.cookie)
-    return Success(msg="Created Successfully")
+    if not data.cookie and not await dy_cookie_controller.has_accounts():
+        return Fail(msg=NO_COOKIE_MSG)
+    # 只创建后台任务, 通过 /crawl/jobs/get 查询进度和结果
+    job = await dy_job_controller.enqueue(CrawlJobType.VIDEO, data.model_dump(exclude={"cookie"}), data.cookie)
+    return Success(msg="Created Successfully", data={"job_id": job.id})
 
 
 @router.post("/crawl/dy/comments", summary="爬取抖音视频的评论")
 async def list_dept(data: ClawCommentsDySchemas):
-    await dy_controller.run_comments_task(data.video_ids, data.cookie)
-    return Success(msg="Created Successfully")
+    if not data.cookie and not await dy_cookie_controller.has_accounts():
+        return Fail(msg=NO_COOKIE_MSG)
+    job = await dy_job_controller.enqueue(CrawlJobType.COMMENTS, data.model_dump(exclude={"cookie"}), data.cookie)
+    return Success(msg="Created Successfully", data={"job_id": job.id})
+
+
+@router.get("/crawl/jobs/list", summary="查看爬取任务列表")
+async def list_crawl_jobs(
+    page: int = Query(1, description="页码"),
+    page_size: int = Query(10, description="每页数量"),
+    status: CrawlJobStatus = Query(None, description="任务状态"),
+    job_type: CrawlJobType = Query(None, description="任务类型"),
+):
+    q = Q()
+    if status:
+        q &= Q(status=status)
+    if job_type:
+        q &= Q(job_type=job_type)
+    total, jobs = await dy_job_controller.list(page=page, page_size=page_size, search=q, order=["-id"])
+    # 列表不返回 cookie 和每个目标的详细结果
+    data = [await job.to_dict(exclude_fields=["cookie", "result"]) for job in jobs]
+    return SuccessExtra(data=data, total=total, page=page, page_size=page_size)
+
+
+@router.get("/crawl/jobs/get", summary="查看爬取任务")
+async def get_crawl_job(job_id: int = Query(..., description="任务id")):
+    job = await dy_job_controller.get(id=job_id)
+    return Success(data=await job.to_dict(exclude_fields=["cookie", "lease_token"]))
+
+
+@router.get("/crawl/jobs/progress", summary="订阅爬取任务进度(SSE)")
+async def crawl_jobs_progress(job_ids: list[int] = Query(None, description="任务id, 不传为全部任务")):
+    """每个任务每秒最多推送一条 progress 事件, 连接时先推送当前进度, 空闲时发送注释行保持连接"""
+
+    async def events():
+        with progress_broker.subscribe(job_ids) as subscription:
+            while True:
+                batch = await subscription.next_batch(timeout=PROGRESS_HEARTBEAT)
+                if not batch:
+                    yield ": ping\n\n"
+                for event in batch:
+                    yield f"event: progress\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@ws_router.websocket("/crawl/jobs/progress/ws")
+async def crawl_jobs_progress_ws(
+    websocket: WebSocket,
+    token: str = Query(..., description="token验证"),
+    job_ids: list[int] = Query(None, description="任务id, 不传为全部任务"),
+):
+    """
+    推送 {"events": [...]}, 合并规则同 SSE, events 为空时是心跳
+    客户端可随时发送 {"job_ids": [...]} 更换关注的任务, job_ids 为 null 时关注全部任务
+    """
+    try:
+        user = await AuthControl.is_authed(token)
+        # 与 SSE 接口使用同一权限
+        await PermissionControl.check(user, "GET", websocket.url.path.removesuffix("/ws"))
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+        return
+    await websocket.accept()
+
+    with progress_broker.subscribe(job_ids) as subscription:
+
+        async def receive():
+            try:
+                while True:
+                    message = await websocket.receive_json()
+                    subscription.follow(message.get("job_ids"))
+            except (WebSocketDisconnect, ValueError, AttributeError):
+                # 客户端断开或发送了无法解析的消息
+                return
+
+        receiver = asyncio.create_task(receive())
+        try:
+            while True:
+                batch = asyncio.create_task(subscription.next_batch(timeout=PROGRESS_HEARTBEAT))
+                await asyncio.wait([receiver, batch], return_when=asyncio.FIRST_COMPLETED)
+                if receiver.done():
+                    batch.cancel()
+                    break
+                await websocket.send_json({"events": batch.result()})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            receiver.cancel()
+
+
+@router.get("/dy/videos/stats", summary="查看作品统计数据的历史快照")
+async def get_dy_video_stats(
+    video_id: int = Query(..., description="视频id"),
+    start: datetime = Query(None, description="开始时间(含)"),
+    end: datetime = Query(None, description="结束时间(不含)"),
+    limit: int = Query(1000, ge=1, le=10000, description="最多返回条数, 超出时以最后一条的 id 为 cursor 继续查询"),
+    cursor: int = Query(None, description="上一页最后一条快照的 id"),
+):
+    data = await dy_controller.stats_history(video_id, start=start, end=end, limit=limit, cursor=cursor)
+    for row in data:
+        row["captured_at"] = row["captured_at"].strftime(settings.DATETIME_FORMAT)
+    return Success(data=data)
+
+
+@router.post("/tracked/dy/creators/create", summary="跟踪抖音博主, 定时刷新作品数据")
+async def track_dy_creators(data: TrackDyCreatorsSchemas):
+    if not data.cookie and not await dy_cookie_controller.has_accounts():
+        return Fail(msg=NO_COOKIE_MSG)
+    return Success(data=await dy_tracked_controller.track(data.urls, data.cookie))
+
+
+@router.get("/tracked/dy/creators/list", summary="查看跟踪的抖音博主")
+async def list_tracked_dy_creators(
+    page: int = Query(1, description="页码"),
+    page_size: int = Query(10, description="每页数量"),
+    enabled: bool = Query(None, description="是否定时刷新"),
+):
+    q = Q()
+    if enabled is not None:
+        q &= Q(enabled=enabled)
+    total, creators = await dy_tracked_controller.list(
+        page=page, page_size=page_size, search=q, order=["next_refresh_at"]
+    )
+    data = [await creator.to_dict(exclude_fields=["cookie"]) for creator in creators]
+    return SuccessExtra(data=data, total=total, page=page, page_size=page_size)
+
+
+@router.delete("/tracked/dy/creators/delete", summary="取消跟踪抖音博主")
+async def untrack_dy_creators(creator_ids: list[int] = Query(..., description="跟踪博主id")):
+    count = await dy_tracked_controller.untrack(creator_ids)
+    return Success(msg="Deleted Successfully", data={"count": count})
+
+
+@router.post("/crawl/cookies/create", summary="添加cookie池账号")
+async def add_dy_cookies(data: AddDyCookiesSchemas):
+    return Success(data=await dy_cookie_controller.add(data.cookies, data.max_concurrency))
+
+
+@router.get("/crawl/cookies/list", summary="查看cookie池账号和健康度")
+async def list_dy_cookies(
+    page: int = Query(1, description="页码"),
+    page_size: int = Query(10, description="每页数量"),
+):
+    total, accounts = await dy_cookie_controller.list(page=page, page_size=page_size, order=["-health", "id"])
+    # 本进程中的实时状态: 占用数、冷却剩余秒数、上次同步以来的请求数
+    pool = {account["id"]: account for account in cookie_pool.snapshot()}
+    data = []
+    for account in accounts:
+        item = await account.to_dict(exclude_fields=["cookie"])
+        item["pool"] = pool.get(account.id)
+        data.append(item)
+    return SuccessExtra(data=data, total=total, page=page, page_size=page_size)
+
+
+@router.delete("/crawl/cookies/delete", summary="删除cookie池账号")
+async def delete_dy_cookies(account_ids: list[int] = Query(..., description="账号id")):
+    count = await dy_cookie_controller.remove_many(account_ids)
+    return Success(msg="Deleted Successfully", data={"count": count})
+
+
+@router.post("/resolve/dy/user", summary="批量解析抖音博主链接的sec_user_id")
+async def resolve_dy_user(data: ResolveDyUserSchemas):
+    results = await dy_resolver_controller.resolve_many(data.urls)
+    return Success(data=results)
+
+
+@router.get("/crawl/rate-limits", summary="查看抖音请求限流器当前速率")
+async def get_rate_limits():
+    return Success(data=rate_limiters.snapshot())
+
+
+@router.get("/crawl/metrics", summary="查看爬虫请求/重试计数和熔断状态")
+async def get_crawl_metrics():
+    return Success(data={"counters": metrics.snapshot(), "circuit_breakers": circuit_breakers.snapshot()})
@@ -1,67 +1,337 @@
-from typing import List
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from tortoise.expressions import Q
 
 from app.core.crud import CRUDBase
-from app.models.admin import DyVideoModel
+from app.controllers.dy_comment import dy_comment_controller
+from app.controllers.dy_resolver import dy_resolver_controller
+from app.core.pipeline import QueueWriter
+from app.core.singleflight import SingleFlight
+from app.log import logger
+from app.models.admin import DyCreatorWatermarkModel, DyVideoModel, DyVideoStatsSnapshotModel
+from app.models.enums import CrawlMode
 from app.schemas.dyVideo import DyVideoCreate, DyVideoUpdate
-from app.spiders.dy_video_claw import DouyinVideo
-from app.spiders.dy_comments_claw.main import main as dy_comments_claw_task
+from app.settings import settings
+from app.spiders.cookie_pool import cookie_pool
+from app.spiders.dy_video_claw import AwemeRecord, DouyinVideo
+from app.spiders.dy_comments_claw.extract import extract_comments
+from app.spiders.dy_comments_claw.scheduler import CommentCrawlScheduler
+from app.utils.dates import naive
+
+# 随抓取变化、需要保留历史的统计字段
+STATS_FIELDS = ["comment_count", "share_count", "like_count", "favorite_count"]
 
 
 class DyController(CRUDBase[DyVideoModel, DyVideoCreate, DyVideoUpdate]):
     def __init__(self):
         super().__init__(model=DyVideoModel)
+        # 按 (sec_user_id/aweme_id, mode) 合并同时进行的相同抓取, 失败的结果不复用
+        self.creator_flights = SingleFlight(ttl=settings.DY_CRAWL_FRESH_TTL,
+                                            cacheable=lambda result: result["error"] is None)
+        self.comment_flights = SingleFlight(
+            ttl=settings.DY_CRAWL_FRESH_TTL,
+            cacheable=lambda result: result["error"] is None and not result["failed_threads"])
+
+    async def run_video_task(self, urls, cookie, concurrency=None, mode=CrawlMode.FULL, on_progress=None,
+                             on_written=None):
+        """
+        on_progress 接收每个博主的进度, on_written(rows) 在每页写库后调用
+        cookie 为空时每个博主从 cookie 池租用一个账号
+        同一博主正在被其他任务抓取时等待并共享它的结果, DY_CRAWL_FRESH_TTL 秒内抓取过的博主直接返回上次的结果,
+        全量抓取的结果同样可以代替增量和 refresh 抓取; 结果中 source 为 new/shared/fresh
+        """
+        urls = [url.strip() for url in urls]
+        resolved = {
+            item["url"]: item["sec_user_id"]
+            for item in await dy_resolver_controller.resolve_many(urls, concurrency=concurrency)
+            if item["sec_user_id"]
+        }
+        concurrency = max(1, concurrency or settings.DY_CRAWL_CONCURRENCY)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def crawl(url):
+            sec_user_id = resolved.get(url)
+            # 共享的进度中的 url 换成本次请求的链接
+            listener = (lambda progress: on_progress({**progress, "url": url})) if on_progress else None
+            # 解析失败的链接按链接去重, 由爬虫重新解析并记录错误
+            target = sec_user_id or url
+            async with semaphore:
+                result, source = await self.creator_flights.do(
+                    (target, mode),
+                    lambda notify: self._crawl_creator(url, sec_user_id, cookie, mode, notify, on_written),
+                    listener=listener, reuse=[] if mode == CrawlMode.FULL else [(target, CrawlMode.FULL)])
+            result = {**result, "url": url, "source": source}
+            if source == "fresh" and on_progress:
+                on_progress({"url": url, "pages": result["pages"], "count": result["count"], "error": None,
+                             "done": True})
+            return result
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(crawl(url) for url in urls))
+        logger.info(f"crawled {len(results)} creators with concurrency={concurrency} "
+                    f"in {time.perf_counter() - start:.2f}s, shared: "
+                    f"{sum(1 for result in results if result['source'] != 'new')}")
+        return results
+
+    async def _crawl_creator(self, url, sec_user_id, cookie, mode, on_progress=None, on_written=None) -> dict:
+        """抓取单个博主并逐页写库, 成功后推进水位线"""
+        since_lookup, max_pages = None, None
+        if mode == CrawlMode.INCREMENTAL:
+            since_lookup = self.get_watermark
+        elif mode == CrawlMode.REFRESH:
+            refresh_since = datetime.now() - timedelta(days=settings.DY_STATS_REFRESH_DAYS)
+
+            async def since_lookup(sec_user_id):
+                return refresh_since
+
+            max_pages = settings.DY_STATS_REFRESH_MAX_PAGES
 
-    async def run_video_task(self, urls, cookie):
-        douyinVideo = DouyinVideo()
-        data = await douyinVideo.inits(urls, cookie)
-        print(data)
-        await self.bulk_update_or_create(data)
+        # 每抓取一页立即入队, 由写入协程逐页 upsert, 内存占用不随博主作品数增长
+        async def write(videos):
+            await self.bulk_update_or_create(videos)
+            if on_written:
+                on_written(len(videos))
 
-        # async def bulk_upsert(self, objs_in: List[Union[CreateSchemaType, Dict[str, Any]]]) -> List[ModelType]:
+        result = None
+        try:
+            async with QueueWriter(write, maxsize=settings.DY_WRITER_QUEUE_SIZE) as writer:
+                for _ in range(settings.DY_COOKIE_ROTATE_ATTEMPTS + 1):
+                    async with cookie_pool.lease(cookie) as account:
+                        result = await DouyinVideo().crawl_creator(url, account.cookies, sink=writer.put,
+                                                                   since_lookup=since_lookup, max_pages=max_pages,
+                                                                   sec_user_id=sec_user_id, on_progress=on_progress)
+                    # 池中的账号触发验证码等进入冷却时换一个账号重新抓取, 已写入的作品按 upsert 覆盖
+                    if cookie or result["error"] is None or not account.cooling():
+                        break
+                    logger.info(f"cookie {account.key} cooling down, retry creator {url} with another account")
 
-    async def bulk_update_or_create(self, videos: List[dict]):
+            # refresh 模式没有翻完水位线之后的作品, 不能推进水位线
+            if mode != CrawlMode.REFRESH and result["error"] is None and result["newest_publish_time"] is not None:
+                await self.update_watermark(result["sec_user_id"], result["newest_publish_time"],
+                                            result["newest_aweme_id"])
+        except Exception as e:
+            # 最后几页写库失败时在退出写入器时抛出, 只记为该博主的错误, 不影响同批的其他博主
+            logger.warning(f"save creator failed, url: {url}, error: {e!r}")
+            result = {**(result or {"url": url, "sec_user_id": sec_user_id, "pages": 0, "count": 0, "elapsed": 0}),
+                      "error": repr(e)}
+            if on_progress:
+                on_progress({"url": url, "pages": result["pages"], "count": result["count"], "error": result["error"],
+                             "done": True})
+        return {
+            "url": result["url"],
+            "sec_user_id": result["sec_user_id"],
+            "pages": result["pages"],
+            "count": result["count"],
+            "error": result["error"],
+            "elapsed": result["elapsed"],
+        }
+
+    async def get_watermark(self, sec_user_id) -> Optional[datetime]:
+        watermark = await DyCreatorWatermarkModel.filter(dy_user_id=sec_user_id).first()
+        return naive(watermark.last_publish_time) if watermark else None
+
+    async def update_watermark(self, sec_user_id, publish_time: datetime, aweme_id: int):
+        watermark = await DyCreatorWatermarkModel.filter(dy_user_id=sec_user_id).first()
+        if not watermark:
+            watermark = DyCreatorWatermarkModel(dy_user_id=sec_user_id)
+        # 水位线只前进不后退
+        if watermark.last_publish_time is None or publish_time > naive(watermark.last_publish_time):
+            watermark.last_publish_time = publish_time
+            watermark.last_aweme_id = aweme_id
+        watermark.last_crawled_at = datetime.now()
+        await watermark.save()
+
+    async def bulk_update_or_create(self, videos: List[AwemeRecord]):
+        """
+        按 video_id upsert 作品, 只更新统计数据或博主有变化的行
+        新作品和统计数据有变化的作品同时追加一条 DyVideoStatsSnapshotModel, 保留历史;
+        快照表上线前已入库、还没有快照的作品在第一次抓取时补一条基线快照
+        """
 
         # 提取所有 video_id 并转换为集合
-        existing_video_ids = {int(video["video_id"]) for video in videos}
+        existing_video_ids = {video.video_id for video in videos}
 
         # 查询现有的 video_id 并转换为集合
         existing_videos = {video.video_id: video for video in await self.model.filter(video_id__in=existing_video_ids)}
 
         # 新增的记录
-        new_videos = [video for video in videos if int(video["video_id"]) not in existing_videos]
+        new_videos = [video for video in videos if video.video_id not in existing_videos]
 
         # 更新的记录
-        update_videos = [video for video in videos if int(video["video_id"]) in existing_videos]
+        update_videos = [video for video in videos if video.video_id in existing_videos]
+
+        captured_at = datetime.now()
+        snapshots = [self._snapshot(video, captured_at) for video in new_videos]
 
         if new_videos:
             # 执行新增操作
             await self.model.bulk_create([
-                self.model(**video) for video in new_videos
+                self.model(**video.to_model()) for video in new_videos
             ])
 
         # 执行更新操作
-        if update_videos:
-            update_objects = []
-            for video in update_videos:
-                existing_video = existing_videos[int(video["video_id"])]
-                existing_video.comment_count = video["comment_count"]
-                existing_video.share_count = video["share_count"]
-                existing_video.like_count = video["like_count"]
-                existing_video.like_count = video["like_count"]
-                existing_video.dy_user_id = video["dy_user_id"]
-                existing_video.favorite_count = video["favorite_count"]
-                update_objects.append(existing_video)
-
-            await self.model.bulk_update(update_objects,
-                                         fields=["comment_count", "share_count", "like_count", "favorite_count",
-                                                 'dy_user_id'])
-
-    async def run_comments_task(self, video_ids, cookie):
-        all_data = []
-        for video_id in video_ids:
-            data = await dy_comments_claw_task(video_id, cookie)
-            all_data.append(data)
-        print(all_data)
+        update_objects = []
+        unchanged = []
+        for video in update_videos:
+            existing_video = existing_videos[video.video_id]
+            stats_changed = any(getattr(existing_video, field) != getattr(video, field) for field in STATS_FIELDS)
+            if stats_changed:
+                snapshots.append(self._snapshot(video, captured_at))
+            else:
+                unchanged.append(video)
+                if existing_video.dy_user_id == video.dy_user_id:
+                    continue
+            for field in STATS_FIELDS:
+                setattr(existing_video, field, getattr(video, field))
+            existing_video.dy_user_id = video.dy_user_id
+            update_objects.append(existing_video)
+
+        if update_objects:
+            await self.model.bulk_update(update_objects, fields=[*STATS_FIELDS, "dy_user_id"])
+        if unchanged:
+            snapshotted = set(await DyVideoStatsSnapshotModel.filter(
+                video_id__in=[video.video_id for video in unchanged]).distinct().values_list("video_id", flat=True))
+            snapshots += [self._snapshot(video, captured_at) for video in unchanged
+                          if video.video_id not in snapshotted]
+        if snapshots:
+            await DyVideoStatsSnapshotModel.bulk_create(snapshots)
+
+    @staticmethod
+    def _snapshot(video: AwemeRecord, captured_at: datetime) -> DyVideoStatsSnapshotModel:
+        return DyVideoStatsSnapshotModel(video_id=video.video_id, captured_at=captured_at,
+                                         **{field: getattr(video, field) for field in STATS_FIELDS})
+
+    async def stats_history(self, video_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                            limit: int = 1000, cursor: Optional[int] = None) -> list[dict]:
+        """
+        作品在 [start, end) 内的统计快照, 按 (抓取时间, id) 升序; 走 (video_id, captured_at) 索引, 只取统计列
+        cursor 为上一页最后一条快照的 id, 只返回排在它之后的快照, 翻页时边界上的快照不会重复返回
+        """
+        query = DyVideoStatsSnapshotModel.filter(video_id=video_id)
+        if start:
+            query = query.filter(captured_at__gte=start)
+        if end:
+            query = query.filter(captured_at__lt=end)
+        if cursor:
+            last = await DyVideoStatsSnapshotModel.filter(id=cursor, video_id=video_id).first().values("captured_at")
+            if last:
+                query = query.filter(Q(captured_at__gt=last["captured_at"]) | Q(captured_at=last["captured_at"],
+                                                                                 id__gt=cursor))
+        return await query.order_by("captured_at", "id").limit(limit).values("id", "captured_at", *STATS_FIELDS)
+
+    async def run_comments_task(self, video_ids, cookie, resume=False, mode=CrawlMode.FULL, on_progress=None,
+                                on_written=None):
+        """
+        所有视频的评论并发爬取, 每页评论/回复抓取后立即入队写库, 返回每个视频的进度和数量
+        检查点与评论经同一队列按顺序写入; resume=True 时从上次的检查点继续, 否则清除检查点重新抓取
+        mode=incremental 时只翻到没有新评论为止, 只重新抓取回复数增长的评论的回复
+        on_progress 接收每个视频的进度, on_written(rows) 在每批评论写库后调用
+        cookie 为空时每个视频从 cookie 池租用一个账号
+        同一视频正在被其他任务抓取时等待并共享它的结果, DY_CRAWL_FRESH_TTL 秒内抓取过的视频直接返回上次的结果,
+        结果中 source 为 new/shared/fresh; 其余视频去重后由同一个调度器抓取
+        """
+        video_ids = list(dict.fromkeys(str(aweme_id) for aweme_id in video_ids))
+        loop = asyncio.get_running_loop()
+        batch = {}  # 本次需要抓取的视频 {aweme_id: (future, notify)}
+
+        def join(aweme_id):
+            def start(notify):
+                future = loop.create_future()
+                batch[aweme_id] = future, notify
+                return future
+
+            return start
+
+        calls = {
+            aweme_id: self.comment_flights.attach(
+                (aweme_id, mode), join(aweme_id), listener=on_progress,
+                reuse=[] if mode == CrawlMode.FULL else [(aweme_id, CrawlMode.FULL)])
+            for aweme_id in video_ids
+        }
+        if batch:
+            crawler = asyncio.ensure_future(self._crawl_comments(batch, cookie, resume, mode, on_written))
+            crawler.add_done_callback(lambda task: self._settle(batch, task))
+            for future, _ in batch.values():
+                future.add_done_callback(lambda _: self._abandon(batch, crawler))
+
+        async def wait(aweme_id):
+            call, source = calls[aweme_id]
+            if source == "fresh":
+                if on_progress:
+                    on_progress(call)
+                return {**call, "source": source}
+            return {**await self.comment_flights.wait(call, on_progress), "source": source}
+
+        return list(await asyncio.gather(*(wait(aweme_id) for aweme_id in video_ids)))
+
+    @staticmethod
+    def _settle(batch, crawler) -> None:
+        """抓取结束(出错或被取消)时还没有结果的视频随之失败"""
+        error = None if crawler.cancelled() else crawler.exception()
+        for future, _ in batch.values():
+            if future.done():
+                continue
+            if error is None:
+                future.cancel()
+            else:
+                future.set_exception(error)
+
+    @staticmethod
+    def _abandon(batch, crawler) -> None:
+        """所有视频都已结束、且有视频的调用方全部离开时, 剩下的抓取没有人等待, 取消抓取"""
+        futures = [future for future, _ in batch.values()]
+        if not crawler.done() and all(f.done() for f in futures) and any(f.cancelled() for f in futures):
+            crawler.cancel()
+
+    async def _crawl_comments(self, batch, cookie, resume, mode, on_written=None) -> None:
+        """
+        用一个调度器抓取 batch 中的所有视频, 进度经各自的 notify 转发, 每个视频完成时设置它的 future
+        池中的账号进入冷却导致失败的视频换一个账号从检查点继续
+        """
+        video_ids = list(batch)
+        for attempt in range(settings.DY_COOKIE_ROTATE_ATTEMPTS + 1):
+            retry = []
+            async with cookie_pool.lease(cookie) as account:
+                def on_progress(report, account=account, rotate=attempt < settings.DY_COOKIE_ROTATE_ATTEMPTS):
+                    future, notify = batch[report["aweme_id"]]
+                    if report["done"] and report["error"] and rotate and not cookie and account.cooling():
+                        retry.append(report["aweme_id"])
+                        return
+                    notify(report)
+                    if report["done"] and not future.done():
+                        future.set_result({k: v for k, v in report.items() if k != "pending_threads"})
+
+                await self._crawl_comments_with(video_ids, account.cookie, resume, mode, on_progress, on_written)
+            if not retry:
+                break
+            logger.info(f"cookie {account.key} cooling down, "
+                        f"resume comments of {len(retry)} videos with another account")
+            video_ids, resume = retry, True
+
+    async def _crawl_comments_with(self, video_ids, cookie, resume, mode, on_progress=None, on_written=None) -> list:
+        incremental = mode == CrawlMode.INCREMENTAL
+        if resume:
+            resume_state = await dy_comment_controller.load_resume(video_ids)
+        else:
+            resume_state = {}
+            await dy_comment_controller.reset_checkpoints(video_ids, threads=not incremental)
+        incremental_state = await dy_comment_controller.load_incremental(video_ids) if incremental else None
+
+        async def write(item):
+            await dy_comment_controller.write(item)
+            if on_written and isinstance(item, list):
+                on_written(len(item))
+
+        async with QueueWriter(write, maxsize=settings.DY_WRITER_QUEUE_SIZE) as writer:
+            async def sink(aweme_id, comments):
+                await writer.put(extract_comments(comments, aweme_id))
+
+            results = await CommentCrawlScheduler(cookie, sink=sink, on_progress=on_progress, checkpoint=writer.put,
+                                                  resume=resume_state, incremental=incremental_state).run(video_ids)
+        return [{k: v for k, v in result.items() if k != "data"} for result in results]
 
 
 dy_controller = DyController()
@@ -0,0 +1,135 @@
+from app.models.admin import (
+    DyCommentCheckpointModel,
+    DyCommentModel,
+    DyReplyThreadModel,
+)
+from app.settings import settings
+from app.spiders.dy_comments_claw.extract import CommentRecord
+from app.spiders.dy_comments_claw.scheduler import (
+    CommentCheckpoint,
+    IncrementalState,
+    ResumeState,
+)
+from app.utils.dates import naive
+
+# 重复抓取时会变化的字段
+UPDATE_FIELDS = ["digg_count", "reply_comment_total", "ip_location", "aweme_id"]
+
+
+class DyCommentController:
+    """评论入库: 按 comment_id 分批 upsert, 已存在的评论只更新有变化的行; 保存和读取抓取检查点"""
+
+    def __init__(self):
+        self.model = DyCommentModel
+
+    async def write(self, item: list[CommentRecord] | CommentCheckpoint) -> None:
+        """写入队列的消费函数, 评论和检查点按入队顺序写入"""
+        if isinstance(item, CommentCheckpoint):
+            await self.save_checkpoint(item)
+        else:
+            await self.bulk_upsert(item)
+
+    async def bulk_upsert(self, comments: list[CommentRecord]) -> int:
+        """返回新增和更新的行数"""
+        chunk = settings.DY_COMMENT_UPSERT_CHUNK
+        changed = 0
+        for i in range(0, len(comments), chunk):
+            changed += await self._upsert_chunk(comments[i : i + chunk])
+        return changed
+
+    async def _upsert_chunk(self, comments: list[CommentRecord]) -> int:
+        # 同一批中重复的评论以最后一次为准
+        comments = {comment.comment_id: comment for comment in comments}
+        existing = {row.comment_id: row for row in await self.model.filter(comment_id__in=list(comments))}
+
+        new_comments = [comment for comment_id, comment in comments.items() if comment_id not in existing]
+        if new_comments:
+            await self.model.bulk_create([self.model(**comment.to_model()) for comment in new_comments])
+
+        update_objects = []
+        for comment_id, row in existing.items():
+            comment = comments[comment_id]
+            if any(getattr(row, field) != getattr(comment, field) for field in UPDATE_FIELDS):
+                for field in UPDATE_FIELDS:
+                    setattr(row, field, getattr(comment, field))
+                update_objects.append(row)
+        if update_objects:
+            await self.model.bulk_update(update_objects, fields=UPDATE_FIELDS)
+        return len(new_comments) + len(update_objects)
+
+    async def save_checkpoint(self, checkpoint: CommentCheckpoint) -> None:
+        aweme_id = int(checkpoint.aweme_id)
+        await DyCommentCheckpointModel.update_or_create(
+            aweme_id=aweme_id,
+            defaults={"cursor": checkpoint.cursor, "comments_done": checkpoint.comments_done, "done": checkpoint.done},
+        )
+        if not checkpoint.threads:
+            return
+        threads = {int(thread.comment_id): thread.reply_total for thread in checkpoint.threads}
+        existing = {row.comment_id: row for row in await DyReplyThreadModel.filter(comment_id__in=list(threads))}
+        new_rows = [
+            DyReplyThreadModel(comment_id=comment_id, aweme_id=aweme_id, reply_total=reply_total)
+            for comment_id, reply_total in threads.items()
+            if comment_id not in existing
+        ]
+        if new_rows:
+            await DyReplyThreadModel.bulk_create(new_rows)
+        for comment_id, row in existing.items():
+            row.reply_total = threads[comment_id]
+        if existing:
+            await DyReplyThreadModel.bulk_update(list(existing.values()), fields=["reply_total"])
+
+    async def load_resume(self, aweme_ids: list) -> dict[str, ResumeState]:
+        """
+        读取视频的检查点, 返回 {aweme_id: ResumeState}
+        已入库、有回复、但回复没有抓完的一级评论作为 pending_threads 重新入队
+        """
+        aweme_ids = [int(aweme_id) for aweme_id in aweme_ids]
+        resume = {}
+        for checkpoint in await DyCommentCheckpointModel.filter(aweme_id__in=aweme_ids):
+            pending = []
+            if not checkpoint.done:
+                finished = set(
+                    await DyReplyThreadModel.filter(aweme_id=checkpoint.aweme_id).values_list("comment_id", flat=True)
+                )
+                rows = await self.model.filter(
+                    aweme_id=checkpoint.aweme_id, reply_comment_id=None, reply_comment_total__gt=0
+                ).values_list("comment_id", "reply_comment_total")
+                pending = [(comment_id, total) for comment_id, total in rows if comment_id not in finished]
+            resume[str(checkpoint.aweme_id)] = ResumeState(
+                checkpoint.cursor, checkpoint.comments_done, checkpoint.done, pending
+            )
+        return resume
+
+    async def load_incremental(self, aweme_ids: list) -> dict[str, IncrementalState]:
+        """已入库的最新一级评论和各评论抓取时的回复数, 没有入库评论的视频不返回, 按全量抓取"""
+        incremental = {}
+        for aweme_id in aweme_ids:
+            newest = (
+                await self.model.filter(aweme_id=int(aweme_id), reply_comment_id=None)
+                .order_by("-comment_time", "-comment_id")
+                .limit(1)
+                .values("comment_time", "comment_id")
+            )
+            if not newest:
+                continue
+            reply_totals = dict(
+                await DyReplyThreadModel.filter(aweme_id=int(aweme_id)).values_list("comment_id", "reply_total")
+            )
+            incremental[str(aweme_id)] = IncrementalState(
+                naive(newest[0]["comment_time"]).timestamp(), newest[0]["comment_id"], reply_totals
+            )
+        return incremental
+
+    async def reset_checkpoints(self, aweme_ids: list, threads: bool = True) -> None:
+        """
+        重新抓取前清除检查点, threads=True 时同时清除已完成的回复记录
+        增量抓取依赖回复记录判断回复数是否增长, 只清除检查点
+        """
+        aweme_ids = [int(aweme_id) for aweme_id in aweme_ids]
+        await DyCommentCheckpointModel.filter(aweme_id__in=aweme_ids).delete()
+        if threads:
+            await DyReplyThreadModel.filter(aweme_id__in=aweme_ids).delete()
+
+
+dy_comment_controller = DyCommentController()
@@ -0,0 +1,102 @@
+import asyncio
+from datetime import datetime
+
+from tortoise.expressions import F
+
+from app.core.crud import CRUDBase
+from app.log import logger
+from app.models.admin import DyCookieAccountModel
+from app.schemas.dyVideo import DyCookieAccountCreate
+from app.settings import settings
+from app.spiders.cookie_pool import CookieAccount, cookie_pool
+from app.spiders.rate_limiter import cookie_key, parse_cookie
+from app.utils.dates import naive
+
+
+class DyCookieAccountController(CRUDBase[DyCookieAccountModel, DyCookieAccountCreate, DyCookieAccountCreate]):
+    """
+    cookie 池中的账号: 数据库保存账号和健康度, 每个进程的 cookie_pool 每 DY_COOKIE_SYNC_INTERVAL 秒
+    把本进程对健康度的改变量和请求数累加到数据库, 再重新加载启用的账号, 多个进程的扣减不会互相覆盖;
+    冷却时间在进程间取较晚的一方
+    """
+
+    def __init__(self):
+        super().__init__(model=DyCookieAccountModel)
+        self._task: asyncio.Task | None = None
+
+    async def add(self, cookies: list[str], max_concurrency: int | None = None) -> list[dict]:
+        """添加或重新启用账号, 返回每个 cookie 的 {'id', 'key', 'error'}"""
+        results = []
+        for cookie in cookies:
+            cookie = cookie.strip()
+            if not parse_cookie(cookie):
+                results.append({"id": None, "key": None, "error": "invalid cookie"})
+                continue
+            account, _ = await self.model.update_or_create(
+                defaults={"cookie": cookie, "enabled": True, "max_concurrency": max_concurrency},
+                cookie_key=cookie_key(cookie),
+            )
+            results.append({"id": account.id, "key": account.cookie_key, "error": None})
+        await self.load()
+        return results
+
+    async def remove_many(self, account_ids: list[int]) -> int:
+        count = await self.model.filter(id__in=account_ids).delete()
+        await self.load()
+        return count
+
+    async def has_accounts(self) -> bool:
+        return bool(cookie_pool.accounts) or await self.model.filter(enabled=True).exists()
+
+    async def load(self) -> None:
+        cookie_pool.sync(
+            [
+                CookieAccount(
+                    row.id,
+                    row.cookie,
+                    row.max_concurrency,
+                    row.health,
+                    naive(row.cooldown_until).timestamp() if row.cooldown_until else 0.0,
+                )
+                for row in await self.model.filter(enabled=True)
+            ]
+        )
+
+    async def persist(self) -> None:
+        for account in list(cookie_pool.accounts.values()):
+            requests, account.requests = account.requests, 0
+            failures, account.failures = account.failures, 0
+            delta, account.health_delta = account.health_delta, 0.0
+            await self.model.filter(id=account.id).update(
+                health=F("health") + delta,
+                cooldown_until=datetime.fromtimestamp(account.cooldown_until) if account.cooldown_until else None,
+                requests=F("requests") + requests,
+                failures=F("failures") + failures,
+                last_error=account.last_error,
+            )
+        # 累加后可能超出 [0, 1]
+        await self.model.filter(health__gt=1).update(health=1)
+        await self.model.filter(health__lt=0).update(health=0)
+
+    async def start_sync(self) -> None:
+        await self.load()
+        self._task = asyncio.create_task(self._sync())
+
+    async def stop_sync(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            await self.persist()
+
+    async def _sync(self) -> None:
+        while True:
+            await asyncio.sleep(settings.DY_COOKIE_SYNC_INTERVAL)
+            try:
+                await self.persist()
+                await self.load()
+            except Exception as e:
+                logger.warning(f"sync cookie pool failed: {e!r}")
+
+
+dy_cookie_controller = DyCookieAccountController()
@@ -0,0 +1,258 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from tortoise.expressions import F, Q
+
+from app.controllers.dy import dy_controller
+from app.core.crud import CRUDBase
+from app.core.progress import JobProgress, progress_broker
+from app.log import logger
+from app.models.admin import DyCrawlJobModel
+from app.models.enums import CrawlJobStatus, CrawlJobType, CrawlMode
+from app.schemas.dyVideo import DyCrawlJobCreate
+from app.settings import settings
+
+# 每次领取时查询的候选任务数, 多个 worker 同时领取时依次尝试
+CLAIM_CANDIDATES = 10
+
+
+class DyCrawlJobController(CRUDBase[DyCrawlJobModel, DyCrawlJobCreate, DyCrawlJobCreate]):
+    """
+    后台爬取任务: 接口只创建任务并立即返回任务 id, 任务由 API 进程内的 DY_JOB_WORKERS 个协程
+    以及 worker.py 启动的独立进程(可在多台机器上)从 dycrawljob 表中领取执行
+    领取时以 attempts 为版本号条件更新, 同一任务只会被一个 worker 领到; 每次领取生成新的 lease_token,
+    续约和写入结果都以它为条件, 同一进程内的其他 worker 也无法误写; 执行期间每 DY_JOB_HEARTBEAT 秒续约,
+    租约过期(worker 崩溃或失联)的任务由其他 worker 接管, 评论任务从检查点继续
+    执行中的进度发布到本进程的 progress_broker, 并随心跳写入 progress 字段供其他进程转发
+    """
+
+    def __init__(self):
+        super().__init__(model=DyCrawlJobModel)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.workers: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+
+    async def enqueue(self, job_type: CrawlJobType, params: dict, cookie: str | None) -> DyCrawlJobModel:
+        targets = params.get("urls") or params.get("video_ids") or []
+        job = await self.create(DyCrawlJobCreate(job_type=job_type, params=params, cookie=cookie))
+        # 重复的目标只抓取一次, 进度也按目标去重
+        job.total = len(set(map(str, targets)))
+        await job.save(update_fields=["total"])
+        JobProgress(progress_broker, job.id, job.job_type, job.total).publish()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def start_workers(self, workers: int | None = None) -> None:
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup = asyncio.Event()
+        workers = settings.DY_JOB_WORKERS if workers is None else workers
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(workers)]
+        self.workers.append(asyncio.create_task(self._relay_progress()))
+
+    async def stop_workers(self) -> None:
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers.clear()
+        self._wakeup = None
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                job = await self.claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("claim crawl job failed")
+                job = None
+            if job is None:
+                # 本进程创建任务时立即唤醒, 其他进程创建的任务靠轮询发现
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), settings.DY_JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self.run_job(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"crawl job {job.id} failed")
+
+    async def claim(self) -> DyCrawlJobModel | None:
+        """领取一个待执行或租约已过期的任务, 没有可领取的任务时返回 None"""
+        now = datetime.now()
+        claimable = Q(status=CrawlJobStatus.PENDING) | Q(status=CrawlJobStatus.RUNNING, lease_expires_at__lt=now)
+        for job in await self.model.filter(claimable).order_by("id").limit(CLAIM_CANDIDATES):
+            # attempts 作为版本号, 被其他 worker 抢先领取时更新行数为 0
+            if job.attempts >= settings.DY_JOB_MAX_ATTEMPTS:
+                await self.model.filter(claimable, id=job.id, attempts=job.attempts).update(
+                    status=CrawlJobStatus.FAILED,
+                    error=f"exceeded {settings.DY_JOB_MAX_ATTEMPTS} attempts",
+                    lease_expires_at=None,
+                    finished_at=now,
+                )
+                continue
+            claimed = await self.model.filter(claimable, id=job.id, attempts=job.attempts).update(
+                status=CrawlJobStatus.RUNNING,
+                worker=self.worker_id,
+                lease_token=uuid.uuid4().hex,
+                attempts=job.attempts + 1,
+                lease_expires_at=now + timedelta(seconds=settings.DY_JOB_LEASE_TTL),
+            )
+            if claimed:
+                if job.status == CrawlJobStatus.RUNNING:
+                    logger.warning(f"crawl job {job.id} lease of {job.worker} expired, reclaimed")
+                return await self.model.get(id=job.id)
+        return None
+
+    async def _update_leased(self, job: DyCrawlJobModel, **fields) -> bool:
+        """只在仍持有本次领取的租约时更新任务, 租约已被其他 worker 接管时返回 False"""
+        return bool(await self.model.filter(id=job.id, lease_token=job.lease_token).update(**fields))
+
+    async def _heartbeat(
+        self, job: DyCrawlJobModel, task: asyncio.Task, progress: JobProgress, lease_lost: asyncio.Event
+    ) -> None:
+        while True:
+            await asyncio.sleep(settings.DY_JOB_HEARTBEAT)
+            lease = datetime.now() + timedelta(seconds=settings.DY_JOB_LEASE_TTL)
+            try:
+                renewed = await self._update_leased(job, lease_expires_at=lease, progress=progress.event())
+            except Exception as e:
+                # 数据库暂时不可用时继续执行, 下次心跳再续约
+                logger.warning(f"crawl job {job.id} heartbeat failed: {e!r}")
+                continue
+            if not renewed:
+                logger.warning(f"crawl job {job.id} lease lost, stop running")
+                lease_lost.set()
+                task.cancel()
+                return
+
+    async def run_job(self, job: DyCrawlJobModel) -> None:
+        # 之前开始过说明上次执行被中断
+        interrupted = job.started_at is not None
+        job.started_at = datetime.now()
+        await self._update_leased(job, started_at=job.started_at, error=None)
+        progress = JobProgress(progress_broker, job.id, job.job_type, job.total)
+        progress.set_status(CrawlJobStatus.RUNNING)
+
+        start = time.perf_counter()
+        lease_lost = asyncio.Event()
+        task = asyncio.create_task(self._execute(job, interrupted, progress))
+        heartbeat = asyncio.create_task(self._heartbeat(job, task, progress, lease_lost))
+        try:
+            results = await task
+        except asyncio.CancelledError:
+            if lease_lost.is_set():
+                # 任务已由其他 worker 接管, 结果以对方为准
+                return
+            # 服务关闭, 释放租约由其他 worker 立即接管; 主动释放不计入执行次数
+            await self._update_leased(
+                job,
+                status=CrawlJobStatus.PENDING,
+                worker=None,
+                lease_token=None,
+                lease_expires_at=None,
+                attempts=F("attempts") - 1,
+            )
+            progress.set_status(CrawlJobStatus.PENDING)
+            raise
+        except Exception as e:
+            logger.exception(f"crawl job {job.id} failed")
+            job.status = CrawlJobStatus.FAILED
+            job.error = repr(e)
+        else:
+            job.status = CrawlJobStatus.SUCCEEDED
+            job.result = results
+            job.finished = len(results)
+            job.failed = sum(1 for result in results if result["error"])
+        finally:
+            heartbeat.cancel()
+        job.finished_at = datetime.now()
+        job.elapsed = time.perf_counter() - start
+        progress.status = job.status
+        saved = await self._update_leased(
+            job,
+            status=job.status,
+            result=job.result,
+            finished=job.finished,
+            failed=job.failed,
+            rows=job.rows,
+            error=job.error,
+            finished_at=job.finished_at,
+            elapsed=job.elapsed,
+            lease_expires_at=None,
+            progress=progress.event(finished=True),
+        )
+        if not saved:
+            logger.warning(f"crawl job {job.id} lease lost before saving result")
+            return
+        progress.set_status(job.status)
+        logger.info(
+            f"crawl job {job.id} {job.status}: {job.finished}/{job.total} finished, {job.failed} failed, "
+            f"{job.rows} rows in {job.elapsed:.2f}s"
+        )
+
+    async def _execute(self, job: DyCrawlJobModel, interrupted: bool, progress: JobProgress) -> list[dict]:
+        params = job.params
+        mode = params.get("mode") or CrawlMode.FULL
+        if job.job_type == CrawlJobType.VIDEO:
+            results = await dy_controller.run_video_task(
+                params["urls"],
+                job.cookie,
+                concurrency=params.get("concurrency"),
+                mode=mode,
+                on_progress=lambda p: progress.update(p["url"], p),
+                on_written=progress.written,
+            )
+            job.rows = sum(result["count"] for result in results)
+        else:
+            # 被中断后重新执行的评论任务从检查点继续
+            results = await dy_controller.run_comments_task(
+                params["video_ids"],
+                job.cookie,
+                resume=params.get("resume") or interrupted,
+                mode=mode,
+                on_progress=lambda p: progress.update(p["aweme_id"], p),
+                on_written=progress.written,
+            )
+            job.rows = sum(result["comments"] + result["replies"] for result in results)
+        return results
+
+    async def _relay_progress(self) -> None:
+        """把其他进程执行的任务随心跳写入的进度转发给本进程的订阅者, 进度没有变化(心跳还没更新)时不重复发布"""
+        relayed: dict[int, dict] = {}  # {job_id: 上次转发的进度}
+        while True:
+            await asyncio.sleep(settings.DY_PROGRESS_INTERVAL)
+            if not progress_broker.subscribers:
+                relayed.clear()
+                continue
+            try:
+                rows = (
+                    await self.model.filter(status=CrawlJobStatus.RUNNING)
+                    .exclude(worker=self.worker_id)
+                    .values("id", "progress")
+                )
+                running = {row["id"] for row in rows}
+                # 上次还在执行、这次已结束的任务补发最终进度
+                finished = [job_id for job_id in relayed if job_id not in running]
+                if finished:
+                    rows += await self.model.filter(id__in=finished).values("id", "progress")
+            except Exception as e:
+                logger.warning(f"relay crawl job progress failed: {e!r}")
+                continue
+            last, relayed = relayed, {}
+            for row in rows:
+                if row["progress"] and row["progress"] != last.get(row["id"]):
+                    progress_broker.publish(row["progress"])
+                if row["id"] in running:
+                    relayed[row["id"]] = row["progress"]
+
+
+dy_job_controller = DyCrawlJobController()
@@ -0,0 +1,98 @@
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+
+from app.core.cache import TTLCache
+from app.log import logger
+from app.models.admin import DyResolveCacheModel
+from app.settings import settings
+from app.spiders.dy_video_claw import DouyinVideo, match_sec_user_id
+from app.utils.dates import naive
+
+
+def url_hash(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+class DyResolverController:
+    """
+    分享链接 -> sec_user_id 解析缓存
+    先查进程内 LRU, 再批量查数据库, 都未命中才请求短链跳转, 解析结果写回数据库供其他 worker 共享
+    """
+
+    def __init__(self):
+        self.model = DyResolveCacheModel
+        self.cache = TTLCache(maxsize=settings.DY_RESOLVE_CACHE_SIZE, ttl=settings.DY_RESOLVE_CACHE_TTL)
+
+    async def resolve_many(self, urls: list[str], concurrency: int | None = None) -> list[dict]:
+        """批量解析, 每个链接返回 {'url', 'sec_user_id', 'source', 'error'}, source 为 url/memory/db/network"""
+        urls = [url.strip() for url in urls]
+        results = {url: {"url": url, "sec_user_id": None, "source": None, "error": None} for url in urls}
+
+        pending = []
+        for url, result in results.items():
+            sec_user_id = match_sec_user_id(url)
+            if sec_user_id:
+                result.update(sec_user_id=sec_user_id, source="url")
+                continue
+            sec_user_id = self.cache.get(url)
+            if sec_user_id:
+                result.update(sec_user_id=sec_user_id, source="memory")
+                continue
+            pending.append(url)
+
+        if pending:
+            hashes = {url_hash(url): url for url in pending}
+            rows = await self.model.filter(url_hash__in=list(hashes), expires_at__gt=datetime.now())
+            for row in rows:
+                url = hashes[row.url_hash]
+                results[url].update(sec_user_id=row.sec_user_id, source="db")
+                self.cache.set(url, row.sec_user_id, ttl=(naive(row.expires_at) - datetime.now()).total_seconds())
+            pending = [url for url in pending if results[url]["source"] is None]
+
+        if pending:
+            await self._resolve_network(pending, results, concurrency)
+
+        return [results[url] for url in urls]
+
+    async def resolve(self, url: str) -> str | None:
+        return (await self.resolve_many([url]))[0]["sec_user_id"]
+
+    async def _resolve_network(self, urls: list[str], results: dict, concurrency: int | None):
+        spider = DouyinVideo()
+        semaphore = asyncio.Semaphore(max(1, concurrency or settings.DY_CRAWL_CONCURRENCY))
+
+        async def resolve(url):
+            async with semaphore:
+                try:
+                    results[url].update(sec_user_id=await spider.resolve_sec_user_id(url), source="network")
+                except Exception as e:
+                    logger.warning(f"resolve sec_user_id failed, url: {url}, error: {e!r}")
+                    results[url]["error"] = repr(e)
+
+        await asyncio.gather(*(resolve(url) for url in urls))
+
+        resolved = [url for url in urls if results[url]["sec_user_id"]]
+        if not resolved:
+            return
+        expires_at = datetime.now() + timedelta(seconds=settings.DY_RESOLVE_CACHE_TTL)
+        for url in resolved:
+            self.cache.set(url, results[url]["sec_user_id"])
+        # 过期记录直接替换, 其他 worker 并发写入同一链接时忽略冲突
+        hashes = [url_hash(url) for url in resolved]
+        await self.model.filter(url_hash__in=hashes).delete()
+        await self.model.bulk_create(
+            [
+                self.model(
+                    url_hash=url_hash(url),
+                    share_url=url,
+                    sec_user_id=results[url]["sec_user_id"],
+                    expires_at=expires_at,
+                )
+                for url in resolved
+            ],
+            ignore_conflicts=True,
+        )
+
+
+dy_resolver_controller = DyResolverController()
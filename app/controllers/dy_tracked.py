@@ -0,0 +1,294 @@
+import asyncio
+import heapq
+import math
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from tortoise.expressions import Q
+from tortoise.functions import Count, Max, Sum
+
+from app.controllers.dy_job import dy_job_controller
+from app.controllers.dy_resolver import dy_resolver_controller
+from app.core.crud import CRUDBase
+from app.log import logger
+from app.models.admin import DySchedulerLeaseModel, DyTrackedCreatorModel, DyVideoModel
+from app.models.enums import CrawlJobType, CrawlMode
+from app.schemas.dyVideo import DyTrackedCreatorCreate
+from app.settings import settings
+from app.spiders.rate_limiter import AdaptiveTokenBucket
+from app.utils.dates import naive
+
+# 刚发布作品的博主刷新间隔最多缩短到 1 / (1 + FRESHNESS_BOOST)
+FRESHNESS_BOOST = 8
+# 作品列表每页大约返回的作品数, 用于估算全量刷新的请求数
+VIDEOS_PER_PAGE = 18
+LEASE_NAME = "dy_tracked_refresh"
+
+
+def refresh_interval(velocity: float, newest_age: float | None) -> float:
+    """
+    刷新间隔(秒): 近期作品互动增长越快、最新作品越新(newest_age 为最新作品发布至今的秒数), 间隔越短
+    近期(DY_STATS_REFRESH_DAYS 天内)没有作品的博主使用 DY_REFRESH_MAX_INTERVAL
+    """
+    window = settings.DY_STATS_REFRESH_DAYS * 86400
+    freshness = 0.0
+    if newest_age is not None:
+        freshness = max(0.0, 1 - newest_age / window)
+    speedup = 1 + velocity / settings.DY_REFRESH_HOT_VELOCITY + FRESHNESS_BOOST * freshness
+    return min(
+        max(settings.DY_REFRESH_MAX_INTERVAL / speedup, settings.DY_REFRESH_MIN_INTERVAL),
+        settings.DY_REFRESH_MAX_INTERVAL,
+    )
+
+
+def needs_full_refresh(last_full_refresh_at: datetime | None, at: datetime) -> bool:
+    """refresh 模式只翻近期作品, 每隔 DY_REFRESH_FULL_INTERVAL 改为全量刷新一次, 新跟踪的博主第一次就全量抓取"""
+    if last_full_refresh_at is None:
+        return True
+    return (at - naive(last_full_refresh_at)).total_seconds() >= settings.DY_REFRESH_FULL_INTERVAL
+
+
+def refresh_cost(videos: int, full: bool) -> int:
+    """一次刷新预计使用的请求数, 全量刷新按已入库的作品数估算页数"""
+    if not full:
+        return settings.DY_STATS_REFRESH_MAX_PAGES
+    return max(math.ceil(videos / VIDEOS_PER_PAGE), settings.DY_STATS_REFRESH_MAX_PAGES)
+
+
+class DyTrackedCreatorController(CRUDBase[DyTrackedCreatorModel, DyTrackedCreatorCreate, DyTrackedCreatorCreate]):
+    """
+    跟踪博主的定时刷新: 按到期时间维护优先队列, 到期的博主创建后台爬取任务, 近期作品用 refresh 模式刷新,
+    每隔 DY_REFRESH_FULL_INTERVAL 全量刷新一次, 老作品的统计数据也会低频更新
+    每次调度时根据近期作品点赞+评论的增长速度重新计算刷新间隔并加随机抖动,
+    所有刷新共用每小时 DY_REFRESH_BUDGET 个请求的预算; 预算不足时优先刷新逾期最多个间隔的博主,
+    增长快的博主间隔短, 会更早获得预算
+    多个 API 进程中只有持有 dyschedulerlease 租约的进程运行调度, 预算也只在该进程内扣减;
+    调度时以 refreshes 为版本号条件更新博主, 租约交接期间同一博主也只会被调度一次
+    """
+
+    def __init__(self):
+        super().__init__(model=DyTrackedCreatorModel)
+        self.heap: list[tuple[float, int]] = []
+        # {id: (到期时间, 刷新间隔, 预计请求数)}, 与之不一致的堆条目已过期, 出队时跳过
+        self.entries: dict[int, tuple[float, float, int]] = {}
+        self.budget: AdaptiveTokenBucket | None = None
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_token: str | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    async def track(self, urls: list[str], cookie: str | None) -> list[dict]:
+        """解析并跟踪博主, 新跟踪的博主立即刷新一次; 返回每个链接的 {'url', 'id', 'sec_user_id', 'error'}"""
+        results = []
+        now = datetime.now()
+        for item in await dy_resolver_controller.resolve_many(urls):
+            if not item["sec_user_id"]:
+                results.append({"url": item["url"], "id": None, "sec_user_id": None, "error": item["error"]})
+                continue
+            creator, _ = await self.model.update_or_create(
+                defaults={"url": item["url"], "cookie": cookie, "enabled": True, "next_refresh_at": now},
+                dy_user_id=item["sec_user_id"],
+            )
+            results.append({"url": item["url"], "id": creator.id, "sec_user_id": creator.dy_user_id, "error": None})
+        # 本进程持有租约时立即调度, 否则由持有租约的进程在下次加载队列时发现
+        if self._wakeup:
+            self._wakeup.set()
+        return results
+
+    async def untrack(self, creator_ids: list[int]) -> int:
+        return await self.model.filter(id__in=creator_ids).update(enabled=False, next_refresh_at=None)
+
+    def _push(self, creator: DyTrackedCreatorModel) -> None:
+        if creator.next_refresh_at is None:
+            return
+        due_at = naive(creator.next_refresh_at)
+        full = needs_full_refresh(creator.last_full_refresh_at, due_at)
+        self._push_entry(
+            creator.id,
+            due_at.timestamp(),
+            creator.refresh_interval or settings.DY_REFRESH_MIN_INTERVAL,
+            refresh_cost(creator.videos, full),
+        )
+
+    def _push_entry(self, creator_id: int, due_at: float, interval: float, cost: int) -> None:
+        self.entries[creator_id] = (due_at, interval, cost)
+        heapq.heappush(self.heap, (due_at, creator_id))
+
+    async def _load(self) -> None:
+        """从数据库重建队列, 其他进程跟踪或取消跟踪的博主也能及时生效"""
+        self.heap, self.entries = [], {}
+        for creator in await self.model.filter(enabled=True, next_refresh_at__not_isnull=True).only(
+            "id", "next_refresh_at", "refresh_interval", "videos", "last_full_refresh_at"
+        ):
+            self._push(creator)
+
+    async def start_scheduler(self) -> None:
+        if not settings.DY_REFRESH_ENABLED:
+            return
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop_scheduler(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.lease_token:
+            # 主动释放租约, 其他进程不必等到租约过期就能接管
+            try:
+                await DySchedulerLeaseModel.filter(name=LEASE_NAME, lease_token=self.lease_token).update(
+                    holder=None, lease_token=None, lease_expires_at=None
+                )
+            except Exception as e:
+                logger.warning(f"release tracked creator scheduler lease failed: {e!r}")
+        self.lease_token = None
+        self.budget = None
+
+    async def hold_lease(self) -> bool:
+        """领取或续约调度器租约, 返回本进程是否持有租约"""
+        now = datetime.now()
+        await DySchedulerLeaseModel.get_or_create(name=LEASE_NAME)
+        claimable = Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now)
+        if self.lease_token:
+            claimable |= Q(lease_token=self.lease_token)
+        token = self.lease_token or uuid.uuid4().hex
+        held = await DySchedulerLeaseModel.filter(claimable, name=LEASE_NAME).update(
+            holder=self.worker_id,
+            lease_token=token,
+            lease_expires_at=now + timedelta(seconds=settings.DY_REFRESH_LEASE_TTL),
+        )
+        if held and not self.lease_token:
+            logger.info(f"{self.worker_id} took over the tracked creator scheduler")
+            rate = settings.DY_REFRESH_BUDGET / 3600
+            burst = max(settings.DY_REFRESH_BATCH * settings.DY_STATS_REFRESH_MAX_PAGES, 1)
+            self.budget = AdaptiveTokenBucket(rate, burst, min_rate=rate, max_rate=rate)
+        elif not held and self.lease_token:
+            logger.warning(f"{self.worker_id} lost the tracked creator scheduler lease")
+        if not held:
+            self.budget = None
+            self.heap, self.entries = [], {}
+        self.lease_token = token if held else None
+        return bool(held)
+
+    async def _run(self) -> None:
+        # 每个租约周期至少续约三次, 没有租约的进程按同样的间隔尝试接管
+        renew = settings.DY_REFRESH_LEASE_TTL / 3
+        while True:
+            try:
+                delay = renew
+                if await self.hold_lease():
+                    await self._load()
+                    delay = min(await self.tick(), renew)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("tracked creator refresh failed")
+                delay = renew
+            self._wakeup.clear()
+            try:
+                # 新跟踪的博主会提前唤醒
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def tick(self) -> float:
+        """调度一批到期的博主, 返回距离下一次调度的秒数"""
+        now = time.time()
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            due_at, creator_id = heapq.heappop(self.heap)
+            if self.entries.get(creator_id, (None,))[0] == due_at:
+                due.append(creator_id)
+        if not due:
+            return self.heap[0][0] - now if self.heap else settings.DY_REFRESH_MAX_INTERVAL
+        # 逾期的间隔数越多越优先, 增长快的博主间隔短, 逾期倍数涨得快
+        due.sort(key=lambda creator_id: (now - self.entries[creator_id][0]) / self.entries[creator_id][1], reverse=True)
+        selected = []
+        for creator_id in due[: settings.DY_REFRESH_BATCH]:
+            cost = self.entries[creator_id][2]
+            # 超过桶容量的全量刷新在桶满时放行, 超出的部分记为欠账, 之后的刷新等令牌补回
+            charge = min(cost, self.budget.burst)
+            if not self.budget.try_acquire(charge):
+                break
+            self.budget.tokens -= cost - charge
+            selected.append(creator_id)
+        # 没有预算的博主留在队列中, 下次调度时重新比较优先级
+        for creator_id in due[len(selected) :]:
+            heapq.heappush(self.heap, (self.entries[creator_id][0], creator_id))
+        if selected:
+            # 调度失败时博主的下次刷新时间没有更新, 下次加载队列时仍然到期
+            await self.schedule(selected)
+        if len(selected) < len(due):
+            charge = min(self.entries[due[len(selected)]][2], self.budget.burst)
+            return max(charge - self.budget.tokens, 1) / self.budget.rate
+        return max(self.heap[0][0] - time.time(), 0) if self.heap else settings.DY_REFRESH_MAX_INTERVAL
+
+    async def schedule(self, creator_ids: list[int]) -> None:
+        """
+        重新计算增长速度和下次刷新时间, 按 cookie 和模式分组创建刷新任务
+        以 refreshes 为版本号条件更新, 已被其他进程调度的博主跳过
+        """
+        now = datetime.now()
+        creators = await self.model.filter(id__in=creator_ids, enabled=True)
+        since = now - timedelta(days=settings.DY_STATS_REFRESH_DAYS)
+        dy_user_ids = [c.dy_user_id for c in creators]
+        stats = {
+            row["dy_user_id"]: row
+            for row in await DyVideoModel.filter(dy_user_id__in=dy_user_ids, publish_time__gte=since)
+            .annotate(likes=Sum("like_count"), comments=Sum("comment_count"), newest=Max("publish_time"))
+            .group_by("dy_user_id")
+            .values("dy_user_id", "likes", "comments", "newest")
+        }
+        videos = {
+            row["dy_user_id"]: row["videos"]
+            for row in await DyVideoModel.filter(dy_user_id__in=dy_user_ids)
+            .annotate(videos=Count("id"))
+            .group_by("dy_user_id")
+            .values("dy_user_id", "videos")
+        }
+        groups: dict[tuple[str | None, CrawlMode], list[str]] = {}
+        for creator in creators:
+            row = stats.get(creator.dy_user_id) or {}
+            engagement = int(row.get("likes") or 0) + int(row.get("comments") or 0)
+            # 第一次刷新的结果入库后才有可比较的基准
+            if creator.refreshes >= 2:
+                hours = max((now.timestamp() - naive(creator.last_scheduled_at).timestamp()) / 3600, 1 / 60)
+                # 作品移出统计窗口会使总数下降, 不计为负增长
+                creator.velocity = max(engagement - creator.engagement, 0) / hours
+            newest = row.get("newest")
+            interval = refresh_interval(
+                creator.velocity, now.timestamp() - naive(newest).timestamp() if newest else None
+            )
+            interval *= random.uniform(1 - settings.DY_REFRESH_JITTER, 1 + settings.DY_REFRESH_JITTER)
+            full = needs_full_refresh(creator.last_full_refresh_at, now)
+            fields = {
+                "engagement": engagement,
+                "velocity": creator.velocity,
+                "refresh_interval": interval,
+                "refreshes": creator.refreshes + 1,
+                "last_scheduled_at": now,
+                "next_refresh_at": now + timedelta(seconds=interval),
+                "videos": videos.get(creator.dy_user_id, 0),
+            }
+            if full:
+                fields["last_full_refresh_at"] = now
+            claimed = await self.model.filter(id=creator.id, enabled=True, refreshes=creator.refreshes).update(**fields)
+            if not claimed:
+                continue
+            creator.update_from_dict(fields)
+            self._push(creator)
+            mode = CrawlMode.FULL if full else CrawlMode.REFRESH
+            groups.setdefault((creator.cookie, mode), []).append(creator.url)
+        for (cookie, mode), urls in groups.items():
+            job = await dy_job_controller.enqueue(
+                CrawlJobType.VIDEO, {"urls": urls, "concurrency": None, "mode": mode}, cookie
+            )
+            logger.info(f"scheduled {mode} refresh job {job.id} for {len(urls)} tracked creators")
+
+
+dy_tracked_controller = DyTrackedCreatorController()
@@ -34,10 +34,13 @@ class AuthControl:
 class PermissionControl:
     @classmethod
     async def has_permission(cls, request: Request, current_user: User = Depends(AuthControl.is_authed)) -> None:
+        await cls.check(current_user, request.method, request.url.path)
+
+    @classmethod
+    async def check(cls, current_user: User, method: str, path: str) -> None:
+        """WebSocket 等无法使用 Request 依赖的接口直接调用"""
         if current_user.is_superuser:
             return
-        method = request.method
-        path = request.url.path
         roles: list[Role] = await current_user.roles
         if not roles:
             raise HTTPException(status_code=403, detail="The user is not bound to a role")
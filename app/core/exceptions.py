@@ -12,6 +12,24 @@ class SettingNotFound(Exception):
     pass
 
 
+class SpiderResponseError(Exception):
+    """抖音接口请求失败(超时/连接错误/限流/空响应/非 JSON/验证码等), 且已用尽重试预算"""
+
+    def __init__(self, outcome: str, url: str = "", status_code: int | None = None, attempts: int = 1):
+        self.outcome = outcome
+        self.url = url
+        self.status_code = status_code
+        self.attempts = attempts
+        super().__init__(f"{outcome} response after {attempts} attempts, status: {status_code}, url: {url}")
+
+
+class CookiePoolEmpty(Exception):
+    """没有指定 cookie, cookie 池中也没有启用的账号"""
+
+    def __init__(self):
+        super().__init__("no cookie given and no enabled account in cookie pool")
+
+
 async def DoesNotExistHandle(req: Request, exc: DoesNotExist) -> JSONResponse:
     content = dict(
         code=404,
@@ -0,0 +1,48 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+_STOP = object()
+
+
+class QueueWriter:
+    """
+    有界队列写入器: 生产者通过 put 提交数据, 由单个写入协程按到达顺序调用 write_func 落库
+    队列满时 put 会等待, 从而把内存占用限制在 maxsize 批数据以内
+    """
+
+    def __init__(self, write_func: Callable[[Any], Awaitable[Any]], maxsize: int = 8):
+        self.write_func = write_func
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.written = 0
+        self.error: BaseException | None = None
+        self._task: asyncio.Task | None = None
+
+    async def __aenter__(self) -> "QueueWriter":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # 无论生产者是否出错, 已经抓取到的数据都写完再退出
+        await self.queue.put(_STOP)
+        await self._task
+        if self.error is not None and exc is None:
+            raise self.error
+
+    async def put(self, item: Any) -> None:
+        if self.error is not None:
+            raise self.error
+        await self.queue.put(item)
+
+    async def _run(self) -> None:
+        while True:
+            item = await self.queue.get()
+            if item is _STOP:
+                return
+            if self.error is not None:
+                # 写入已失败, 继续消费队列避免生产者阻塞在 put 上
+                continue
+            try:
+                await self.write_func(item)
+                self.written += 1
+            except Exception as e:
+                self.error = e
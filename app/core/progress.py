@@ -0,0 +1,165 @@
+import asyncio
+import time
+from typing import Any, Iterable, Optional
+
+from app.core.cache import TTLCache
+from app.models.enums import CrawlJobStatus
+from app.settings import settings
+
+
+class ProgressSubscription:
+    """
+    单个订阅者: 只保留每个任务最新的一条事件, 两次推送至少间隔 interval 秒
+    爬取再快, 每个订阅者每个周期最多收到每个任务一条事件, 积压不随发布次数增长
+    """
+
+    def __init__(self, broker: "ProgressBroker", job_ids: Optional[Iterable[int]], interval: float):
+        self.broker = broker
+        self.interval = interval
+        self.job_ids: Optional[set[int]] = None
+        self._pending: dict[int, dict] = {}
+        self._changed = asyncio.Event()
+        self._last_sent = 0.0
+        self.follow(job_ids)
+
+    def follow(self, job_ids: Optional[Iterable[int]]) -> None:
+        """更换关注的任务, None 为全部任务; 新关注的任务立即补发当前进度"""
+        self.job_ids = set(job_ids) if job_ids is not None else None
+        self._pending = {job_id: event for job_id, event in self._pending.items() if self.wants(job_id)}
+        for event in self.broker.snapshot(self.job_ids):
+            self.offer(event)
+
+    def wants(self, job_id: int) -> bool:
+        return self.job_ids is None or job_id in self.job_ids
+
+    def offer(self, event: dict) -> None:
+        self._pending[event["job_id"]] = event
+        self._changed.set()
+
+    async def next_batch(self, timeout: Optional[float] = None) -> list[dict]:
+        """等待下一批事件, timeout 内没有事件时返回空列表(用于发送心跳)"""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        delay = self._last_sent + self.interval - time.monotonic()
+        if delay > 0:
+            # 等待期间到达的事件合并到同一批
+            await asyncio.sleep(delay)
+        self._changed.clear()
+        batch, self._pending = list(self._pending.values()), {}
+        self._last_sent = time.monotonic()
+        return batch
+
+    def close(self) -> None:
+        self.broker.subscribers.discard(self)
+
+    def __enter__(self) -> "ProgressSubscription":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ProgressBroker:
+    """
+    进程内的爬取进度发布/订阅: 任务执行时 publish 结构化进度, SSE/WebSocket 连接 subscribe 后接收
+    保留每个任务最新的进度, 新连接先收到当前进度; 结束的任务保留 ttl 秒后丢弃
+    """
+
+    def __init__(self, interval: float | None = None, ttl: float | None = None):
+        self.interval = settings.DY_PROGRESS_INTERVAL if interval is None else interval
+        self.subscribers: set[ProgressSubscription] = set()
+        self._latest = TTLCache(maxsize=1024, ttl=settings.DY_PROGRESS_TTL if ttl is None else ttl)
+
+    def publish(self, event: dict) -> None:
+        job_id = event["job_id"]
+        # 运行中的任务不过期, 结束后才开始计算 ttl
+        self._latest.set(job_id, event, ttl=None if event.get("finished_at") else float("inf"))
+        for subscriber in self.subscribers:
+            if subscriber.wants(job_id):
+                subscriber.offer(event)
+
+    def snapshot(self, job_ids: Optional[set[int]] = None) -> list[dict]:
+        return sorted(
+            (event for job_id, event in self._latest.items() if job_ids is None or job_id in job_ids),
+            key=lambda event: event["job_id"],
+        )
+
+    def subscribe(
+        self, job_ids: Optional[Iterable[int]] = None, interval: Optional[float] = None
+    ) -> ProgressSubscription:
+        subscription = ProgressSubscription(self, job_ids, self.interval if interval is None else interval)
+        self.subscribers.add(subscription)
+        return subscription
+
+
+class JobProgress:
+    """
+    汇总单个任务各目标(博主/视频)的进度, 计算速率和预计剩余时间后发布到 broker
+    targets 为 {目标: 最新进度}, 由爬虫的 on_progress 回调更新
+    """
+
+    def __init__(self, broker: ProgressBroker, job_id: int, job_type: str, total: int):
+        self.broker = broker
+        self.job_id = job_id
+        self.job_type = job_type
+        self.total = total
+        self.status = CrawlJobStatus.PENDING
+        self.targets: dict[str, dict] = {}
+        self.rows_written = 0
+        self.started = time.monotonic()
+
+    def update(self, key: str, progress: dict) -> None:
+        self.targets[key] = progress
+        self.publish()
+
+    def written(self, rows: int) -> None:
+        self.rows_written += rows
+        self.publish()
+
+    def set_status(self, status: str) -> None:
+        self.status = status
+        self.publish(finished=status in (CrawlJobStatus.SUCCEEDED, CrawlJobStatus.FAILED))
+
+    def fraction(self) -> float:
+        """已完成比例: 结束的目标计 1, 已知总数的进行中目标按已抓取的比例计"""
+        done = 0.0
+        for progress in self.targets.values():
+            if progress.get("done"):
+                done += 1
+            elif progress.get("total"):
+                done += min(progress["comments"] / progress["total"], 0.99)
+        return done / self.total if self.total else 0.0
+
+    def event(self, finished: bool = False) -> dict[str, Any]:
+        targets = self.targets.values()
+        elapsed = time.monotonic() - self.started
+        pages = sum(p.get("pages", 0) + p.get("comment_pages", 0) for p in targets)
+        rows = sum(p.get("count", 0) + p.get("comments", 0) + p.get("replies", 0) for p in targets)
+        fraction = self.fraction()
+        eta = elapsed * (1 - fraction) / fraction if 0 < fraction < 1 and not finished else None
+        return {
+            "job_id": self.job_id,
+            "job_type": self.job_type,
+            "status": self.status,
+            "total": self.total,
+            "finished": sum(1 for p in targets if p.get("done")),
+            "failed": sum(1 for p in targets if p.get("done") and p.get("error")),
+            "pages": pages,
+            "rows": rows,
+            "rows_written": self.rows_written,
+            "replies_pending": sum(p.get("pending_threads", 0) for p in targets),
+            "pages_per_sec": round(pages / elapsed, 2) if elapsed else 0.0,
+            "rows_per_sec": round(rows / elapsed, 2) if elapsed else 0.0,
+            "progress": round(1.0 if finished else fraction, 4),
+            "eta": round(eta, 1) if eta is not None else None,
+            "elapsed": round(elapsed, 3),
+            "finished_at": time.time() if finished else None,
+        }
+
+    def publish(self, finished: bool = False) -> None:
+        self.broker.publish(self.event(finished))
+
+
+progress_broker = ProgressBroker()
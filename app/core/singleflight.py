@@ -0,0 +1,101 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Optional
+
+from app.core.cache import TTLCache
+
+
+class _Flight:
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.task: asyncio.Future | None = None
+        self.listeners: list[Callable[[Any], Any]] = []
+        self.waiters = 0
+
+    def notify(self, event: Any) -> None:
+        for listener in list(self.listeners):
+            listener(event)
+
+
+class SingleFlight:
+    """
+    相同 key 的并发调用只执行一次: 后到的调用方挂到正在执行的调用上, 共享它的结果和进度
+    完成后 ttl 秒内的相同调用直接返回上次的结果(ttl=0 不复用), cacheable(result) 为 False 的结果不复用
+    所有调用方都被取消时才取消执行
+    """
+
+    def __init__(self, ttl: float = 0, maxsize: int = 1024, cacheable: Optional[Callable[[Any], bool]] = None):
+        self.ttl = ttl
+        self.fresh = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.cacheable = cacheable or (lambda result: True)
+        self._flights: dict[Hashable, _Flight] = {}
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[Callable[[Any], None]], Awaitable[Any]],
+        listener: Optional[Callable[[Any], Any]] = None,
+        reuse: Iterable[Hashable] = (),
+    ) -> tuple[Any, str]:
+        """
+        fn(notify) 返回实际执行的协程(或 future), notify(event) 把进度转发给所有调用方的 listener
+        reuse 为结果同样可用的其他 key(如全量抓取的结果可以代替增量抓取)
+        返回 (结果, 来源), 来源为 new(本次执行)/shared(共享正在执行的调用)/fresh(ttl 内的上次结果)
+        """
+        flight, source = self.attach(key, fn, listener, reuse)
+        if source == "fresh":
+            return flight, source
+        return await self.wait(flight, listener), source
+
+    def attach(
+        self,
+        key: Hashable,
+        fn: Callable[[Callable[[Any], None]], Awaitable[Any]],
+        listener: Optional[Callable[[Any], Any]] = None,
+        reuse: Iterable[Hashable] = (),
+    ) -> tuple[Any, str]:
+        """
+        do 的同步部分, 便于一次登记多个 key 后再统一执行: 返回 (上次的结果, fresh) 或 (_Flight, new/shared)
+        返回 _Flight 时调用方已计入等待者, 必须随后 await wait(flight, listener)
+        """
+        keys = (key, *reuse)
+        if self.ttl > 0:
+            for k in keys:
+                result = self.fresh.get(k)
+                if result is not None:
+                    return result, "fresh"
+        # 已完成或已取消、尚未执行完回调的调用不再共享
+        flight = next((f for f in map(self._flights.get, keys) if f is not None and not f.task.done()), None)
+        source = "shared"
+        if flight is None:
+            source = "new"
+            flight = self._flights[key] = _Flight(key)
+            flight.task = asyncio.ensure_future(fn(flight.notify))
+            flight.task.add_done_callback(lambda task: self._done(flight, task))
+        if listener:
+            flight.listeners.append(listener)
+        flight.waiters += 1
+        return flight, source
+
+    async def wait(self, flight: _Flight, listener: Optional[Callable[[Any], Any]] = None) -> Any:
+        try:
+            # shield: 单个调用方被取消时不影响其他等待同一调用的调用方
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if listener:
+                flight.listeners.remove(listener)
+            if flight.waiters == 0 and not flight.task.done():
+                # 立即移除, 取消生效前到达的相同调用重新执行而不是共享即将取消的调用
+                self._forget(flight)
+                flight.task.cancel()
+
+    def _forget(self, flight: _Flight) -> None:
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    def _done(self, flight: _Flight, task: asyncio.Future) -> None:
+        self._forget(flight)
+        if task.cancelled() or task.exception() is not None:
+            return
+        if self.ttl > 0 and self.cacheable(task.result()):
+            self.fresh.set(flight.key, task.result())
@@ -3,7 +3,7 @@ from tortoise import fields
 from app.schemas.menus import MenuType
 
 from .base import BaseModel, TimestampMixin
-from .enums import MethodType
+from .enums import CrawlJobStatus, CrawlJobType, MethodType
 
 
 class User(BaseModel, TimestampMixin):
@@ -112,8 +112,23 @@ class DyVideoModel(BaseModel, TimestampMixin):
         ordering = ["-publish_time"]  # 按 publish_time 降序排序
 
 
+class DyVideoStatsSnapshotModel(BaseModel):
+    # 只追加的统计数据时间序列, 不带 TimestampMixin, 按 (video_id, captured_at) 范围查询
+    video_id = fields.BigIntField(description="视频id")
+    captured_at = fields.DatetimeField(description="抓取时间")
+    comment_count = fields.IntField(default=0, description="评论数")
+    share_count = fields.IntField(default=0, description="分享数")
+    like_count = fields.IntField(default=0, description="喜欢数")
+    favorite_count = fields.IntField(default=0, description="收藏数")
+
+    class Meta:
+        table = "dyvideostatssnapshot"
+        indexes = (("video_id", "captured_at"),)
+
+
 class DyCommentModel(BaseModel, TimestampMixin):
     comment_id = fields.BigIntField(unique=True, description="评论ID")
+    aweme_id = fields.BigIntField(null=True, index=True, description="视频ID")
     content = fields.TextField(description="评论内容")
     image_url = fields.CharField(max_length=500, null=True, description="评论图片")
     digg_count = fields.IntField(default=0, description="点赞数")
@@ -123,7 +138,114 @@ class DyCommentModel(BaseModel, TimestampMixin):
     dy_user_id = fields.CharField(max_length=100, null=True, description="用户抖音号")
     ip_location = fields.CharField(max_length=100, default='未知', description="ip归属")
     reply_comment_id = fields.BigIntField(null=True, description="回复的评论ID")
+    reply_comment_total = fields.IntField(default=0, description="回复数")
 
     class Meta:
         table = "dycomment"
         ordering = ["-comment_time"]  # 按评论时间降序排序
+
+
+class DyCommentCheckpointModel(BaseModel, TimestampMixin):
+    aweme_id = fields.BigIntField(unique=True, description="视频ID")
+    cursor = fields.BigIntField(default=0, description="下一页评论的游标")
+    comments_done = fields.BooleanField(default=False, description="评论是否已翻完")
+    done = fields.BooleanField(default=False, description="评论和回复是否全部抓取完成")
+
+    class Meta:
+        table = "dycommentcheckpoint"
+
+
+class DyReplyThreadModel(BaseModel, TimestampMixin):
+    comment_id = fields.BigIntField(unique=True, description="评论ID")
+    aweme_id = fields.BigIntField(index=True, description="视频ID")
+    reply_total = fields.IntField(default=0, description="抓取完成时的回复数")
+
+    class Meta:
+        table = "dyreplythread"
+
+
+class DyCreatorWatermarkModel(BaseModel, TimestampMixin):
+    dy_user_id = fields.CharField(max_length=255, unique=True, description="抖音用户id")
+    last_aweme_id = fields.BigIntField(null=True, description="已抓取的最新视频id")
+    last_publish_time = fields.DatetimeField(null=True, description="已抓取的最新发布时间")
+    last_crawled_at = fields.DatetimeField(null=True, description="最近一次抓取时间")
+
+    class Meta:
+        table = "dycreatorwatermark"
+
+
+class DyResolveCacheModel(BaseModel, TimestampMixin):
+    url_hash = fields.CharField(max_length=64, unique=True, description="分享链接sha256")
+    share_url = fields.CharField(max_length=1000, description="分享链接")
+    sec_user_id = fields.CharField(max_length=255, description="抖音用户id")
+    expires_at = fields.DatetimeField(description="过期时间", index=True)
+
+    class Meta:
+        table = "dyresolvecache"
+
+
+class DyCrawlJobModel(BaseModel, TimestampMixin):
+    job_type = fields.CharEnumField(CrawlJobType, description="任务类型", index=True)
+    status = fields.CharEnumField(CrawlJobStatus, default=CrawlJobStatus.PENDING, description="任务状态", index=True)
+    params = fields.JSONField(description="任务参数")
+    cookie = fields.TextField(null=True, description="抖音cookie, 为空时从cookie池租用")
+    total = fields.IntField(default=0, description="博主/视频数")
+    finished = fields.IntField(default=0, description="已完成的博主/视频数")
+    failed = fields.IntField(default=0, description="失败的博主/视频数")
+    rows = fields.IntField(default=0, description="抓取的数据条数")
+    result = fields.JSONField(null=True, description="每个博主/视频的抓取结果")
+    error = fields.TextField(null=True, description="错误信息")
+    started_at = fields.DatetimeField(null=True, description="开始时间")
+    finished_at = fields.DatetimeField(null=True, description="结束时间")
+    elapsed = fields.FloatField(null=True, description="耗时(秒)")
+    worker = fields.CharField(max_length=255, null=True, description="执行任务的 worker")
+    lease_token = fields.CharField(max_length=32, null=True, description="本次领取的租约标识")
+    lease_expires_at = fields.DatetimeField(null=True, description="租约到期时间", index=True)
+    attempts = fields.IntField(default=0, description="已领取执行的次数")
+    progress = fields.JSONField(null=True, description="最近一次心跳时的进度")
+
+    class Meta:
+        table = "dycrawljob"
+
+
+class DyTrackedCreatorModel(BaseModel, TimestampMixin):
+    url = fields.CharField(max_length=1000, description="博主主页链接")
+    dy_user_id = fields.CharField(max_length=255, unique=True, description="抖音用户id")
+    cookie = fields.TextField(null=True, description="刷新使用的抖音cookie, 为空时从cookie池租用")
+    enabled = fields.BooleanField(default=True, description="是否定时刷新", index=True)
+    engagement = fields.BigIntField(default=0, description="上次调度时近期作品的点赞数+评论数")
+    velocity = fields.FloatField(default=0, description="近期作品每小时新增的点赞数+评论数")
+    refresh_interval = fields.FloatField(null=True, description="当前刷新间隔(秒)")
+    refreshes = fields.IntField(default=0, description="已调度的刷新次数")
+    last_scheduled_at = fields.DatetimeField(null=True, description="最近一次调度时间")
+    next_refresh_at = fields.DatetimeField(null=True, description="下次刷新时间", index=True)
+    videos = fields.IntField(default=0, description="上次调度时已入库的作品数")
+    last_full_refresh_at = fields.DatetimeField(null=True, description="最近一次调度全量刷新的时间")
+
+    class Meta:
+        table = "dytrackedcreator"
+
+
+class DySchedulerLeaseModel(BaseModel, TimestampMixin):
+    name = fields.CharField(max_length=64, unique=True, description="调度器名称")
+    holder = fields.CharField(max_length=255, null=True, description="持有租约的进程")
+    lease_token = fields.CharField(max_length=32, null=True, description="本次领取的租约标识")
+    lease_expires_at = fields.DatetimeField(null=True, description="租约到期时间")
+
+    class Meta:
+        table = "dyschedulerlease"
+
+
+class DyCookieAccountModel(BaseModel, TimestampMixin):
+    cookie = fields.TextField(description="抖音cookie")
+    cookie_key = fields.CharField(max_length=32, unique=True, description="cookie标识")
+    enabled = fields.BooleanField(default=True, description="是否启用", index=True)
+    max_concurrency = fields.IntField(null=True, description="同时租用的上限, 为空使用DY_COOKIE_CONCURRENCY")
+    health = fields.FloatField(default=1.0, description="健康度, 0~1")
+    cooldown_until = fields.DatetimeField(null=True, description="冷却结束时间")
+    requests = fields.BigIntField(default=0, description="请求数")
+    failures = fields.IntField(default=0, description="验证码/空响应等失败次数")
+    last_error = fields.CharField(max_length=32, null=True, description="最近一次失败类型")
+
+    class Meta:
+        table = "dycookieaccount"
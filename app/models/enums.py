@@ -17,3 +17,21 @@ class MethodType(StrEnum):
     PUT = "PUT"
     DELETE = "DELETE"
     PATCH = "PATCH"
+
+
+class CrawlMode(StrEnum):
+    FULL = "full"  # 全量翻页
+    INCREMENTAL = "incremental"  # 翻页到上次抓取的水位线为止
+    REFRESH = "refresh"  # 只刷新近期作品的统计数据
+
+
+class CrawlJobType(StrEnum):
+    VIDEO = "video"  # 博主作品
+    COMMENTS = "comments"  # 视频评论
+
+
+class CrawlJobStatus(StrEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
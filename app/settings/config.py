@@ -92,5 +92,88 @@ class Settings(BaseSettings):
     }
     DATETIME_FORMAT: str = "%Y-%m-%d %H:%M:%S"
 
+    # 抖音爬虫配置
+    DY_BASE_URL: str = "https://www.douyin.com"  # 基准测试时指向本地回放服务
+    DY_CRAWL_CONCURRENCY: int = 8  # 同时爬取的博主数量
+    DY_JOB_WORKERS: int = 2  # 每个进程同时执行的爬取任务数, API 进程设为 0 时只由 worker.py 执行
+    DY_JOB_LEASE_TTL: int = 60  # 任务租约时长(秒), 到期未续约的任务由其他 worker 接管
+    DY_JOB_HEARTBEAT: int = 15  # 执行中的任务续约间隔(秒)
+    DY_JOB_POLL_INTERVAL: float = 2.0  # 空闲 worker 查询新任务的间隔(秒)
+    DY_JOB_MAX_ATTEMPTS: int = 3  # 任务最多被领取执行的次数(服务关闭时主动释放的不计入), 超过后标记为失败
+    DY_CRAWL_FRESH_TTL: int = 60 * 5  # 同一博主/视频抓取完成后多久内的重复请求直接返回上次结果(秒), 0 为不复用
+    DY_WRITER_QUEUE_SIZE: int = 8  # 等待写库的最大页数
+    DY_PROGRESS_INTERVAL: float = 1.0  # 进度推送的最小间隔(秒), 间隔内的进度合并为一条
+    DY_PROGRESS_TTL: float = 600  # 任务结束后保留最新进度的时间(秒)
+    DY_STATS_REFRESH_DAYS: int = 7  # refresh 模式只刷新最近 N 天发布的作品
+    DY_STATS_REFRESH_MAX_PAGES: int = 2  # refresh 模式每个博主最多翻页数
+    # 跟踪博主的定时刷新
+    DY_REFRESH_ENABLED: bool = True
+    DY_REFRESH_MIN_INTERVAL: int = 60 * 10  # 最短刷新间隔(秒)
+    DY_REFRESH_MAX_INTERVAL: int = 60 * 60 * 24  # 近期没有作品的博主的刷新间隔(秒)
+    DY_REFRESH_HOT_VELOCITY: float = 1000.0  # 近期作品每小时新增点赞+评论达到该值时刷新间隔减半
+    DY_REFRESH_JITTER: float = 0.2  # 刷新间隔随机浮动比例, 避免大量博主同时到期
+    DY_REFRESH_BUDGET: int = 600  # 定时刷新每小时最多使用的请求数
+    DY_REFRESH_BATCH: int = 20  # 每个刷新任务最多包含的博主数
+    DY_REFRESH_FULL_INTERVAL: int = 60 * 60 * 24 * 7  # 每个博主全量刷新的间隔(秒), 覆盖 refresh 模式翻不到的老作品
+    DY_REFRESH_LEASE_TTL: int = 60  # 调度器租约时长(秒), 多个进程中只有持有租约的进程调度刷新
+    DY_RESOLVE_CACHE_TTL: int = 60 * 60 * 24 * 30  # 分享链接 -> sec_user_id 缓存有效期(秒)
+    DY_RESOLVE_CACHE_SIZE: int = 10000  # 进程内缓存的最大条目数
+    DY_COMMENT_CONCURRENCY: int = 16  # 进程内同时进行的评论/回复请求数
+    DY_COMMENT_COOKIE_CONCURRENCY: int = 10  # 同一 cookie 同时进行的评论/回复请求数
+    DY_REPLY_WORKERS: int = 10  # 抓取回复的 worker 数量
+    DY_REPLY_QUEUE_SIZE: int = 1000  # 等待抓取回复的评论数上限
+    DY_COMMENT_UPSERT_CHUNK: int = 500  # 评论每批写库的条数
+    DY_COMMENT_CHECKPOINT_THREADS: int = 100  # 每完成多少个回复保存一次检查点
+    DY_COMMENT_STALE_PAGES: int = 2  # 增量抓取时连续多少页没有变化就停止翻页
+    # cookie 池
+    DY_COOKIE_CONCURRENCY: int = 2  # cookie 池中每个账号同时被租用的次数(同时爬取的博主/视频数)
+    DY_COOKIE_HEALTH_PENALTY: dict = {  # 各类异常响应扣减的健康度, 成功请求恢复 DY_COOKIE_HEALTH_RECOVER
+        "captcha": 0.4,
+        "empty": 0.2,
+        "invalid": 0.2,
+        "throttled": 0.1,
+    }
+    DY_COOKIE_HEALTH_RECOVER: float = 0.02
+    DY_COOKIE_MIN_HEALTH: float = 0.3  # 健康度低于该值的账号进入冷却
+    DY_COOKIE_COOLDOWN: float = 60 * 10  # 冷却时长(秒), 连续冷却时翻倍, 最多 16 倍
+    DY_COOKIE_ROTATE_ATTEMPTS: int = 2  # 租用的账号进入冷却导致博主/视频失败时换账号重试的次数
+    DY_COOKIE_SYNC_INTERVAL: float = 30  # 与数据库同步账号和健康度的间隔(秒)
+    # 自适应限流, 单位: 请求/秒
+    DY_RATE_LIMIT_HOST: float = 5.0  # 每个 host 的初始速率
+    DY_RATE_LIMIT_HOST_MAX: float = 20.0
+    DY_RATE_LIMIT_COOKIE: float = 1.5  # 每个 cookie 的初始速率
+    DY_RATE_LIMIT_COOKIE_MAX: float = 5.0
+    DY_RATE_LIMIT_MIN: float = 0.2  # 被限流后最低降到的速率
+    DY_RATE_LIMIT_BURST: int = 3
+    # 按错误类型的重试次数, 未列出的类型(如 4xx)不重试
+    DY_RETRY_BUDGETS: dict = {
+        "timeout": 3,
+        "connect": 3,
+        "server": 3,
+        "throttled": 5,
+        "captcha": 2,
+        "empty": 3,
+        "invalid": 2,
+    }
+    DY_RETRY_BASE_DELAY: float = 0.5  # 退避基础间隔(秒)
+    DY_RETRY_MAX_DELAY: float = 30.0
+    DY_BREAKER_FAILURE_THRESHOLD: int = 10  # 同一 host 连续失败多少次后熔断
+    DY_BREAKER_RESET_TIMEOUT: float = 60.0  # 熔断后暂停多久再探测(秒)
+
+    # 爬虫共享 HTTP 连接池
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE: int = 20
+    HTTP_CLIENT_KEEPALIVE_EXPIRY: float = 30.0  # 空闲连接保留时间(秒)
+    HTTP_CLIENT_HTTP2: bool = False  # 需要安装 h2: pip install httpx[http2]
+    HTTP_CLIENT_TIMEOUT: float = 60.0
+    HTTP_CLIENT_CONNECT_TIMEOUT: float = 10.0
+
+    # a_bogus 签名: 常驻 node 进程数量, 单次签名超时(秒)
+    DY_SIGN_WORKERS: int = 2
+    DY_SIGN_TIMEOUT: float = 10.0
+    # 按 cookie 缓存 webid 等设备参数(秒), 获取失败时缓存较短时间后重试
+    DY_DEVICE_PARAMS_TTL: int = 60 * 60 * 6
+    DY_DEVICE_PARAMS_RETRY_TTL: int = 60
+
 
 settings = Settings()
@@ -0,0 +1,92 @@
+"""
+作品解析微基准: 对比旧的 response.json() + 逐字段索引构建 dict, 与 orjson + AwemeRecord 单次遍历提取
+python -m app.spiders.benchmarks.bench_extract --pages 50 --rounds 20
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+
+from app.spiders.benchmarks.fixtures import aweme_pages
+from app.spiders.dy_video_claw.extract import extract_page
+from app.spiders.fetch import json_loads
+
+
+def legacy_extract_page(body: bytes, sec_user_id: str) -> list[dict]:
+    """改造前 DouyinVideo.parse 中的解析逻辑(去掉 print)"""
+    result = json.loads(body)
+    data = []
+    for i in range(len(result["aweme_list"])):
+        video_url = result["aweme_list"][i]["share_url"]
+        download_url = ""
+        type = "视频"
+        try:
+            download_uri = result["aweme_list"][i]["video"]["play_addr"]["uri"]
+            download_url = f"https://api.amemv.com/aweme/v1/play/?video_id={download_uri}&line=1&ratio=360p"
+        except Exception:
+            type = "图文"
+        duration = round(result["aweme_list"][i]["video"]["duration"] / 1000)
+        if duration == 0:
+            type = "图文"
+        desc = result["aweme_list"][i]["desc"]
+        parts = desc.split("#")
+        data.append(
+            {
+                "name": result["aweme_list"][i]["author"]["nickname"],
+                "video_url": video_url,
+                "download_url": download_url,
+                "video_id": int(result["aweme_list"][i]["aweme_id"]),
+                "title": parts[0].strip(),
+                "tags": ", ".join([tag.strip() for tag in parts[1:] if tag.strip()]),
+                "type": type,
+                "comment_count": result["aweme_list"][i]["statistics"]["comment_count"],
+                "share_count": result["aweme_list"][i]["statistics"]["share_count"],
+                "like_count": result["aweme_list"][i]["statistics"]["digg_count"],
+                "favorite_count": result["aweme_list"][i]["statistics"]["collect_count"],
+                "duration": duration,
+                "publish_time": datetime.fromtimestamp(result["aweme_list"][i]["create_time"]),
+                "dy_user_id": sec_user_id,
+            }
+        )
+    return data
+
+
+def fast_extract_page(body: bytes, sec_user_id: str) -> list:
+    return extract_page(json_loads(body), sec_user_id)
+
+
+def run(func, pages: list[bytes], rounds: int) -> float:
+    """返回最快一轮的耗时, 与 timeit 一样排除 GC 和机器抖动的影响"""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for body in pages:
+            func(body, "MS4wLjABAAAAtest")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = aweme_pages(pages=args.pages)
+    size = sum(len(body) for body in pages)
+    rows = sum(len(fast_extract_page(body, "MS4wLjABAAAAtest")) for body in pages)
+    print(f"{len(pages)} pages, {rows} rows, {size / 1024:.0f} KiB, best of {args.rounds} rounds")
+    baseline = None
+    # decode 只做 JSON 解码, 是 extract 的下限
+    for name, func in (
+        ("legacy", legacy_extract_page),
+        ("extract", fast_extract_page),
+        ("decode", lambda body, sec_user_id: json_loads(body)),
+    ):
+        elapsed = run(func, pages, args.rounds)
+        baseline = baseline or elapsed
+        print(f"{name:>8}: {elapsed * 1000:.1f}ms  {rows / elapsed:,.0f} rows/s  x{baseline / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+a_bogus 签名基准: 对比 execjs 每次调用启动 node 进程, 与常驻进程池的单次签名、并发签名和批量签名
+python -m app.spiders.benchmarks.bench_sign --count 200 --workers 2
+"""
+import argparse
+import asyncio
+import time
+
+import execjs
+
+from app.spiders.dy_comments_claw.common import COMMON_HEADERS, COMMON_PARAMS
+from app.spiders.dy_comments_claw.signer import DOUYIN_JS, SignerPool
+
+QUERY = "&".join(f"{k}={v}" for k, v in {**COMMON_PARAMS, "aweme_id": "7439138051776924978", "cursor": 0}.items())
+USER_AGENT = COMMON_HEADERS["User-Agent"]
+
+
+def report(name: str, count: int, elapsed: float, baseline: float | None) -> float:
+    rate = count / elapsed
+    print(f"{name:>12}: {elapsed:.3f}s  {rate:,.0f} signatures/s" + (f"  x{rate / baseline:.1f}" if baseline else ""))
+    return rate
+
+
+async def bench(count: int, execjs_count: int, workers: int):
+    with open(DOUYIN_JS, encoding="utf-8") as f:
+        ctx = execjs.compile(f.read())
+    start = time.perf_counter()
+    for _ in range(execjs_count):
+        ctx.call("sign_datail", QUERY, USER_AGENT)
+    baseline = report("execjs", execjs_count, time.perf_counter() - start, None)
+
+    pool = SignerPool(size=workers)
+    await pool.sign(QUERY, USER_AGENT)  # 预热, 不计入启动耗时
+    start = time.perf_counter()
+    for _ in range(count):
+        await pool.sign(QUERY, USER_AGENT)
+    report("sequential", count, time.perf_counter() - start, baseline)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[pool.sign(QUERY, USER_AGENT, reply=i % 2 == 1) for i in range(count)])
+    report("concurrent", count, time.perf_counter() - start, baseline)
+
+    start = time.perf_counter()
+    signatures = await pool.sign_many([(QUERY, USER_AGENT, i % 2 == 1) for i in range(count)])
+    report("batch", len(signatures), time.perf_counter() - start, baseline)
+    await pool.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--execjs-count", type=int, default=20, help="execjs 较慢, 单独设置次数")
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(bench(args.count, args.execjs_count, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+基准测试使用的接口响应
+优先读取 recordings 目录下录制的真实响应(aweme_post_*.json, comment_list_*.json, comment_reply_*.json),
+没有录制数据时按真实响应结构生成
+"""
+import glob
+import json
+import os
+import random
+import time
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(__file__), "recordings")
+
+
+def load_recordings(prefix: str) -> list[bytes]:
+    pages = []
+    for path in sorted(glob.glob(os.path.join(RECORDINGS_DIR, f"{prefix}_*.json"))):
+        with open(path, "rb") as f:
+            pages.append(f.read())
+    return pages
+
+
+def make_aweme(index: int, create_time: int) -> dict:
+    return {
+        "aweme_id": str(7400000000000000000 + index),
+        "desc": f"作品标题 {index} #标签{index % 7} #抖音 #热门",
+        "create_time": create_time,
+        "share_url": f"https://www.iesdouyin.com/share/video/{7400000000000000000 + index}/",
+        "is_top": 0,
+        "author": {"nickname": "测试博主", "uid": "100000", "sec_uid": "MS4wLjABAAAAtest"},
+        "video": {
+            "duration": 15000 + index % 60 * 1000,
+            "play_addr": {"uri": f"v0200fg10000{index:012d}", "url_list": [f"https://example.com/{index}.mp4"] * 3},
+            "cover": {"url_list": [f"https://example.com/{index}.jpg"] * 3},
+            "width": 1080,
+            "height": 1920,
+        },
+        "statistics": {
+            "comment_count": random.randint(0, 10000),
+            "share_count": random.randint(0, 10000),
+            "digg_count": random.randint(0, 1000000),
+            "collect_count": random.randint(0, 10000),
+            "play_count": 0,
+        },
+        "text_extra": [{"hashtag_name": f"标签{index % 7}"}, {"hashtag_name": "抖音"}],
+        "video_tag": [{"tag_id": 1, "tag_name": "生活", "level": 1}],
+    }
+
+
+def make_aweme_page(page: int, page_size: int = 18, pages: int = 10) -> bytes:
+    """第 page 页(从 0 开始)的 aweme/post 响应, 作品按发布时间倒序"""
+    now = int(time.time())
+    start = page * page_size
+    aweme_list = [make_aweme(i, now - i * 3600) for i in range(start, start + page_size)]
+    return json.dumps(
+        {
+            "status_code": 0,
+            "aweme_list": aweme_list,
+            "has_more": 1 if page + 1 < pages else 0,
+            "max_cursor": (now - (start + page_size) * 3600) * 1000,
+        },
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+
+def aweme_pages(pages: int = 10, page_size: int = 18) -> list[bytes]:
+    return load_recordings("aweme_post") or [make_aweme_page(i, page_size, pages) for i in range(pages)]
+
+
+def make_comment(cid: int, create_time: int, reply_total: int = 0, reply_id: str = "0") -> dict:
+    return {
+        "cid": str(cid),
+        "text": f"评论内容 {cid} 这是一条用于基准测试的评论",
+        "aweme_id": "7439138051776924978",
+        "create_time": create_time,
+        "digg_count": random.randint(0, 5000),
+        "status": 1,
+        "user": {
+            "uid": str(100000 + cid % 1000),
+            "nickname": f"用户{cid % 1000}",
+            "sec_uid": f"MS4wLjABAAAA{cid % 1000:08d}",
+            "unique_id": f"dy{cid % 1000}",
+            "signature": "个性签名",
+            "avatar_thumb": {"url_list": ["https://example.com/avatar.jpg"] * 3},
+        },
+        "reply_id": reply_id,
+        "reply_comment_total": reply_total,
+        "reply_to_reply_id": "0",
+        "image_list": None,
+        "ip_label": "重庆",
+        "is_author_digged": False,
+    }
+
+
+def make_comment_page(cursor: int, count: int, total: int, reply_every: int = 5, replies: int = 12) -> bytes:
+    """comment/list 响应, 每 reply_every 条评论中有一条带 replies 条回复"""
+    now = int(time.time())
+    end = min(cursor + count, total)
+    comments = [
+        make_comment(8000000000000000000 + i, now - i * 60, replies if reply_every and i % reply_every == 0 else 0)
+        for i in range(cursor, end)
+    ]
+    return json.dumps(
+        {"status_code": 0, "comments": comments, "cursor": end, "has_more": 1 if end < total else 0, "total": total},
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+
+def make_reply_page(comment_id: str, cursor: int, count: int, total: int) -> bytes:
+    now = int(time.time())
+    end = min(cursor + count, total)
+    base = int(comment_id) * 1000 % 10**18
+    comments = [make_comment(base + i, now - i * 30, reply_id=comment_id) for i in range(cursor, end)]
+    return json.dumps(
+        {"status_code": 0, "comments": comments, "cursor": end, "has_more": 1 if end < total else 0, "total": total},
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+
+# 首页中用于提取 webid 的片段
+HOMEPAGE = '<html><script>self.__pace_f.push([1,"{\\"user_unique_id\\":\\"7378325321550546458\\"}"])</script></html>'
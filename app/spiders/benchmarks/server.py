@@ -0,0 +1,129 @@
+"""
+本地回放服务: 模拟抖音 aweme/post、comment/list、comment/list/reply 和首页, 支持配置延迟和错误率
+python -m app.spiders.benchmarks.server --port 8765 --latency 0.05 --error-rate 0.02
+爬虫设置 DY_BASE_URL=http://127.0.0.1:8765 即可离线运行
+"""
+import argparse
+import asyncio
+import json
+import random
+from collections import Counter
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, JSONResponse, Response
+from starlette.routing import Route
+
+from app.spiders.benchmarks import fixtures
+
+
+def _paginate(recorded: list[bytes], index: int, cursor_field: str) -> bytes:
+    """回放第 index 页录制的响应, 改写游标使爬虫按录制顺序翻页"""
+    data = json.loads(recorded[index % len(recorded)])
+    data[cursor_field] = index + 1
+    data["has_more"] = 1 if index + 1 < len(recorded) else 0
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+def create_replay_app(
+    latency: float = 0.05,
+    jitter: float = 0.5,
+    error_rate: float = 0.0,
+    aweme_pages: int = 20,
+    comments: int = 1000,
+    reply_every: int = 5,
+    replies: int = 12,
+) -> Starlette:
+    stats: Counter = Counter()
+    recorded_posts = fixtures.load_recordings("aweme_post")
+    recorded_comments = fixtures.load_recordings("comment_list")
+    recorded_replies = fixtures.load_recordings("comment_reply")
+
+    async def simulate(name: str) -> Response | None:
+        """模拟网络延迟, 按 error_rate 随机返回 500/429/空响应"""
+        stats[f"{name}_requests"] += 1
+        if latency:
+            await asyncio.sleep(latency * random.uniform(1 - jitter, 1 + jitter))
+        if error_rate and random.random() < error_rate:
+            stats[f"{name}_errors"] += 1
+            return random.choice([Response(status_code=500), Response(status_code=429), Response(b"")])
+        return None
+
+    def json_response(body: bytes) -> Response:
+        return Response(body, media_type="application/json")
+
+    async def aweme_post(request: Request):
+        if error := await simulate("aweme_post"):
+            return error
+        index = int(request.query_params.get("max_cursor", 0))
+        # 合成数据的 max_cursor 是时间戳, 这里统一按页码翻页
+        index = index if index < aweme_pages else 0
+        if recorded_posts:
+            return json_response(_paginate(recorded_posts, index, "max_cursor"))
+        body = json.loads(fixtures.make_aweme_page(index, pages=aweme_pages))
+        body["max_cursor"] = index + 1
+        return JSONResponse(body)
+
+    async def comment_list(request: Request):
+        if error := await simulate("comment_list"):
+            return error
+        cursor = int(request.query_params.get("cursor", 0))
+        count = int(request.query_params.get("count", 50))
+        if recorded_comments:
+            return json_response(_paginate(recorded_comments, cursor, "cursor"))
+        return json_response(fixtures.make_comment_page(cursor, count, comments, reply_every, replies))
+
+    async def comment_reply(request: Request):
+        if error := await simulate("comment_reply"):
+            return error
+        cursor = int(request.query_params.get("cursor", 0))
+        count = int(request.query_params.get("count", 50))
+        if recorded_replies:
+            return json_response(_paginate(recorded_replies, cursor, "cursor"))
+        comment_id = request.query_params.get("comment_id", "0")
+        return json_response(fixtures.make_reply_page(comment_id, cursor, count, replies))
+
+    async def homepage(request: Request):
+        stats["homepage_requests"] += 1
+        return HTMLResponse(fixtures.HOMEPAGE)
+
+    async def get_stats(request: Request):
+        return JSONResponse(dict(stats))
+
+    return Starlette(
+        routes=[
+            Route("/aweme/v1/web/aweme/post/", aweme_post),
+            Route("/aweme/v1/web/comment/list/", comment_list),
+            Route("/aweme/v1/web/comment/list/reply/", comment_reply),
+            Route("/", homepage),
+            Route("/__stats", get_stats),
+        ]
+    )
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="平均响应延迟(秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机错误响应的比例")
+    parser.add_argument("--aweme-pages", type=int, default=20)
+    parser.add_argument("--comments", type=int, default=1000)
+    parser.add_argument("--reply-every", type=int, default=5, help="每 N 条评论中有一条带回复")
+    parser.add_argument("--replies", type=int, default=12, help="带回复的评论的回复数")
+    args = parser.parse_args()
+    app = create_replay_app(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        aweme_pages=args.aweme_pages,
+        comments=args.comments,
+        reply_every=args.reply_every,
+        replies=args.replies,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
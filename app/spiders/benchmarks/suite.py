@@ -0,0 +1,208 @@
+"""
+离线基准测试: 启动本地回放服务, 把 DY_BASE_URL 指向它, 分别跑作品、评论、回复爬虫
+每个爬虫在独立子进程中运行, 报告 pages/s、rows/s、峰值内存(RSS)和事件循环延迟
+python -m app.spiders.benchmarks.suite --latency 0.05 --error-rate 0.02 --comments 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+SPIDERS = ("video", "comments", "replies")
+BENCH_COOKIE = "sessionid=bench; s_v_web_id=verify_bench; dy_swidth=1920; dy_sheight=1080"
+
+
+class LoopLagMonitor:
+    """定时 sleep 并记录实际唤醒的延迟, 反映事件循环被同步代码阻塞的程度"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(time.perf_counter() - start - self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> dict:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        samples = sorted(self.samples) or [0.0]
+        return {
+            "lag_mean_ms": sum(samples) / len(samples) * 1000,
+            "lag_p99_ms": samples[int(len(samples) * 0.99) - 1 if len(samples) > 1 else 0] * 1000,
+            "lag_max_ms": samples[-1] * 1000,
+        }
+
+
+async def run_spider(spider: str, base_url: str) -> dict:
+    from app.spiders.client import http_clients
+    from app.spiders.dy_comments_claw.main import (
+        fetch_all_comments_async,
+        fetch_all_replies_async,
+    )
+    from app.spiders.dy_video_claw.dy_video_claw import DouyinVideo, format_cookie
+
+    async def server_stats() -> dict:
+        async with httpx.AsyncClient() as client:
+            return (await client.get(f"{base_url}/__stats")).json()
+
+    comments = []
+    if spider == "replies":
+        # 回复依赖评论列表, 评论部分不计入耗时
+        comments = await fetch_all_comments_async("7439138051776924978", BENCH_COOKIE)
+
+    before = await server_stats()
+    monitor = LoopLagMonitor()
+    monitor.start()
+    start = time.perf_counter()
+    if spider == "video":
+        rows = 0
+        async for page in DouyinVideo().parse("MS4wLjABAAAAtest", format_cookie(BENCH_COOKIE)):
+            rows += len(page)
+        endpoint = "aweme_post"
+    elif spider == "comments":
+        rows = len(await fetch_all_comments_async("7439138051776924978", BENCH_COOKIE))
+        endpoint = "comment_list"
+    else:
+        rows = len(await fetch_all_replies_async(comments, BENCH_COOKIE))
+        endpoint = "comment_reply"
+    elapsed = time.perf_counter() - start
+    lag = await monitor.stop()
+    after = await server_stats()
+    await http_clients.aclose()
+
+    requests = after.get(f"{endpoint}_requests", 0) - before.get(f"{endpoint}_requests", 0)
+    errors = after.get(f"{endpoint}_errors", 0) - before.get(f"{endpoint}_errors", 0)
+    return {
+        "spider": spider,
+        "elapsed": elapsed,
+        "requests": requests,
+        "errors": errors,
+        "pages": requests - errors,
+        "rows": rows,
+        "pages_per_sec": (requests - errors) / elapsed,
+        "rows_per_sec": rows / elapsed,
+        # Linux 下 ru_maxrss 单位为 KB
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        **lag,
+    }
+
+
+def child_env(base_url: str, rate_limited: bool) -> dict:
+    """
+    子进程的配置通过环境变量传入: python -m 启动时会先导入 app 包,
+    导入时创建的单例(如 retry_policy)已经读取了配置, 之后再修改 settings 不会生效
+    """
+    overrides = {"DY_BASE_URL": base_url, "DY_RETRY_BASE_DELAY": "0.01", "DY_RETRY_MAX_DELAY": "0.1"}
+    if not rate_limited:
+        # 只测爬虫自身的吞吐, 放开限速
+        for name in (
+            "DY_RATE_LIMIT_HOST",
+            "DY_RATE_LIMIT_HOST_MAX",
+            "DY_RATE_LIMIT_COOKIE",
+            "DY_RATE_LIMIT_COOKIE_MAX",
+            "DY_RATE_LIMIT_BURST",
+        ):
+            overrides[name] = "10000"
+    return {**os.environ, **overrides}
+
+
+def child_main(args):
+    result = asyncio.run(run_spider(args.child, args.base_url))
+    print(json.dumps(result))
+
+
+def wait_for_port(host: str, port: int, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"replay server not ready on {host}:{port}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--aweme-pages", type=int, default=20)
+    parser.add_argument("--comments", type=int, default=1000)
+    parser.add_argument("--reply-every", type=int, default=5)
+    parser.add_argument("--replies", type=int, default=12)
+    parser.add_argument("--spiders", default=",".join(SPIDERS), help="逗号分隔, 可选 video,comments,replies")
+    parser.add_argument("--rate-limited", action="store_true", help="保留 settings 中的限速配置")
+    parser.add_argument("--child", choices=SPIDERS, help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child_main(args)
+
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "app.spiders.benchmarks.server",
+            "--port",
+            str(args.port),
+            "--latency",
+            str(args.latency),
+            "--error-rate",
+            str(args.error_rate),
+            "--aweme-pages",
+            str(args.aweme_pages),
+            "--comments",
+            str(args.comments),
+            "--reply-every",
+            str(args.reply_every),
+            "--replies",
+            str(args.replies),
+        ]
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_for_port("127.0.0.1", args.port)
+        print(f"latency={args.latency}s error_rate={args.error_rate} rate_limited={args.rate_limited}")
+        print(
+            f"{'spider':>9} {'pages':>6} {'errors':>6} {'rows':>7} {'pages/s':>8} {'rows/s':>9} "
+            f"{'rss MB':>7} {'lag p99':>8} {'lag max':>8}"
+        )
+        for spider in args.spiders.split(","):
+            cmd = [sys.executable, "-m", "app.spiders.benchmarks.suite", "--child", spider, "--base-url", base_url]
+            if args.rate_limited:
+                cmd.append("--rate-limited")
+            output = subprocess.run(
+                cmd, check=True, capture_output=True, text=True, env=child_env(base_url, args.rate_limited)
+            ).stdout
+            r = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{r['spider']:>9} {r['pages']:>6} {r['errors']:>6} {r['rows']:>7} {r['pages_per_sec']:>8.1f} "
+                f"{r['rows_per_sec']:>9.0f} {r['peak_rss_mb']:>7.1f} {r['lag_p99_ms']:>6.1f}ms "
+                f"{r['lag_max_ms']:>6.1f}ms"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+import httpx
+
+from app.log import logger
+from app.settings import settings
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _no_cookie_jar() -> CookieJar:
+    """不保存也不发送任何 cookie 的 cookie jar, 账号 cookie 只能由调用方通过 Cookie 请求头显式传入"""
+    return CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+
+
+class HttpClientRegistry:
+    """
+    爬虫共享的 httpx 连接池, 按名称懒加载创建, 由 FastAPI lifespan 统一关闭
+    连接数、keep-alive、HTTP/2 和超时均通过 Settings 配置
+    客户端被所有账号共享, 因此不保存响应中的 Set-Cookie, 避免一个账号的 cookie 混入另一个账号的请求
+    """
+
+    def __init__(self):
+        self.clients: dict[str, httpx.AsyncClient] = {}
+
+    def create_client(self) -> httpx.AsyncClient:
+        http2 = settings.HTTP_CLIENT_HTTP2
+        if http2 and not _http2_available():
+            logger.warning("HTTP_CLIENT_HTTP2 is enabled but h2 is not installed, fallback to HTTP/1.1")
+            http2 = False
+        return httpx.AsyncClient(
+            http2=http2,
+            cookies=_no_cookie_jar(),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(settings.HTTP_CLIENT_TIMEOUT, connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT),
+        )
+
+    def get(self, name: str = "default") -> httpx.AsyncClient:
+        client = self.clients.get(name)
+        if client is None or client.is_closed:
+            client = self.clients[name] = self.create_client()
+        return client
+
+    def set(self, name: str, client: httpx.AsyncClient) -> None:
+        """替换指定名称的客户端, 例如基准测试中指向本地回放服务"""
+        client.cookies = _no_cookie_jar()
+        self.clients[name] = client
+
+    async def aclose(self) -> None:
+        for client in self.clients.values():
+            await client.aclose()
+        self.clients.clear()
+
+
+http_clients = HttpClientRegistry()
@@ -0,0 +1,176 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from app.core.exceptions import CookiePoolEmpty
+from app.settings import settings
+from app.spiders.rate_limiter import cookie_key, parse_cookie
+
+
+class CookieAccount:
+    """
+    一个抖音账号: cookie 预先解析为 cookies 字典, 爬虫直接使用
+    health 在 [0, 1] 之间, 验证码/空响应等扣减, 成功请求缓慢恢复; 低于 DY_COOKIE_MIN_HEALTH 时进入冷却
+    health_delta 为上次写回数据库以来本进程对 health 的改变量, 写回时累加到数据库中的值
+    """
+
+    def __init__(
+        self,
+        account_id: int | None,
+        cookie: str,
+        max_concurrency: int | None = None,
+        health: float = 1.0,
+        cooldown_until: float = 0.0,
+    ):
+        self.id = account_id
+        self.cookie = cookie
+        self.cookies = parse_cookie(cookie)
+        self.key = cookie_key(cookie)
+        self.max_concurrency = max_concurrency or settings.DY_COOKIE_CONCURRENCY
+        self.health = health
+        self.health_delta = 0.0
+        # time.time() 时间戳, 便于和数据库中的冷却时间互相换算
+        self.cooldown_until = cooldown_until
+        self.cooldowns = 0
+        self.in_use = 0
+        self.last_leased = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.last_error: str | None = None
+
+    def available(self, now: float) -> bool:
+        return now >= self.cooldown_until and self.in_use < self.max_concurrency
+
+    def cooling(self) -> bool:
+        return time.time() < self.cooldown_until
+
+    def on_response(self, outcome: str) -> None:
+        self.requests += 1
+        before = self.health
+        self._on_response(outcome)
+        self.health_delta += self.health - before
+
+    def _on_response(self, outcome: str) -> None:
+        if outcome == "ok":
+            self.cooldowns = 0
+            self.health = min(1.0, self.health + settings.DY_COOKIE_HEALTH_RECOVER)
+            return
+        penalty = settings.DY_COOKIE_HEALTH_PENALTY.get(outcome)
+        if penalty is None:
+            # 超时/5xx 等与账号无关
+            return
+        self.failures += 1
+        self.last_error = outcome
+        if self.cooling():
+            # 进入冷却前已发出的请求不再重复扣减
+            return
+        self.health = max(0.0, self.health - penalty)
+        if self.health < settings.DY_COOKIE_MIN_HEALTH:
+            self.cooldown_until = time.time() + settings.DY_COOKIE_COOLDOWN * 2 ** min(self.cooldowns, 4)
+            self.cooldowns += 1
+            # 冷却结束后以最低健康度重新试用, 再失败会立即再次冷却
+            self.health = settings.DY_COOKIE_MIN_HEALTH
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        return {
+            "id": self.id,
+            "key": self.key,
+            "health": round(self.health, 3),
+            "in_use": self.in_use,
+            "max_concurrency": self.max_concurrency,
+            "cooldown": round(max(self.cooldown_until - now, 0), 1),
+            "requests": self.requests,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+class CookiePool:
+    """
+    进程内的 cookie 账号池: 爬取时按博主/视频租用账号, 每个账号同时最多被租用 max_concurrency 次
+    优先租用健康度高、占用少、最久未用的账号, 所有账号都被占满或在冷却中时等待
+    fetch_json 把每个响应的结果反馈给对应账号; 账号列表和健康度由 dy_cookie_controller 定期与数据库同步
+    """
+
+    def __init__(self):
+        self.accounts: dict[str, CookieAccount] = {}
+        self._released: asyncio.Event | None = None
+
+    def sync(self, accounts: list[CookieAccount]) -> None:
+        """
+        以数据库中启用的账号为准, 已有账号保留进程内的占用;
+        健康度取数据库中各进程累加后的值再加上本进程尚未写回的改变量, 冷却时间取较晚的一方
+        """
+        synced = {}
+        for account in accounts:
+            current = self.accounts.get(account.key)
+            if current is not None:
+                current.id = account.id
+                current.max_concurrency = account.max_concurrency
+                current.health = min(max(account.health + current.health_delta, 0.0), 1.0)
+                current.cooldown_until = max(current.cooldown_until, account.cooldown_until)
+                account = current
+            synced[account.key] = account
+        self.accounts = synced
+        self._wakeup()
+
+    def feedback(self, cookie: str | dict | None, outcome: str) -> None:
+        account = self.accounts.get(cookie_key(cookie)) if self.accounts else None
+        if account is not None:
+            account.on_response(outcome)
+
+    def _pick(self) -> CookieAccount | None:
+        now = time.time()
+        candidates = [account for account in self.accounts.values() if account.available(now)]
+        if not candidates:
+            return None
+        # 健康度按 0.1 分档, 同档内轮换使用占用少、最久未用的账号
+        return min(candidates, key=lambda a: (-round(a.health, 1), a.in_use, a.last_leased))
+
+    async def acquire(self) -> CookieAccount:
+        while True:
+            if not self.accounts:
+                raise CookiePoolEmpty()
+            account = self._pick()
+            if account is not None:
+                account.in_use += 1
+                account.last_leased = time.monotonic()
+                return account
+            if self._released is None:
+                self._released = asyncio.Event()
+            self._released.clear()
+            # 等待其他租用归还, 或最早的冷却结束
+            now = time.time()
+            cooling = [a.cooldown_until - now for a in self.accounts.values() if a.cooldown_until > now]
+            try:
+                await asyncio.wait_for(self._released.wait(), min(cooling) if cooling else None)
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self, account: CookieAccount) -> None:
+        account.in_use -= 1
+        self._wakeup()
+
+    def _wakeup(self) -> None:
+        if self._released is not None:
+            self._released.set()
+
+    @asynccontextmanager
+    async def lease(self, cookie: str | None = None) -> AsyncIterator[CookieAccount]:
+        """指定 cookie 时直接使用(不受池管理), 否则从池中租用一个账号, 退出时归还"""
+        if cookie:
+            yield CookieAccount(None, cookie)
+            return
+        account = await self.acquire()
+        try:
+            yield account
+        finally:
+            self.release(account)
+
+    def snapshot(self) -> list[dict]:
+        return [account.snapshot() for account in self.accounts.values()]
+
+
+cookie_pool = CookiePool()
@@ -1,9 +1,20 @@
-import requests
-import execjs
+import asyncio
 import urllib.parse
 import re
 import random
-import cookiesparser
+from types import MappingProxyType
+from typing import Mapping
+
+import httpx
+
+from app.core.cache import TTLCache
+from app.log import logger
+from app.settings import settings
+from app.spiders.client import http_clients
+from app.spiders.fetch import limited_get
+from app.spiders.metrics import metrics
+from app.spiders.rate_limiter import cookie_key, parse_cookie
+from app.spiders.dy_comments_claw.signer import signer
 
 HOST = 'https://www.douyin.com'
 
@@ -57,61 +68,110 @@ COMMON_HEADERS = {
     "dnt": "1",
 }
 
-DOUYIN_SIGN = execjs.compile(open('douyin.js', encoding='utf-8').read())
+MS_TOKEN_CHARS = 'ABCDEFGHIGKLMNOPQRSTUVWXYZabcdefghigklmnopqrstuvwxyz0123456789='
+WEBID_PATTERN = re.compile(rb'\\"user_unique_id\\":\\"(\d+)\\"')
 
 
-def get_webid(headers: dict):
-    url = 'https://www.douyin.com/?recommend=1'
-    # print(f'url: {url}, request {url}, headers={headers}')
-    headers['sec-fetch-dest'] = 'document'
-    response = requests.get(url, headers=headers)
-    # print(f'url: {url}, response, code: {response.status_code}')
-    if response.status_code != 200 or response.text == '':
-        # print(f'failed get webid, url: {url}, header: {headers}')
+async def get_webid(client: httpx.AsyncClient, headers: Mapping, cookie: str) -> str | None:
+    url = f'{settings.DY_BASE_URL}/?recommend=1'
+    try:
+        response = await limited_get(client, url, cookie=cookie, headers={**headers, 'sec-fetch-dest': 'document'})
+    except httpx.HTTPError as e:
+        logger.warning(f'failed get webid, url: {url}, error: {e!r}')
+        return None
+    if response.status_code != 200 or not response.content:
+        logger.warning(f'failed get webid, url: {url}, status: {response.status_code}')
         return None
-    pattern = r'\\"user_unique_id\\":\\"(\d+)\\"'
-    match = re.search(pattern, response.text)
-    if match:
-        return match.group(1)
-    return None
+    # 直接在字节上匹配, 不解码整个首页
+    match = WEBID_PATTERN.search(response.content)
+    return match.group(1).decode() if match else None
+
+
+class DeviceParamsCache:
+    """
+    按 cookie 缓存 webid 和从 cookie 中解析出的设备参数, 同一 cookie 同时只有一个首页请求在进行,
+    并发的请求共享它的结果; 获取 webid 失败时只缓存 DY_DEVICE_PARAMS_RETRY_TTL 秒,
+    接口返回验证码/空响应等说明参数可能失效, 由调用方 invalidate 后下次重新获取
+    """
+
+    def __init__(self):
+        self.cache = TTLCache(maxsize=1024, ttl=settings.DY_DEVICE_PARAMS_TTL)
+        self._inflight: dict[str, asyncio.Future] = {}
 
+    async def get(self, cookie: str, headers: Mapping, cookies: Mapping | None = None) -> dict:
+        key = cookie_key(cookie)
+        params = self.cache.get(key)
+        if params is not None:
+            return params
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(self._fetch(key, cookie, headers, cookies))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: 单个调用方被取消时不影响其他等待同一请求的调用方
+        return await asyncio.shield(task)
 
-def deal_params(params: dict, headers: dict) -> dict:
-    cookie = headers.get('cookie') or headers.get('Cookie')
-    if not cookie:
+    async def _fetch(self, key: str, cookie: str, headers: Mapping, cookies: Mapping | None) -> dict:
+        cookie_dict = parse_cookie(cookie) if cookies is None else cookies
+        webid = await get_webid(http_clients.get(), headers, cookie)
+        metrics.incr('spider_webid_fetch_total', outcome='ok' if webid else 'failed')
+        params = {
+            'screen_width': cookie_dict.get('dy_swidth', 2560),
+            'screen_height': cookie_dict.get('dy_sheight', 1440),
+            'cpu_core_num': cookie_dict.get('device_web_cpu_core', 24),
+            'device_memory': cookie_dict.get('device_web_memory_size', 8),
+            'verifyFp': cookie_dict.get('s_v_web_id', None),
+            'fp': cookie_dict.get('s_v_web_id', None),
+            'webid': webid,
+        }
+        self.cache.set(key, params, ttl=None if webid else settings.DY_DEVICE_PARAMS_RETRY_TTL)
         return params
-    cookie_dict = cookiesparser.parse(cookie)
-    params['msToken'] = get_ms_token()
-    params['screen_width'] = cookie_dict.get('dy_swidth', 2560)
-    params['screen_height'] = cookie_dict.get('dy_sheight', 1440)
-    params['cpu_core_num'] = cookie_dict.get('device_web_cpu_core', 24)
-    params['device_memory'] = cookie_dict.get('device_web_memory_size', 8)
-    params['verifyFp'] = cookie_dict.get('s_v_web_id', None)
-    params['fp'] = cookie_dict.get('s_v_web_id', None)
-    params['webid'] = get_webid(headers)
-    return params
+
+    def invalidate(self, cookie: str) -> None:
+        self.cache.pop(cookie_key(cookie))
+
+
+device_params = DeviceParamsCache()
 
 
 def get_ms_token(randomlength=120):
     """
     根据传入长度产生随机字符串
     """
-    random_str = ''
-    base_str = 'ABCDEFGHIGKLMNOPQRSTUVWXYZabcdefghigklmnopqrstuvwxyz0123456789='
-    length = len(base_str) - 1
-    for _ in range(randomlength):
-        random_str += base_str[random.randint(0, length)]
-    return random_str
-
-
-def common(uri, params: dict, headers: dict) -> tuple[dict, dict]:
-    params.update(COMMON_PARAMS)
-    headers.update(COMMON_HEADERS)
-    params = deal_params(params, headers)
-    query = '&'.join([f'{k}={urllib.parse.quote(str(v))}' for k, v in params.items()])
-    call_name = 'sign_datail'
-    if 'reply' in uri:
-        call_name = 'sign_reply'
-    a_bogus = DOUYIN_SIGN.call(call_name, query, headers["User-Agent"])
-    params["a_bogus"] = a_bogus
-    return params, headers
+    return ''.join(random.choices(MS_TOKEN_CHARS, k=randomlength))
+
+
+def encode_query(params: Mapping) -> str:
+    return '&'.join([f'{k}={urllib.parse.quote(str(v))}' for k, v in params.items()])
+
+
+class SignedRequestBuilder:
+    """
+    评论爬虫的请求构造, 每个 cookie 会话创建一个:
+    cookie 只解析一次, 公共参数 + 设备参数和请求头构建一次后只读共享, 不修改调用方传入的 params;
+    签名交给常驻签名进程, 不占用事件循环
+    """
+
+    def __init__(self, cookie: str):
+        self.cookie = cookie
+        self.cookies = MappingProxyType(parse_cookie(cookie))
+        self.headers = MappingProxyType({**COMMON_HEADERS, 'cookie': cookie})
+        self._device = None
+        self._base_params: Mapping = MappingProxyType({})
+        self._base_query = ''
+
+    async def base_params(self) -> Mapping:
+        device = await device_params.get(self.cookie, self.headers, self.cookies)
+        # 设备参数过期刷新后才重新构建
+        if device is not self._device:
+            self._device = device
+            self._base_params = MappingProxyType({**COMMON_PARAMS, **device})
+            self._base_query = encode_query(self._base_params)
+        return self._base_params
+
+    async def build(self, uri: str, params: Mapping) -> tuple[dict, dict]:
+        """返回新的 (params, headers), params 中带 msToken 和 a_bogus 签名"""
+        base_params = await self.base_params()
+        ms_token = get_ms_token()
+        query = f'{encode_query(params)}&{self._base_query}&msToken={urllib.parse.quote(ms_token)}'
+        a_bogus = await signer.sign(query, self.headers['User-Agent'], reply='reply' in uri)
+        return {**params, **base_params, 'msToken': ms_token, 'a_bogus': a_bogus}, dict(self.headers)
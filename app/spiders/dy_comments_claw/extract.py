@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import NamedTuple
+
+USER_HOMEPAGE_URL = "https://www.douyin.com/user/{sec_uid}"
+
+
+class CommentRecord(NamedTuple):
+    """单条评论/回复的入库字段, 与 DyCommentModel 一一对应"""
+
+    comment_id: int
+    aweme_id: int
+    content: str
+    image_url: str | None
+    digg_count: int
+    comment_time: datetime
+    user_nickname: str
+    user_homepage_link: str
+    dy_user_id: str | None
+    ip_location: str
+    reply_comment_id: int | None
+    reply_comment_total: int
+
+    def to_model(self) -> dict:
+        return self._asdict()
+
+
+def extract_comment(comment: dict, aweme_id: int) -> CommentRecord:
+    user = comment.get("user") or {}
+    image_list = comment.get("image_list")
+    reply_id = comment.get("reply_id")
+    return CommentRecord(
+        int(comment["cid"]),  # comment_id
+        aweme_id,
+        comment.get("text") or "",  # content
+        image_list[0]["origin_url"]["url_list"][0][:500] if image_list else None,  # image_url
+        comment.get("digg_count", 0),
+        datetime.fromtimestamp(comment["create_time"]),  # comment_time
+        (user.get("nickname") or "")[:100],  # user_nickname
+        USER_HOMEPAGE_URL.format(sec_uid=user.get("sec_uid", "")),  # user_homepage_link
+        user.get("unique_id") or None,  # dy_user_id
+        comment.get("ip_label") or "未知",  # ip_location
+        int(reply_id) if reply_id and reply_id != "0" else None,  # reply_comment_id
+        comment.get("reply_comment_total") or 0,
+    )
+
+
+def extract_comments(comments: list, aweme_id) -> list[CommentRecord]:
+    aweme_id = int(aweme_id)
+    return [extract_comment(comment, aweme_id) for comment in comments]
@@ -0,0 +1,313 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, NamedTuple
+
+from app.log import logger
+from app.settings import settings
+from app.spiders.client import http_clients
+from app.spiders.dy_comments_claw.common import SignedRequestBuilder
+from app.spiders.dy_comments_claw.main import (
+    ReplyThread,
+    ReplyWorkerPool,
+    get_comments_async,
+)
+from app.spiders.rate_limiter import cookie_key
+
+
+class CommentSlots:
+    """
+    评论接口的并发上限: 进程内所有评论/回复请求共用全局上限, 同一 cookie 的请求另有单独上限
+    slots(cookie) 返回可用于 async with 的对象, 同时占用全局和该 cookie 的名额
+    """
+
+    def __init__(self):
+        self._global: asyncio.Semaphore | None = None
+        self._cookies: dict[str, asyncio.Semaphore] = {}
+
+    def slots(self, cookie: str) -> "_Slot":
+        if self._global is None:
+            self._global = asyncio.Semaphore(settings.DY_COMMENT_CONCURRENCY)
+        key = cookie_key(cookie)
+        if key not in self._cookies:
+            self._cookies[key] = asyncio.Semaphore(settings.DY_COMMENT_COOKIE_CONCURRENCY)
+        return _Slot(self._global, self._cookies[key])
+
+
+class _Slot:
+    def __init__(self, global_semaphore: asyncio.Semaphore, cookie_semaphore: asyncio.Semaphore):
+        self.global_semaphore = global_semaphore
+        self.cookie_semaphore = cookie_semaphore
+
+    async def __aenter__(self):
+        # 先占 cookie 名额再占全局名额, 单个 cookie 排队时不占用其他 cookie 可用的全局名额
+        await self.cookie_semaphore.acquire()
+        try:
+            await self.global_semaphore.acquire()
+        except BaseException:
+            self.cookie_semaphore.release()
+            raise
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.global_semaphore.release()
+        self.cookie_semaphore.release()
+
+
+comment_slots = CommentSlots()
+
+
+class CommentCheckpoint(NamedTuple):
+    """评论抓取进度, 与评论数据经同一个写入队列按顺序落库, 落库时之前的评论页一定已经写入"""
+
+    aweme_id: str
+    cursor: int
+    comments_done: bool
+    done: bool
+    threads: tuple  # 自上次检查点以来完整抓取的回复 ReplyThread
+
+
+class ResumeState(NamedTuple):
+    """从检查点恢复: 从 cursor 继续翻页, pending_threads 为已入库但回复未抓完的评论 [(comment_id, reply_total)]"""
+
+    cursor: int
+    comments_done: bool
+    done: bool
+    pending_threads: list
+
+
+class IncrementalState(NamedTuple):
+    """
+    增量抓取: since(时间戳)/since_comment_id 为已入库的最新一级评论,
+    reply_totals 为 {comment_id: 已抓取时的回复数}
+    """
+
+    since: float | None
+    since_comment_id: int | None
+    reply_totals: dict
+
+
+# get_comments_async/get_replies_async 每页的条数, 用于估算增量抓取节省的请求数
+PAGE_SIZE = 50
+
+
+def pages_of(total: int) -> int:
+    return -(-total // PAGE_SIZE)
+
+
+class CommentCrawlScheduler:
+    """
+    多视频评论并发爬取: 所有视频同时翻页, 请求数受 comment_slots 的全局和单 cookie 上限约束
+    有回复的评论进入共享的 ReplyWorkerPool, 回复抓取与各视频后续的评论翻页交叠进行
+    每个视频返回一条进度: {'aweme_id', 'total', 'comment_pages', 'comments', 'reply_threads', 'failed_threads',
+    'replies', 'requests_saved', 'done', 'resumed', 'error', 'elapsed'}, 单个视频失败不影响其他视频
+    total 为接口返回的一级评论总数; on_progress 收到的进度另含 pending_threads, 即已入队未抓完回复的评论数
+    传入 sink 时每页评论和回复抓取后立即交给 await sink(aweme_id, comments), 不在 data 中累积
+    传入 checkpoint 时每页评论之后、以及每完成 DY_COMMENT_CHECKPOINT_THREADS 个回复后调用
+    await checkpoint(CommentCheckpoint); resume 为 {aweme_id: ResumeState}, 命中的视频从检查点继续
+    incremental 为 {aweme_id: IncrementalState}, 命中的视频只抓取回复数增长或新出现的评论的回复,
+    连续 DY_COMMENT_STALE_PAGES 页没有新评论且回复数没有增长时停止翻页, 进度中 requests_saved 为估算节省的请求数
+    """
+
+    def __init__(
+        self,
+        cookie: str,
+        sink: Callable[[str, list], Awaitable[Any]] | None = None,
+        on_progress: Callable[[dict], Any] | None = None,
+        checkpoint: Callable[[CommentCheckpoint], Awaitable[Any]] | None = None,
+        resume: dict[str, ResumeState] | None = None,
+        incremental: dict[str, IncrementalState] | None = None,
+    ):
+        self.cookie = cookie
+        self.builder = SignedRequestBuilder(cookie)
+        self.slot = comment_slots.slots(cookie)
+        self.sink = sink
+        self.on_progress = on_progress
+        self.checkpoint = checkpoint
+        self.resume = resume or {}
+        self.incremental = incremental or {}
+        self.progress: dict[str, dict] = {}
+        self._pending_threads: dict[str, int] = {}
+        self._threads_done: dict[str, asyncio.Event] = {}
+        self._finished_threads: dict[str, list] = {}
+        self._cursors: dict[str, tuple[int, bool]] = {}
+        self.replies: ReplyWorkerPool | None = None
+
+    async def run(self, aweme_ids: list) -> list[dict]:
+        start = time.perf_counter()
+        async with ReplyWorkerPool(
+            self.builder, self.slot, self._on_reply_page, on_thread_done=self._on_thread_done
+        ) as self.replies:
+            results = await asyncio.gather(*[self.crawl_video(str(aweme_id)) for aweme_id in aweme_ids])
+        logger.info(
+            f"crawled comments of {len(results)} videos in {time.perf_counter() - start:.2f}s, "
+            f"comments: {sum(r['comments'] for r in results)}, replies: {sum(r['replies'] for r in results)}"
+        )
+        return results
+
+    async def crawl_video(self, aweme_id: str) -> dict:
+        progress = self.progress[aweme_id] = {
+            "aweme_id": aweme_id,
+            "total": 0,
+            "comment_pages": 0,
+            "comments": 0,
+            "reply_threads": 0,
+            "failed_threads": 0,
+            "replies": 0,
+            "requests_saved": 0,
+            "done": False,
+            "resumed": False,
+            "error": None,
+            "elapsed": 0.0,
+            "data": [],
+        }
+        self._pending_threads[aweme_id] = 0
+        self._finished_threads[aweme_id] = []
+        # 没有待抓取的回复时为 set 状态, 入队第一个回复时清除
+        threads_done = self._threads_done[aweme_id] = asyncio.Event()
+        threads_done.set()
+        start = time.perf_counter()
+        cursor, has_more = 0, 1
+        try:
+            state = self.resume.get(aweme_id)
+            if state:
+                progress["resumed"] = True
+                if state.done:
+                    progress["done"] = True
+                    self._report(progress)
+                    return progress
+                cursor, has_more = state.cursor, int(not state.comments_done)
+            self._cursors[aweme_id] = (cursor, not has_more)
+            if state:
+                for comment_id, reply_total in state.pending_threads:
+                    await self._enqueue_replies(aweme_id, {"cid": str(comment_id), "reply_comment_total": reply_total})
+
+            incremental = self.incremental.get(aweme_id)
+            seen_threads = set()
+            stale_pages = 0
+            total = 0
+            client = http_clients.get()
+            while has_more:
+                async with self.slot:
+                    response = await get_comments_async(client, aweme_id, self.builder, cursor=str(cursor))
+                comments = response.get("comments") or []
+                total = progress["total"] = response.get("total") or total
+                progress["comment_pages"] += 1
+                progress["comments"] += len(comments)
+                await self._emit(progress, comments)
+                fresh = False
+                for comment in comments:
+                    reply_total = comment.get("reply_comment_total", 0)
+                    if incremental is None:
+                        if reply_total > 0:
+                            await self._enqueue_replies(aweme_id, comment)
+                        continue
+                    fresh = fresh or self._is_new(incremental, comment)
+                    known_total = incremental.reply_totals.get(int(comment["cid"]))
+                    if known_total is not None:
+                        seen_threads.add(int(comment["cid"]))
+                    if reply_total > (known_total or 0):
+                        fresh = True
+                        await self._enqueue_replies(aweme_id, comment)
+                    elif reply_total > 0:
+                        progress["requests_saved"] += pages_of(reply_total)
+                has_more = response.get("has_more", 0)
+                cursor = response.get("cursor", 0)
+                stale_pages = 0 if fresh else stale_pages + 1
+                # 评论按热度排序, 连续几页都是已抓取过且没有变化的评论时认为后面也没有变化
+                if incremental and has_more and stale_pages >= settings.DY_COMMENT_STALE_PAGES:
+                    has_more = 0
+                    progress["requests_saved"] += max(pages_of(total) - progress["comment_pages"], 0)
+                    # 没有翻到的评论, 它们的回复也不再抓取
+                    progress["requests_saved"] += sum(
+                        pages_of(reply_total)
+                        for comment_id, reply_total in incremental.reply_totals.items()
+                        if comment_id not in seen_threads
+                    )
+                self._cursors[aweme_id] = (cursor, not has_more)
+                await self._checkpoint(aweme_id)
+        except Exception as e:
+            logger.warning(f"crawl comments failed, aweme_id: {aweme_id}, error: {e!r}")
+            progress["error"] = repr(e)
+        # 已入队的回复仍然抓取完成后再结束该视频
+        while self._pending_threads[aweme_id]:
+            await threads_done.wait()
+        try:
+            # 出错或有回复抓取失败时不标记完成, 恢复时继续翻页并重新抓取这些回复;
+            # 最后一个检查点同时写入尚未落库的已完成回复
+            done = progress["error"] is None and not progress["failed_threads"] and not self._pending_threads[aweme_id]
+            await self._checkpoint(aweme_id, done=done)
+        except Exception as e:
+            progress["error"] = progress["error"] or repr(e)
+        progress["done"] = True
+        progress["elapsed"] = time.perf_counter() - start
+        self._report(progress)
+        logger.info(
+            f"aweme {aweme_id}: {progress['comment_pages']} pages, {progress['comments']} comments, "
+            f"{progress['replies']} replies in {progress['elapsed']:.2f}s, "
+            f"requests saved: {progress['requests_saved']}"
+        )
+        return progress
+
+    @staticmethod
+    def _is_new(incremental: IncrementalState, comment: dict) -> bool:
+        if incremental.since is None:
+            return True
+        if comment["create_time"] != incremental.since:
+            return comment["create_time"] > incremental.since
+        return int(comment["cid"]) > (incremental.since_comment_id or 0)
+
+    async def _enqueue_replies(self, aweme_id: str, comment: dict) -> None:
+        # 入队前计数, worker 可能在 put 返回前就抓完该评论的回复
+        if self._pending_threads[aweme_id] == 0:
+            self._threads_done[aweme_id].clear()
+        self._pending_threads[aweme_id] += 1
+        try:
+            await self.replies.put(comment, tag=aweme_id)
+        except BaseException:
+            self._pending_threads[aweme_id] -= 1
+            if self._pending_threads[aweme_id] == 0:
+                self._threads_done[aweme_id].set()
+            raise
+
+    async def _on_reply_page(self, aweme_id: str, replies: list) -> None:
+        progress = self.progress[aweme_id]
+        progress["replies"] += len(replies)
+        await self._emit(progress, replies)
+
+    async def _on_thread_done(self, aweme_id: str, thread: ReplyThread) -> None:
+        self.progress[aweme_id]["reply_threads"] += 1
+        if not thread.ok:
+            self.progress[aweme_id]["failed_threads"] += 1
+        try:
+            if thread.ok:
+                finished = self._finished_threads[aweme_id]
+                finished.append(thread)
+                if len(finished) >= settings.DY_COMMENT_CHECKPOINT_THREADS:
+                    await self._checkpoint(aweme_id)
+        finally:
+            # 该回复的检查点写完后才减少计数, 视频的最终检查点不会与它交错
+            self._pending_threads[aweme_id] -= 1
+            if self._pending_threads[aweme_id] == 0:
+                self._threads_done[aweme_id].set()
+            self._report(self.progress[aweme_id])
+
+    async def _checkpoint(self, aweme_id: str, done: bool = False) -> None:
+        if not self.checkpoint:
+            return
+        cursor, comments_done = self._cursors[aweme_id]
+        threads = tuple(self._finished_threads[aweme_id])
+        self._finished_threads[aweme_id].clear()
+        await self.checkpoint(CommentCheckpoint(aweme_id, cursor, comments_done, done, threads))
+
+    async def _emit(self, progress: dict, comments: list) -> None:
+        if comments:
+            if self.sink:
+                await self.sink(progress["aweme_id"], comments)
+            else:
+                progress["data"].extend(comments)
+        self._report(progress)
+
+    def _report(self, progress: dict) -> None:
+        if self.on_progress:
+            report = {k: v for k, v in progress.items() if k != "data"}
+            report["pending_threads"] = self._pending_threads.get(progress["aweme_id"], 0)
+            self.on_progress(report)
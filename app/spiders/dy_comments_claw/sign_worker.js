@@ -0,0 +1,31 @@
+// 常驻签名进程: 加载 douyin.js 后按行读取 JSON 请求 {id, fn, args}, 按行返回 {id, result} 或 {id, error}
+// fn 为 batch 时 args 是 [[fn, query, userAgent], ...], 一次返回全部签名
+const fs = require('fs');
+const path = require('path');
+const readline = require('readline');
+const vm = require('vm');
+
+vm.runInThisContext(fs.readFileSync(path.join(__dirname, 'douyin.js'), 'utf8'));
+
+function call(fn, args) {
+    if (fn !== 'sign_datail' && fn !== 'sign_reply') {
+        throw new Error(`unknown sign function: ${fn}`);
+    }
+    return globalThis[fn](...args);
+}
+
+readline.createInterface({input: process.stdin}).on('line', (line) => {
+    let response;
+    let id = null;
+    try {
+        const request = JSON.parse(line);
+        id = request.id;
+        const result = request.fn === 'batch'
+            ? request.args.map(([fn, ...args]) => call(fn, args))
+            : call(request.fn, request.args);
+        response = {id, result};
+    } catch (e) {
+        response = {id, error: String((e && e.stack) || e)};
+    }
+    process.stdout.write(JSON.stringify(response) + '\n');
+});
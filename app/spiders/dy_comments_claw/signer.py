@@ -0,0 +1,176 @@
+import asyncio
+import itertools
+import json
+import os
+import shutil
+
+import execjs
+
+from app.log import logger
+from app.settings import settings
+from app.spiders.fetch import json_loads
+
+DOUYIN_JS = os.path.join(os.path.dirname(__file__), "douyin.js")
+SIGN_WORKER_JS = os.path.join(os.path.dirname(__file__), "sign_worker.js")
+
+
+class SignError(Exception):
+    pass
+
+
+def sign_function(reply: bool) -> str:
+    return "sign_reply" if reply else "sign_datail"
+
+
+class NodeSignWorker:
+    """常驻的 node 进程, 通过 stdin/stdout 按行收发 JSON, 可同时处理多个未完成的请求"""
+
+    def __init__(self, node: str):
+        self.node = node
+        self.process: asyncio.subprocess.Process | None = None
+        self.pending: dict[int, asyncio.Future] = {}
+        self._ids = itertools.count()
+        self._reader: asyncio.Task | None = None
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self) -> None:
+        self.process = await asyncio.create_subprocess_exec(
+            self.node,
+            SIGN_WORKER_JS,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=16 * 1024 * 1024,  # 批量签名的响应是一整行
+        )
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def _read_loop(self) -> None:
+        try:
+            while line := await self.process.stdout.readline():
+                message = json_loads(line)
+                future = self.pending.pop(message["id"], None)
+                if future is None or future.done():
+                    continue
+                if "error" in message:
+                    future.set_exception(SignError(message["error"]))
+                else:
+                    future.set_result(message["result"])
+        finally:
+            # 进程退出后未完成的请求全部失败, 由调用方重试
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(SignError("sign worker exited"))
+            self.pending.clear()
+
+    async def call(self, fn: str, args: list):
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            async with self._write_lock:
+                self.process.stdin.write(json.dumps({"id": request_id, "fn": fn, "args": args}).encode() + b"\n")
+                await self.process.stdin.drain()
+            return await asyncio.wait_for(future, settings.DY_SIGN_TIMEOUT)
+        except (BrokenPipeError, ConnectionResetError):
+            raise SignError("sign worker exited")
+        except asyncio.TimeoutError:
+            raise SignError(f"sign timeout after {settings.DY_SIGN_TIMEOUT}s")
+        finally:
+            self.pending.pop(request_id, None)
+
+    async def close(self) -> None:
+        if self.alive:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), 5)
+            except asyncio.TimeoutError:
+                self.process.kill()
+        if self._reader:
+            self._reader.cancel()
+
+
+class SignerPool:
+    """
+    a_bogus 签名引擎: 维护 DY_SIGN_WORKERS 个常驻 node 进程, 每次签名只是一次管道往返,
+    不再像 execjs 那样每次调用都启动新进程并阻塞事件循环
+    找不到 node 时退回 execjs, 在线程中执行
+    """
+
+    def __init__(self, size: int | None = None):
+        self.size = size
+        self.node = shutil.which("node")
+        self.workers: list[NodeSignWorker] = []
+        self._loop = None
+        self._lock = None
+        self._execjs = None
+
+    async def _ensure_workers(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # 子进程和管道绑定在创建它们的事件循环上
+            self._kill_workers()
+            self._loop, self._lock = loop, asyncio.Lock()
+        async with self._lock:
+            for i in range(self.size or settings.DY_SIGN_WORKERS):
+                if i >= len(self.workers):
+                    self.workers.append(NodeSignWorker(self.node))
+                if not self.workers[i].alive:
+                    await self.workers[i].start()
+
+    def _pick(self) -> NodeSignWorker:
+        return min(self.workers, key=lambda worker: len(worker.pending))
+
+    async def _call(self, fn: str, args: list):
+        for attempt in range(2):
+            await self._ensure_workers()
+            try:
+                return await self._pick().call(fn, args)
+            except SignError as e:
+                if attempt or "exited" not in str(e):
+                    raise
+                logger.warning("sign worker exited, restarting")
+
+    def _execjs_context(self):
+        if self._execjs is None:
+            with open(DOUYIN_JS, encoding="utf-8") as f:
+                self._execjs = execjs.compile(f.read())
+        return self._execjs
+
+    async def sign(self, query: str, user_agent: str, reply: bool = False) -> str:
+        fn = sign_function(reply)
+        if not self.node:
+            return await asyncio.to_thread(self._execjs_context().call, fn, query, user_agent)
+        return await self._call(fn, [query, user_agent])
+
+    async def sign_many(self, items: list[tuple[str, str, bool]]) -> list[str]:
+        """批量签名 [(query, user_agent, reply), ...], 按进程数分片, 每片一次管道往返"""
+        if not items:
+            return []
+        calls = [[sign_function(reply), query, user_agent] for query, user_agent, reply in items]
+        if not self.node:
+            ctx = self._execjs_context()
+            return await asyncio.to_thread(lambda: [ctx.call(*call) for call in calls])
+        size = self.size or settings.DY_SIGN_WORKERS
+        chunk = -(-len(calls) // size)
+        results = await asyncio.gather(
+            *[self._call("batch", calls[i : i + chunk]) for i in range(0, len(calls), chunk)]
+        )
+        return [signature for result in results for signature in result]
+
+    def _kill_workers(self) -> None:
+        for worker in self.workers:
+            if worker.alive:
+                worker.process.kill()
+        self.workers.clear()
+
+    async def aclose(self) -> None:
+        for worker in self.workers:
+            await worker.close()
+        self.workers.clear()
+        self._loop = None
+
+
+signer = SignerPool()
@@ -1,3 +1,4 @@
-from .dy_video_claw import DouyinVideo
+from .dy_video_claw import DouyinVideo, match_sec_user_id
+from .extract import AwemeRecord, extract_page
 
-__all__ = ["DouyinVideo"]
+__all__ = ["DouyinVideo", "match_sec_user_id", "AwemeRecord", "extract_page"]
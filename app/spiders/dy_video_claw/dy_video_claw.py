@@ -1,11 +1,17 @@
-import pandas as pd
+import asyncio
+import time
+
 from queue import Queue
 import re
-from datetime import datetime
 import os
 import httpx
 
-client = httpx.AsyncClient(timeout=60)
+from app.log import logger
+from app.settings import settings
+from app.spiders.client import http_clients
+from app.spiders.dy_video_claw.export import VideoExporter
+from app.spiders.dy_video_claw.extract import extract_page
+from app.spiders.fetch import fetch_json, limited_get
 
 
 def format_cookie(cookie_str):
@@ -24,37 +30,116 @@ def format_cookie(cookie_str):
     return cookie_dict
 
 
+def cookie_header(cookies):
+    # 共享客户端不保存 cookie, 账号 cookie 只通过 Cookie 请求头发送
+    return '; '.join(f'{key}={value}' for key, value in cookies.items() if key)
+
+
+SEC_USER_ID_PATTERN = r'user/([a-zA-Z0-9_-]+)'
+
+
+def match_sec_user_id(url):
+    match = re.search(SEC_USER_ID_PATTERN, url)
+    return match.group(1) if match else None
+
+
 class DouyinVideo():
 
-    async def inits(self, choose, cookie_str):
-        cookies = format_cookie(cookie_str)
+    async def inits(self, choose, cookie_str, concurrency=None):
+        """爬取多个博主主页, 返回所有博主的视频数据"""
+        results = await self.crawl_creators(choose, cookie_str, concurrency=concurrency)
+        data = []
+        for result in results:
+            data.extend(result['data'])
+        return data
 
-        # 查询列表
-        for url in choose:
-            page_url = await get_redirect_url(url)
-            pattern = r'user/([a-zA-Z0-9_-]+)'
-            # 使用re.search查找匹配项
-            match = re.search(pattern, page_url)
-            # 如果找到匹配项，打印结果
-            if match:
-                print("匹配到的用户ID:", match.group(1))  # 使用group(1)来获取第一个括号内匹配的内容
-            else:
-                print("没有找到匹配项")
-            sec_user_id = match.group(1)
-
-            return await self.parse(sec_user_id, cookies)
-
-    async def parse(self, sec_user_id, cookies):
+    async def crawl_creators(self, choose, cookie_str, concurrency=None, sink=None, since_lookup=None, max_pages=None,
+                             resolved=None, on_progress=None):
+        """
+        并发爬取多个博主主页, 同时进行的博主数量不超过 concurrency, concurrency=1 即逐个顺序爬取
+        每个博主返回一条结果: {'url', 'sec_user_id', 'data', 'pages', 'count', 'newest_publish_time',
+        'newest_aweme_id', 'error', 'elapsed'}, 单个博主失败不影响其他博主
+        传入 sink 时每页数据抓取后立即交给 await sink(page), 不再在 data 中累积
+        传入 since_lookup 时按 await since_lookup(sec_user_id) 返回的发布时间水位线增量翻页, 见 parse
+        resolved 为预先解析好的 {url: sec_user_id}, 命中时不再请求短链跳转
+        传入 on_progress 时每页之后和博主结束时调用 on_progress(result), result 不含 data, 结束时 done=True
+        """
+        cookies = format_cookie(cookie_str)
+        concurrency = max(1, concurrency or settings.DY_CRAWL_CONCURRENCY)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def crawl(url):
+            async with semaphore:
+                return await self.crawl_creator(url, cookies, sink=sink, since_lookup=since_lookup,
+                                                max_pages=max_pages, sec_user_id=(resolved or {}).get(url),
+                                                on_progress=on_progress)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(crawl(url) for url in choose))
+        logger.info(f"crawled {len(results)} creators with concurrency={concurrency} "
+                    f"in {time.perf_counter() - start:.2f}s")
+        return results
+
+    async def crawl_creator(self, url, cookies, sink=None, since_lookup=None, max_pages=None, sec_user_id=None,
+                            on_progress=None):
+        result = {'url': url, 'sec_user_id': sec_user_id, 'data': [], 'pages': 0, 'count': 0,
+                  'newest_publish_time': None, 'newest_aweme_id': None, 'error': None, 'done': False}
+
+        def report():
+            if on_progress:
+                on_progress({'url': url, 'pages': result['pages'], 'count': result['count'],
+                             'error': result['error'], 'done': result['done']})
+
+        start = time.perf_counter()
+        try:
+            if result['sec_user_id'] is None:
+                result['sec_user_id'] = await self.resolve_sec_user_id(url)
+            since = await since_lookup(result['sec_user_id']) if since_lookup else None
+            async for page in self.parse(result['sec_user_id'], cookies, since=since, max_pages=max_pages):
+                result['pages'] += 1
+                result['count'] += len(page)
+                for video in page:
+                    if result['newest_publish_time'] is None or video.publish_time > result['newest_publish_time']:
+                        result['newest_publish_time'] = video.publish_time
+                        result['newest_aweme_id'] = video.video_id
+                if sink is None:
+                    result['data'].extend(page)
+                elif page:
+                    await sink(page)
+                report()
+        except Exception as e:
+            logger.warning(f"crawl creator failed, url: {url}, error: {e!r}")
+            result['error'] = repr(e)
+        result['elapsed'] = round(time.perf_counter() - start, 3)
+        result['done'] = True
+        report()
+        return result
+
+    async def resolve_sec_user_id(self, url):
+        # 主页链接本身就带有 sec_user_id, 只有短链需要请求跳转
+        page_url = url if match_sec_user_id(url) else await get_redirect_url(url)
+        sec_user_id = match_sec_user_id(page_url)
+        if not sec_user_id:
+            raise ValueError(f"没有找到匹配项: {page_url}")
+        return sec_user_id
+
+    async def parse(self, sec_user_id, cookies, since=None, max_pages=None):
+        """
+        按页抓取博主作品, 每页解析为 AwemeRecord 列表后立即 yield, 调用方无需等待全部分页结束
+        作品按发布时间倒序返回, 传入 since 时一旦某页出现不晚于 since 的作品(置顶作品除外)就停止翻页;
+        max_pages 限制最多抓取的页数
+        """
         result = {}
-        data = []
         result['has_more'] = 1
         result['max_cursor'] = 0
+        pages = 0
         while result['has_more'] == 1:
             max_cursor = result['max_cursor']
             headers = {
-                "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36"
+                "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36",
+                "cookie": cookie_header(cookies),
             }
-            url = "https://www.douyin.com/aweme/v1/web/aweme/post/"
+            url = f"{settings.DY_BASE_URL}/aweme/v1/web/aweme/post/"
             params = {
                 "max_cursor": max_cursor,
                 "aid": "6383",
@@ -62,128 +147,30 @@ class DouyinVideo():
                 "count": 10000,
                 "publish_video_strategy_type": "2",
             }
-            response = await client.get(url, headers=headers, cookies=cookies, params=params)
-
-            result = response.json()
-            length = len(result['aweme_list'])
-            for i in range(length):
-                video_url = result['aweme_list'][i]['share_url']
-                download_url = ""
-                type = "视频"
-                try:
-                    download_uri = result['aweme_list'][i]['video']['play_addr']['uri']
-                    ratio = 360
-                    download_url = f'https://api.amemv.com/aweme/v1/play/?video_id={download_uri}&line=1&ratio={ratio}p&media_type=4&vr_type=0&improve_bitrate=0&is_play_url=1&source=PackSourceEnum_PUBLISH'
-                except Exception as e:
-                    print(e)
-                    type = "图文"
-
-                duration = round(result['aweme_list'][i]['video']['duration'] / 1000)
-                if duration == 0:
-                    type = "图文"
-
-                video_id = int(result['aweme_list'][i]['aweme_id'])
-                desc = result['aweme_list'][i]["desc"]
-                parts = desc.split('#')
-                title = parts[0].strip()
-                tags = ', '.join([tag.strip() for tag in parts[1:] if tag.strip()])
-                # video_tag = [item['tag_name'] for item in result['aweme_list'][i]['video_tag']]
-
-                comment_count = result['aweme_list'][i]['statistics']['comment_count']
-                share_count = result['aweme_list'][i]['statistics']['share_count']
-                like_count = result['aweme_list'][i]['statistics']['digg_count']
-                favorite_count = result['aweme_list'][i]['statistics']['collect_count']
-                name = result['aweme_list'][i]['author']['nickname']
-
-                timestamp = result['aweme_list'][i]['create_time']
-                publish_time = datetime.fromtimestamp(timestamp)
-                print(title)
-
-                data.append({
-                    'name': name,
-                    'video_url': video_url,
-                    'download_url': download_url,
-                    'video_id': video_id,
-                    'title': title,
-                    'tags': tags,
-                    # 'video_tag': video_tag,
-                    'type': type,
-                    'comment_count': comment_count,
-                    'share_count': share_count,
-                    'like_count': like_count,
-                    'favorite_count': favorite_count,
-                    'duration': duration,
-                    'publish_time': publish_time,
-                    'dy_user_id': sec_user_id,
-                })
+            result = await fetch_json(http_clients.get(), url, cookie=cookies, headers=headers, params=params)
+            pages += 1
+            data = extract_page(result, sec_user_id)
+            # 置顶作品不按时间排序, 不能用来判断是否到达水位线
+            reached_since = since is not None and any(
+                not video.is_top and video.publish_time <= since for video in data)
 
-        return data
+            yield data
 
-    def update_csv(self, data, sec_user_id):
-        filename = f"Douyin_{sec_user_id}.csv"
-        # 定义输出目录
-        output_dir = 'data'
-
-        # 检查输出目录是否存在，如果不存在则创建
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
-        file_path = os.path.join(output_dir, filename)
-
-        # 检查文件是否存在
-        if os.path.exists(file_path):
-            existing_df = pd.read_csv(file_path)
-            existing_df = existing_df.astype({
-                '视频id': str,
-                '评论': str,
-                '分享': str,
-                '喜欢': str,
-                '收藏': str
-            })
-
-            # 创建一个新的 DataFrame 用于存储更新后的数据
-            updated_df = existing_df.copy()
-
-            # 遍历新数据，进行更新或新增
-            for row in data:
-                video_id = row['视频id']
-                if video_id in existing_df['视频id'].values:
-                    # 更新现有数据
-                    updated_df.loc[updated_df['视频id'] == video_id, ['标题', '评论', '分享', '喜欢', '收藏']] = [
-                        row['标题'], row['评论'], row['分享'], row['喜欢'], row['收藏']
-                    ]
-                    # 输出更新后的行
-                    print(f"更新后的行 (视频id: {video_id}):")
-                    print(updated_df.loc[updated_df['视频id'] == video_id])
-                else:
-                    # 新增数据
-                    new_row = pd.DataFrame([row])
-                    updated_df = pd.concat([new_row, updated_df], ignore_index=True)
-                    print(f"新增的行 (视频id: {video_id}):")
-                    print(new_row)
-
-            # 保存更新后的 DataFrame
-            updated_df.to_csv(file_path, index=False)
-        else:
-            # 如果文件不存在，直接将新数据写入文件
-            df = pd.DataFrame(data)
-            df = df.astype({
-                '视频id': str,
-                '评论': str,
-                '分享': str,
-                '喜欢': str,
-                '收藏': str
-            })
-            df.to_csv(file_path, index=False)
+            if reached_since or (max_pages and pages >= max_pages):
+                break
 
-        return file_path
+    def update_csv(self, data, sec_user_id):
+        """把 AwemeRecord 列表按 video_id 合并进博主的导出文件, 只追加有变化的行, 返回 CSV 路径"""
+        # parquet 分区在 data/dy_video 下, CSV 仍然写到原来的 data/Douyin_{sec_user_id}.csv
+        result = VideoExporter(os.path.join('data', 'dy_video'), csv_dir='data').export(data, sec_user_id, csv=True)
+        return result['csv']
 
 
 async def get_redirect_url(url):
     try:
-        response = await client.get(url)
+        response = await limited_get(http_clients.get(), url)
         if 300 <= response.status_code < 400:
-            redirect_url = await response.headers.get('Location')
+            redirect_url = response.headers.get('Location')
             return redirect_url
         else:
             return url
@@ -196,4 +183,11 @@ if __name__ == '__main__':
     urls = ['https://www.douyin.com/user/MS4wLjABAAAAIas_TeNvnEi1E6CI2B3dECQf3Dl4Sd-5RhtxyYIlAgo?from_tab_name=main']
     cookie = 'ttwid=1%7CxivP0_rKPOGVO2OhbZ2iha8xJBzQS23J5xJleWwSkOU%7C1729660531%7C8785ed640379d9311156383492a93981a6319abe92bbba61fbe6554491428855; UIFID_TEMP=63bdc4b4b456901f349a081bfd3a24da10a1c6623f0a2d5eadd83f51c9f4d112bbcbeb4a6e97afffe0093f599fa4730d0aaae1885c72e7ece9994d30b493b2a61621fdb5dba23dbf82c4eb9a4c90c9c1; s_v_web_id=verify_m2lf816j_4xVOCuxM_FNdJ_4xFs_BTdd_711RVF1VSIVD; hevc_supported=true; dy_swidth=1920; dy_sheight=1080; fpk1=U2FsdGVkX18sHEtDN77GeM3vH48Vt5iMDH0KZVCQKWVeY53EeoqaZQKK4InhlJhSqFdAy72xeaN6tPt7kuHgHQ==; fpk2=7675d59b5e84e0a878ee6f0a97f9056f; passport_csrf_token=2e630699d69ead94d5384bc090f9a123; passport_csrf_token_default=2e630699d69ead94d5384bc090f9a123; bd_ticket_guard_client_web_domain=2; is_staff_user=false; UIFID=63bdc4b4b456901f349a081bfd3a24da10a1c6623f0a2d5eadd83f51c9f4d112bbcbeb4a6e97afffe0093f599fa4730d4fdfd272979c31928f4a75551b4c86b4cd5d1d3cb92b558677fb825163f6b6cdb453348055af1b7fc00d5d5bbfb1659451776541e497f0d057f22afd521117b34a93c5cd8652e49dc263ed74360f5f94332ed040bd0ca6ecb22c8402153dfe16e836acb05477f099bddddf19c231d073; SelfTabRedDotControl=%5B%5D; _bd_ticket_crypt_doamin=2; __security_server_data_status=1; store-region=cn-cq; store-region-src=uid; my_rd=2; passport_mfa_token=CjdI9QjArm5HgmxgbBx1nrbYfFbP90pbHve7PyVJWeW1MvoAHy%2FnxBsrX%2Fm4sk1v8n9MF6Oj4VjtGkoKPA%2B48e3YaTQvLxI7ofCCK%2BR29d%2B%2BEIWv5xSZbbU%2BUW%2BZ%2FyWC7wNijRxkvmAtj3EtAEXYjUpTsJFcSEa5tRCRwd8NGPax0WwgAiIBA0wSs0E%3D; d_ticket=7ef1e792b5058222c13e95c647acec8eaf28e; passport_assist_user=CkFvdOe-430jLTqRXlsWg1Ho0sxMOg0Eu5nCsuo-03X7nA1psyrEMGst9bScPHAMnTooYzRn7UKaaXukAalwiw9maxpKCjxS1xD_MTq8tNKxNpL9-_4FHcZyyhNcJMevragMwZfj3XviKUGYHdoilC7OMH4g6-J_WKXkeUzaoaMHJzIQhMDfDRiJr9ZUIAEiAQMPOQTC; n_mh=CRGa3Hq4fzcWzlKKCemXV4BMSkA_r348LtwfzN7GRkw; sso_uid_tt=bd8b5c1a9f65559b4fbf3e1312c1fa58; sso_uid_tt_ss=bd8b5c1a9f65559b4fbf3e1312c1fa58; toutiao_sso_user=3d2c3662779018ad72997832f07ca73e; toutiao_sso_user_ss=3d2c3662779018ad72997832f07ca73e; sid_ucp_sso_v1=1.0.0-KDk3ZWExNzIyNjU2NWMzY2VjNzg3N2Y4YmM1MGQ2YmJmZTFlZjg2MGQKIQjk9-DL9My6BhD4z-K4BhjvMSAMMMKv0qsGOAZA9AdIBhoCbGYiIDNkMmMzNjYyNzc5MDE4YWQ3Mjk5NzgzMmYwN2NhNzNl; ssid_ucp_sso_v1=1.0.0-KDk3ZWExNzIyNjU2NWMzY2VjNzg3N2Y4YmM1MGQ2YmJmZTFlZjg2MGQKIQjk9-DL9My6BhD4z-K4BhjvMSAMMMKv0qsGOAZA9AdIBhoCbGYiIDNkMmMzNjYyNzc5MDE4YWQ3Mjk5NzgzMmYwN2NhNzNl; passport_auth_status=47132b70e76d6fa059dd7d7a9fb4a4de%2Cf8bf8588207eeed15a572dc99e02ec42; passport_auth_status_ss=47132b70e76d6fa059dd7d7a9fb4a4de%2Cf8bf8588207eeed15a572dc99e02ec42; uid_tt=4d07d8896036ccbbeb872df8178e22d3; uid_tt_ss=4d07d8896036ccbbeb872df8178e22d3; sid_tt=13a8593494c364c89d2abcb22e76661f; sessionid=13a8593494c364c89d2abcb22e76661f; sessionid_ss=13a8593494c364c89d2abcb22e76661f; _bd_ticket_crypt_cookie=89e9dc5ea3cfe9600905e395d4133d27; sid_guard=13a8593494c364c89d2abcb22e76661f%7C1729669118%7C5183997%7CSun%2C+22-Dec-2024+07%3A38%3A35+GMT; sid_ucp_v1=1.0.0-KDE0YjNmZWY5ZDg3MWU4NmI0Njc3MTQ0OTJiYmQxZWRhMTkxZjI4NmYKGwjk9-DL9My6BhD-z-K4BhjvMSAMOAZA9AdIBBoCbGYiIDEzYTg1OTM0OTRjMzY0Yzg5ZDJhYmNiMjJlNzY2NjFm; ssid_ucp_v1=1.0.0-KDE0YjNmZWY5ZDg3MWU4NmI0Njc3MTQ0OTJiYmQxZWRhMTkxZjI4NmYKGwjk9-DL9My6BhD-z-K4BhjvMSAMOAZA9AdIBBoCbGYiIDEzYTg1OTM0OTRjMzY0Yzg5ZDJhYmNiMjJlNzY2NjFm; SEARCH_RESULT_LIST_TYPE=%22single%22; download_guide=%223%2F20241030%2F0%22; pwa2=%220%7C0%7C3%7C0%22; WallpaperGuide=%7B%22showTime%22%3A1730279841597%2C%22closeTime%22%3A0%2C%22showCount%22%3A1%2C%22cursor1%22%3A16%2C%22cursor2%22%3A4%7D; publish_badge_show_info=%221%2C0%2C0%2C1730280531272%22; douyin.com; device_web_cpu_core=16; device_web_memory_size=8; architecture=amd64; csrf_session_id=07fdbef5832b08d48db02ab4cf95f6bd; h265ErrorNum=-1; webcast_leading_last_show_time=1730340454476; webcast_leading_total_show_times=1; volume_info=%7B%22isUserMute%22%3Afalse%2C%22isMute%22%3Afalse%2C%22volume%22%3A0.5%7D; xg_device_score=7.6233091352684825; stream_player_status_params=%22%7B%5C%22is_auto_play%5C%22%3A0%2C%5C%22is_full_screen%5C%22%3A0%2C%5C%22is_full_webscreen%5C%22%3A0%2C%5C%22is_mute%5C%22%3A0%2C%5C%22is_speed%5C%22%3A1%2C%5C%22is_visible%5C%22%3A0%7D%22; stream_recommend_feed_params=%22%7B%5C%22cookie_enabled%5C%22%3Atrue%2C%5C%22screen_width%5C%22%3A1920%2C%5C%22screen_height%5C%22%3A1080%2C%5C%22browser_online%5C%22%3Atrue%2C%5C%22cpu_core_num%5C%22%3A16%2C%5C%22device_memory%5C%22%3A8%2C%5C%22downlink%5C%22%3A10%2C%5C%22effective_type%5C%22%3A%5C%224g%5C%22%2C%5C%22round_trip_time%5C%22%3A0%7D%22; __ac_signature=_02B4Z6wo00f01Os5i9AAAIDA3B1Pjo5gWozrGY9AAF3wfe; __ac_nonce=067259e2a0084d353989d; strategyABtestKey=%221730518586.742%22; biz_trace_id=6b4d6986; IsDouyinActive=true; FOLLOW_LIVE_POINT_INFO=%22MS4wLjABAAAAbD1lkyA4-9NeY4thNBV4ko5_NMXpw6QCRlM9tL8ehng2pfgAjFicTt5-s_6KrJ_r%2F1730563200000%2F0%2F0%2F1730520079629%22; FOLLOW_NUMBER_YELLOW_POINT_INFO=%22MS4wLjABAAAAbD1lkyA4-9NeY4thNBV4ko5_NMXpw6QCRlM9tL8ehng2pfgAjFicTt5-s_6KrJ_r%2F1730563200000%2F0%2F1730519479629%2F0%22; home_can_add_dy_2_desktop=%221%22; bd_ticket_guard_client_data=eyJiZC10aWNrZXQtZ3VhcmQtdmVyc2lvbiI6MiwiYmQtdGlja2V0LWd1YXJkLWl0ZXJhdGlvbi12ZXJzaW9uIjoxLCJiZC10aWNrZXQtZ3VhcmQtcmVlLXB1YmxpYy1rZXkiOiJCRjdTTUNjR0xWVnBCdWdvVll2V0RkaWNpZFo5a2pRTGkrdDdoaHZqYTA5RXlXMFdmbHNFQkkzSjVTZ2E1Rm9nSkVzR2EyMG5aRVhiWW9wQ1ZqSkpNUFE9IiwiYmQtdGlja2V0LWd1YXJkLXdlYi12ZXJzaW9uIjoyfQ%3D%3D; passport_fe_beating_status=true; odin_tt=228550a0763e76934bdba5c9a64756f288be5ad96de86cb0cdf6a824c0c1e42d95268bf5d4c8dcce8c589d41b621448ffe2f0dfe2187807b911bf3422f1c39d5'
     douyin = DouyinVideo()
-    douyin.inits(urls, cookie)
+
+    async def compare():
+        # 对比顺序爬取与并发爬取的耗时
+        await douyin.crawl_creators(urls, cookie, concurrency=1)
+        await douyin.crawl_creators(urls, cookie)
+        await http_clients.aclose()
+
+    asyncio.run(compare())
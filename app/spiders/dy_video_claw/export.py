@@ -0,0 +1,110 @@
+import glob
+import os
+import time
+
+import pandas as pd
+
+from app.spiders.dy_video_claw.extract import MODEL_FIELDS, AwemeRecord
+
+# 判断作品是否有变化的字段
+COMPARE_FIELDS = ["name", "title", "tags", "comment_count", "share_count", "like_count", "favorite_count"]
+
+# CSV 沿用原来的中文表头
+CSV_COLUMNS = {
+    "video_id": "视频id",
+    "name": "博主",
+    "dy_user_id": "抖音用户id",
+    "video_url": "视频链接",
+    "download_url": "下载链接",
+    "title": "标题",
+    "tags": "标签",
+    "type": "类型",
+    "comment_count": "评论",
+    "share_count": "分享",
+    "like_count": "喜欢",
+    "favorite_count": "收藏",
+    "duration": "时长",
+    "publish_time": "发布时间",
+}
+
+
+class VideoExporter:
+    """
+    按博主分区导出作品数据: {output_dir}/dy_user_id={sec_user_id}/part-*.parquet
+    每次导出按 video_id 与已有数据做向量化比对, 只把新增或统计数据变化的行追加为新的 part 文件,
+    读取时同一 video_id 以最新的 part 为准, part 文件过多时合并为一个
+    CSV 写到 {csv_dir}/Douyin_{sec_user_id}.csv, csv_dir 默认为分区目录
+    """
+
+    def __init__(self, output_dir: str = "data/dy_video", max_parts: int = 32, csv_dir: str | None = None):
+        self.output_dir = output_dir
+        self.max_parts = max_parts
+        self.csv_dir = csv_dir
+
+    def partition_dir(self, sec_user_id: str) -> str:
+        return os.path.join(self.output_dir, f"dy_user_id={sec_user_id}")
+
+    def csv_path(self, sec_user_id: str) -> str:
+        return os.path.join(self.csv_dir or self.partition_dir(sec_user_id), f"Douyin_{sec_user_id}.csv")
+
+    def _parts(self, sec_user_id: str) -> list[str]:
+        return sorted(glob.glob(os.path.join(self.partition_dir(sec_user_id), "part-*.parquet")))
+
+    def load(self, sec_user_id: str) -> pd.DataFrame:
+        """读取博主当前的全部作品, 以 video_id 为索引"""
+        parts = self._parts(sec_user_id)
+        if not parts:
+            return pd.DataFrame(columns=list(MODEL_FIELDS)).set_index("video_id")
+        df = pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True)
+        return df.drop_duplicates("video_id", keep="last").set_index("video_id")
+
+    def export(self, records: list, sec_user_id: str, csv: bool = False) -> dict:
+        """导出一批 AwemeRecord, 返回 {'rows', 'changed', 'parquet', 'csv'}, csv=True 时总是返回 CSV 路径"""
+        # AwemeRecord 本身是 tuple, 直接按列构建 DataFrame
+        new_df = pd.DataFrame.from_records(records, columns=AwemeRecord._fields)[list(MODEL_FIELDS)]
+        new_df = new_df.drop_duplicates("video_id", keep="first").set_index("video_id")
+        existing = self.load(sec_user_id)
+
+        # 按 video_id 对齐后整列比较, 不存在的行全部为 NaN, 视为新增
+        old = existing.reindex(new_df.index)[COMPARE_FIELDS]
+        changed_mask = old.isna().all(axis=1) | new_df[COMPARE_FIELDS].ne(old).any(axis=1)
+        changed = new_df[changed_mask]
+
+        result = {"rows": len(new_df), "changed": len(changed), "parquet": None, "csv": None}
+        if changed.empty:
+            if csv:
+                # 没有变化且 CSV 不早于任何 part 文件时沿用, 否则(不存在或之前的导出未生成 CSV)重新生成
+                path = self.csv_path(sec_user_id)
+                fresh = os.path.exists(path) and all(
+                    os.path.getmtime(part) <= os.path.getmtime(path) for part in self._parts(sec_user_id)
+                )
+                result["csv"] = path if fresh else self._write_csv(sec_user_id, existing)
+            return result
+
+        partition_dir = self.partition_dir(sec_user_id)
+        os.makedirs(partition_dir, exist_ok=True)
+        path = os.path.join(partition_dir, f"part-{time.time_ns()}.parquet")
+        changed.reset_index().to_parquet(path, index=False)
+        result["parquet"] = path
+
+        parts = self._parts(sec_user_id)
+        if len(parts) > self.max_parts or csv:
+            merged = self.load(sec_user_id)
+            if len(parts) > self.max_parts:
+                self._compact(sec_user_id, merged, parts)
+            if csv:
+                result["csv"] = self._write_csv(sec_user_id, merged)
+        return result
+
+    def _compact(self, sec_user_id: str, merged: pd.DataFrame, parts: list[str]) -> None:
+        path = os.path.join(self.partition_dir(sec_user_id), f"part-{time.time_ns()}.parquet")
+        merged.reset_index().to_parquet(path, index=False)
+        for part in parts:
+            os.remove(part)
+
+    def _write_csv(self, sec_user_id: str, merged: pd.DataFrame) -> str:
+        path = self.csv_path(sec_user_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        merged = merged.reset_index().sort_values("publish_time", ascending=False)
+        merged[list(CSV_COLUMNS)].rename(columns=CSV_COLUMNS).to_csv(path, index=False)
+        return path
@@ -0,0 +1,81 @@
+from datetime import datetime
+from typing import NamedTuple
+
+# 下载链接拆成前后两段直接拼接, str.format 的关键字参数解析比作品其余字段的提取还慢
+DOWNLOAD_URL_PREFIX = "https://api.amemv.com/aweme/v1/play/?video_id="
+DOWNLOAD_URL_PARAMS = (
+    "&line=1&ratio=360p&media_type=4&vr_type=0&improve_bitrate=0&is_play_url=1&source=PackSourceEnum_PUBLISH"
+)
+
+# DyVideoModel 中存在的字段, is_top 只用于分页判断不入库
+MODEL_FIELDS = (
+    "video_id",
+    "name",
+    "dy_user_id",
+    "video_url",
+    "download_url",
+    "title",
+    "tags",
+    "type",
+    "comment_count",
+    "share_count",
+    "like_count",
+    "favorite_count",
+    "duration",
+    "publish_time",
+)
+
+
+class AwemeRecord(NamedTuple):
+    """单个作品的精简记录, 基于 tuple 没有实例 __dict__, 写库时可直接使用"""
+
+    video_id: int
+    name: str
+    dy_user_id: str
+    video_url: str
+    download_url: str
+    title: str
+    tags: str
+    type: str
+    comment_count: int
+    share_count: int
+    like_count: int
+    favorite_count: int
+    duration: int
+    publish_time: datetime
+    is_top: bool
+
+    def to_model(self) -> dict:
+        return {field: getattr(self, field) for field in MODEL_FIELDS}
+
+
+def extract_aweme(aweme: dict, sec_user_id: str) -> AwemeRecord:
+    """一次遍历取出作品需要的字段"""
+    video = aweme.get("video") or {}
+    statistics = aweme["statistics"]
+    duration = round(video.get("duration", 0) / 1000)
+    uri = (video.get("play_addr") or {}).get("uri")
+    title, *tags = aweme["desc"].split("#")
+    # 按字段顺序位置传参, 比关键字参数构造 tuple 更快
+    return AwemeRecord(
+        int(aweme["aweme_id"]),  # video_id
+        aweme["author"]["nickname"],  # name
+        sec_user_id,  # dy_user_id
+        aweme["share_url"],  # video_url
+        f"{DOWNLOAD_URL_PREFIX}{uri}{DOWNLOAD_URL_PARAMS}" if uri else "",  # download_url
+        # 按 DyVideoModel 的 CharField(max_length=255) 截断
+        title.strip()[:255],  # title
+        ", ".join(filter(None, map(str.strip, tags)))[:255] if tags else "",  # tags
+        "视频" if uri and duration else "图文",  # type
+        statistics["comment_count"],
+        statistics["share_count"],
+        statistics["digg_count"],  # like_count
+        statistics["collect_count"],  # favorite_count
+        duration,
+        datetime.fromtimestamp(aweme["create_time"]),  # publish_time
+        bool(aweme.get("is_top")),
+    )
+
+
+def extract_page(result: dict, sec_user_id: str) -> list[AwemeRecord]:
+    return [extract_aweme(aweme, sec_user_id) for aweme in result.get("aweme_list") or []]
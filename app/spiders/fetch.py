@@ -0,0 +1,99 @@
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+import orjson
+
+from app.core.exceptions import SpiderResponseError
+from app.spiders.cookie_pool import cookie_pool
+from app.spiders.metrics import metrics
+from app.spiders.rate_limiter import rate_limiters
+from app.spiders.retry import circuit_breakers, retry_policy, sleep_before_retry
+
+json_loads = orjson.loads
+
+# 触发验证码时响应头/响应体中出现的标记
+CAPTCHA_HEADERS = ("x-vc-bdturing-parameters", "bdturing-verify")
+CAPTCHA_MARKERS = ("verify_check", "captcha", "bdturing")
+# 说明请求过快的响应, 需要限流器降速
+THROTTLE_OUTCOMES = ("throttled", "empty", "invalid", "captcha")
+
+
+def classify_response(response: httpx.Response) -> tuple[str, Any]:
+    """
+    判断响应是否正常, 返回 (outcome, data)
+    outcome: ok / throttled(429) / empty(空响应) / invalid(非 JSON) / captcha(触发验证码)
+    """
+    if response.status_code == 429:
+        return "throttled", None
+    if any(name in response.headers for name in CAPTCHA_HEADERS):
+        return "captcha", None
+    if not response.content:
+        return "empty", None
+    try:
+        data = json_loads(response.content)
+    except ValueError:
+        if any(marker in response.text for marker in CAPTCHA_MARKERS):
+            return "captcha", None
+        return "invalid", None
+    if isinstance(data, dict) and data.get("verify_type"):
+        return "captcha", data
+    return "ok", data
+
+
+async def limited_get(
+    client: httpx.AsyncClient, url: str, cookie: str | dict | None = None, **kwargs
+) -> httpx.Response:
+    """经过共享限流器的 GET 请求, cookie 用于区分账号维度的限流"""
+    await rate_limiters.acquire(urlsplit(url).hostname, cookie)
+    return await client.get(url, **kwargs)
+
+
+async def fetch_json(client: httpx.AsyncClient, url: str, cookie: str | dict | None = None, **kwargs) -> Any:
+    """
+    请求抖音接口并解析 JSON, 响应结果反馈给限流器以自动调整速率, 并计入 cookie 池中对应账号的健康度
+    超时/连接错误/5xx/限流/空响应等按错误类型在各自的重试预算内退避重试, host 连续失败时熔断暂停
+    重试预算用尽或遇到不可重试的响应时抛出 SpiderResponseError
+    """
+    host = urlsplit(url).hostname
+    breaker = circuit_breakers.get(host)
+    attempts: dict[str, int] = {}
+    while True:
+        probe = await breaker.wait()
+        status_code = None
+        try:
+            response = await limited_get(client, url, cookie, **kwargs)
+            status_code = response.status_code
+            if response.status_code >= 500:
+                outcome, data = "server", None
+            elif 400 <= response.status_code < 500 and response.status_code != 429:
+                outcome, data = "client", None
+            else:
+                outcome, data = classify_response(response)
+        except httpx.TimeoutException:
+            outcome, data = "timeout", None
+        except httpx.TransportError:
+            outcome, data = "connect", None
+        except BaseException:
+            # 被取消等情况不计入失败, 只释放探测名额
+            breaker.release_probe(probe)
+            raise
+
+        metrics.incr("spider_request_total", host=host, outcome=outcome)
+        cookie_pool.feedback(cookie, outcome)
+        if outcome == "ok":
+            breaker.record_success(probe)
+            rate_limiters.feedback(host, cookie, True)
+            return data
+
+        if outcome == "client":
+            breaker.release_probe(probe)
+        else:
+            breaker.record_failure(probe)
+        if outcome in THROTTLE_OUTCOMES:
+            rate_limiters.feedback(host, cookie, False)
+        attempts[outcome] = attempts.get(outcome, 0) + 1
+        if not retry_policy.allows(outcome, attempts[outcome]):
+            metrics.incr("spider_request_failed_total", host=host, reason=outcome)
+            raise SpiderResponseError(outcome, url=url, status_code=status_code, attempts=sum(attempts.values()))
+        await sleep_before_retry(host, outcome, sum(attempts.values()))
@@ -0,0 +1,23 @@
+from collections import defaultdict
+
+
+class Metrics:
+    """进程内的爬虫计数器, 以 (指标名, 标签) 为 key 累加"""
+
+    def __init__(self):
+        self.counters: defaultdict[tuple, int] = defaultdict(int)
+
+    def incr(self, name: str, value: int = 1, **labels) -> None:
+        self.counters[(name, tuple(sorted(labels.items())))] += value
+
+    def get(self, name: str, **labels) -> int:
+        return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def snapshot(self) -> list[dict]:
+        return [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(self.counters.items())
+        ]
+
+
+metrics = Metrics()
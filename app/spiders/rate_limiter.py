@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import time
+
+from app.settings import settings
+
+
+class AdaptiveTokenBucket:
+    """
+    自适应令牌桶: 按 rate 个/秒补充令牌, 最多累积 burst 个
+    请求被限流(429/空响应/验证码等)时速率减半, 成功时线性回升, 速率始终在 [min_rate, max_rate] 内
+    """
+
+    def __init__(self, rate: float, burst: int, min_rate: float, max_rate: float):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.tokens = float(burst)
+        self.successes = 0
+        self.throttled = 0
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        # 持锁等待, 保证等待者按先后顺序拿到令牌
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """不等待, 令牌足够时取走 tokens 个并返回 True"""
+        self._refill()
+        if self.tokens < tokens:
+            return False
+        self.tokens -= tokens
+        return True
+
+    def on_success(self) -> None:
+        self.successes += 1
+        self.rate = min(self.max_rate, self.rate + self.max_rate * 0.02)
+
+    def on_throttle(self) -> None:
+        self.throttled += 1
+        self._refill()
+        self.rate = max(self.min_rate, self.rate / 2)
+        # 清空已累积的令牌, 避免降速后仍然突发请求
+        self.tokens = min(self.tokens, 0)
+
+    def snapshot(self) -> dict:
+        self._refill()
+        return {
+            "rate": round(self.rate, 3),
+            "tokens": round(self.tokens, 3),
+            "burst": self.burst,
+            "min_rate": self.min_rate,
+            "max_rate": self.max_rate,
+            "successes": self.successes,
+            "throttled": self.throttled,
+        }
+
+
+def parse_cookie(cookie: str) -> dict:
+    """解析 cookie 字符串为 dict (cookiesparser.parse 只能取到第一个键值对)"""
+    pairs = (pair.strip().split("=", 1) for pair in cookie.split(";"))
+    return {pair[0]: pair[1] for pair in pairs if len(pair) == 2}
+
+
+def cookie_key(cookie: str | dict | None) -> str | None:
+    """cookie 的短标识, 用作限流器的 key, 避免在内存和接口中暴露原始 cookie"""
+    if not cookie:
+        return None
+    if isinstance(cookie, str):
+        # 同一账号的 cookie 字符串和 cookie 字典得到相同的 key
+        cookie = parse_cookie(cookie)
+    normalized = "; ".join(f"{k}={v}" for k, v in sorted(cookie.items()))
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+class RateLimiterRegistry:
+    """所有抖音请求共享的限流器: 每个 host 一个令牌桶, 每个 cookie 再一个令牌桶"""
+
+    def __init__(self):
+        self.hosts: dict[str, AdaptiveTokenBucket] = {}
+        self.cookies: dict[str, AdaptiveTokenBucket] = {}
+
+    def _buckets(self, host: str, cookie: str | dict | None) -> list[AdaptiveTokenBucket]:
+        buckets = []
+        if host not in self.hosts:
+            self.hosts[host] = AdaptiveTokenBucket(
+                rate=settings.DY_RATE_LIMIT_HOST,
+                burst=settings.DY_RATE_LIMIT_BURST,
+                min_rate=settings.DY_RATE_LIMIT_MIN,
+                max_rate=settings.DY_RATE_LIMIT_HOST_MAX,
+            )
+        buckets.append(self.hosts[host])
+        key = cookie_key(cookie)
+        if key:
+            if key not in self.cookies:
+                self.cookies[key] = AdaptiveTokenBucket(
+                    rate=settings.DY_RATE_LIMIT_COOKIE,
+                    burst=settings.DY_RATE_LIMIT_BURST,
+                    min_rate=settings.DY_RATE_LIMIT_MIN,
+                    max_rate=settings.DY_RATE_LIMIT_COOKIE_MAX,
+                )
+            buckets.append(self.cookies[key])
+        return buckets
+
+    async def acquire(self, host: str, cookie: str | dict | None = None) -> None:
+        for bucket in self._buckets(host, cookie):
+            await bucket.acquire()
+
+    def feedback(self, host: str, cookie: str | dict | None, ok: bool) -> None:
+        for bucket in self._buckets(host, cookie):
+            if ok:
+                bucket.on_success()
+            else:
+                bucket.on_throttle()
+
+    def snapshot(self) -> dict:
+        return {
+            "hosts": {host: bucket.snapshot() for host, bucket in self.hosts.items()},
+            "cookies": {key: bucket.snapshot() for key, bucket in self.cookies.items()},
+        }
+
+
+rate_limiters = RateLimiterRegistry()
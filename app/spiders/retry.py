@@ -0,0 +1,112 @@
+import asyncio
+import random
+import time
+
+from app.log import logger
+from app.settings import settings
+from app.spiders.metrics import metrics
+
+
+class RetryPolicy:
+    """按错误类型分别计数的重试预算, 重试间隔为带随机抖动的指数退避"""
+
+    def __init__(self, budgets: dict[str, int], base_delay: float, max_delay: float):
+        self.budgets = budgets
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def allows(self, outcome: str, attempts: int) -> bool:
+        return attempts <= self.budgets.get(outcome, 0)
+
+    def backoff(self, attempt: int) -> float:
+        # full jitter: 在 [0, min(max_delay, base * 2^attempt)] 内随机, 避免多个协程同时重试
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    """
+    单个 host 的熔断器: 连续失败 failure_threshold 次后熔断, 熔断期间该 host 的请求全部暂停
+    reset_timeout 秒后放行一个探测请求, 成功则恢复, 失败则继续熔断
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trips = 0
+        self._probe = asyncio.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    async def wait(self) -> bool:
+        """熔断期间等待到可以发送探测请求为止, 返回当前请求是否为探测请求"""
+        while self.opened_at is not None:
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+                continue
+            if not self._probe.locked():
+                # 由当前请求作为探测请求, 结果通过 record_success/record_failure 更新状态
+                await self._probe.acquire()
+                return True
+            await asyncio.sleep(min(1.0, self.reset_timeout))
+        return False
+
+    def release_probe(self, probe: bool) -> None:
+        # 只由持有探测名额的请求释放, 熔断前已发出的请求返回时不能放行其他探测
+        if probe and self._probe.locked():
+            self._probe.release()
+
+    def record_success(self, probe: bool = False) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.release_probe(probe)
+
+    def record_failure(self, probe: bool = False) -> None:
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                self.trips += 1
+            self.opened_at = time.monotonic()
+        self.release_probe(probe)
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "failures": self.failures, "trips": self.trips}
+
+
+class CircuitBreakerRegistry:
+    def __init__(self):
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, host: str) -> CircuitBreaker:
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(
+                failure_threshold=settings.DY_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=settings.DY_BREAKER_RESET_TIMEOUT,
+            )
+        return self.breakers[host]
+
+    def snapshot(self) -> dict:
+        return {host: breaker.snapshot() for host, breaker in self.breakers.items()}
+
+
+retry_policy = RetryPolicy(
+    budgets=settings.DY_RETRY_BUDGETS,
+    base_delay=settings.DY_RETRY_BASE_DELAY,
+    max_delay=settings.DY_RETRY_MAX_DELAY,
+)
+circuit_breakers = CircuitBreakerRegistry()
+
+
+async def sleep_before_retry(host: str, outcome: str, attempt: int) -> None:
+    delay = retry_policy.backoff(attempt)
+    metrics.incr("spider_retry_total", host=host, reason=outcome)
+    logger.debug(f"retry {host} after {outcome}, attempt {attempt}, sleep {delay:.2f}s")
+    await asyncio.sleep(delay)
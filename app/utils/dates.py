@@ -0,0 +1,12 @@
+from datetime import datetime
+from typing import Optional
+
+
+def naive(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    数据库读出的时间带有 TORTOISE_ORM 配置的时区, 去掉时区后即为写入时的本地时间,
+    可以和 datetime.now()、datetime.fromtimestamp() 得到的时间直接比较
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    return value.replace(tzinfo=None)
@@ -0,0 +1,62 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI, Request, Response
+
+from app.spiders.client import http_clients
+from app.spiders.fetch import fetch_json
+
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/echo")
+    async def echo(request: Request, response: Response):
+        # 模拟抖音给当前账号下发新的会话 cookie
+        response.set_cookie("sessionid", request.query_params["account"])
+        return {"cookie": request.headers.get("cookie")}
+
+    return app
+
+
+def test_set_cookie_not_shared_between_accounts():
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(create_app()), base_url="http://t")
+        http_clients.set("cookie-test", client)
+        try:
+            a = await fetch_json(
+                http_clients.get("cookie-test"),
+                "http://t/echo",
+                cookie="uid=a",
+                headers={"cookie": "uid=a"},
+                params={"account": "a"},
+            )
+            b = await fetch_json(
+                http_clients.get("cookie-test"),
+                "http://t/echo",
+                cookie="uid=b",
+                headers={"cookie": "uid=b"},
+                params={"account": "b"},
+            )
+            # 不带 Cookie 请求头的请求(如短链跳转)也不能带上其他账号下发的 cookie
+            anonymous = await fetch_json(http_clients.get("cookie-test"), "http://t/echo", params={"account": "c"})
+            jar = dict(client.cookies)
+        finally:
+            await client.aclose()
+            http_clients.clients.pop("cookie-test", None)
+        return a, b, anonymous, jar
+
+    a, b, anonymous, jar = asyncio.run(run())
+    assert a["cookie"] == "uid=a"
+    assert b["cookie"] == "uid=b"
+    assert anonymous["cookie"] is None
+    assert jar == {}
+
+
+def test_default_client_does_not_store_cookies():
+    client = http_clients.create_client()
+    response = httpx.Response(
+        200, headers={"set-cookie": "sessionid=a; Path=/"}, request=httpx.Request("GET", "https://www.douyin.com/")
+    )
+    client.cookies.extract_cookies(response)
+    assert not client.cookies
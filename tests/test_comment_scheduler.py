@@ -0,0 +1,56 @@
+import asyncio
+
+from app.spiders.dy_comments_claw import scheduler as scheduler_module
+from app.spiders.dy_comments_claw.main import ReplyThread
+from app.spiders.dy_comments_claw.scheduler import CommentCrawlScheduler
+
+# 每页一条有回复的评论: 第一条评论的回复在翻到第二页之前就已抓完
+PAGES = {
+    "0": {"comments": [{"cid": "1", "reply_comment_total": 1, "create_time": 2}], "has_more": 1, "cursor": 1},
+    "1": {"comments": [{"cid": "2", "reply_comment_total": 1, "create_time": 1}], "has_more": 0, "cursor": 2},
+}
+REPLY_DELAY = {"1": 0.01, "2": 0.1}
+
+
+class FakeReplyPool:
+    def __init__(self, scheduler: CommentCrawlScheduler):
+        self.scheduler = scheduler
+        self.tasks = []
+
+    async def put(self, comment: dict, tag=None) -> bool:
+        self.tasks.append(asyncio.ensure_future(self._crawl(comment, tag)))
+        return True
+
+    async def _crawl(self, comment: dict, tag) -> None:
+        await asyncio.sleep(REPLY_DELAY[comment["cid"]])
+        await self.scheduler._on_thread_done(tag, ReplyThread(comment["cid"], comment["reply_comment_total"], True))
+
+
+async def fake_get_comments(client, aweme_id, builder, cursor="0"):
+    if cursor == "1":
+        await asyncio.sleep(0.05)
+    return PAGES[cursor]
+
+
+def test_waits_for_replies_enqueued_after_earlier_thread_finished(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "get_comments_async", fake_get_comments)
+    checkpoints = []
+
+    async def checkpoint(state):
+        checkpoints.append(state)
+
+    async def run():
+        scheduler = CommentCrawlScheduler("uid=1", checkpoint=checkpoint)
+        scheduler.replies = FakeReplyPool(scheduler)
+        progress = await scheduler.crawl_video("100")
+        pending = scheduler._pending_threads["100"]
+        await asyncio.gather(*scheduler.replies.tasks)
+        return progress, pending
+
+    progress, pending = asyncio.run(run())
+    assert pending == 0
+    assert progress["reply_threads"] == 2
+    final = checkpoints[-1]
+    assert final.done
+    # 完成的检查点之前已经记录了全部回复
+    assert {thread.comment_id for state in checkpoints for thread in state.threads} == {"1", "2"}
@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.exceptions import CookiePoolEmpty
+from app.settings import settings
+from app.spiders.cookie_pool import CookieAccount, CookiePool
+
+
+def make_pool(*cookies, max_concurrency=1):
+    pool = CookiePool()
+    pool.sync([CookieAccount(i, cookie, max_concurrency=max_concurrency) for i, cookie in enumerate(cookies)])
+    return pool
+
+
+def test_rotates_least_recently_used_account():
+    async def run():
+        pool = make_pool("uid=a", "uid=b", max_concurrency=2)
+        leased = []
+        for _ in range(4):
+            account = await pool.acquire()
+            leased.append(account.cookies["uid"])
+            pool.release(account)
+        return leased
+
+    assert asyncio.run(run()) == ["a", "b", "a", "b"]
+
+
+def test_captcha_puts_account_into_cooldown(monkeypatch):
+    monkeypatch.setattr(settings, "DY_COOKIE_COOLDOWN", 60)
+    pool = make_pool("uid=a", "uid=b")
+    account = pool.accounts[CookieAccount(None, "uid=a").key]
+
+    while not account.cooling():
+        pool.feedback("uid=a", "captcha")
+    assert account.health == settings.DY_COOKIE_MIN_HEALTH
+    assert 59 < account.cooldown_until - time.time() <= 60
+    # 冷却期间的失败不再扣减健康度
+    pool.feedback({"uid": "a"}, "captcha")
+    assert account.health == settings.DY_COOKIE_MIN_HEALTH
+    assert account.health_delta == pytest.approx(settings.DY_COOKIE_MIN_HEALTH - 1)
+
+    # 冷却中的账号不会被租用
+    assert asyncio.run(pool.acquire()).cookies["uid"] == "b"
+
+    # 冷却结束后再次失败立即冷却, 时长翻倍
+    account.cooldown_until = 0
+    pool.feedback("uid=a", "captcha")
+    assert 119 < account.cooldown_until - time.time() <= 120
+
+
+def test_acquire_waits_for_release_and_empty_pool_raises():
+    async def run():
+        pool = make_pool("uid=a")
+        first = await pool.acquire()
+        waiter = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0.01)
+        blocked = not waiter.done()
+        pool.release(first)
+        second = await asyncio.wait_for(waiter, 1)
+        with pytest.raises(CookiePoolEmpty):
+            await CookiePool().acquire()
+        return blocked, first is second
+
+    assert asyncio.run(run()) == (True, True)
+
+
+def test_sync_keeps_local_usage_and_unsynced_health():
+    pool = make_pool("uid=a")
+    account = next(iter(pool.accounts.values()))
+    account.in_use = 1
+    account.on_response("empty")
+    delta = account.health_delta
+
+    # 其他进程已把数据库中的健康度扣到 0.8
+    pool.sync([CookieAccount(0, "uid=a", health=0.8)])
+    synced = next(iter(pool.accounts.values()))
+    assert synced is account
+    assert synced.in_use == 1
+    assert synced.health == pytest.approx(0.8 + delta)
+
+    pool.sync([])
+    assert pool.accounts == {}
@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from tortoise import Tortoise
+
+from app.controllers.dy import dy_controller
+from app.controllers.dy_job import DyCrawlJobController
+from app.models.admin import DyCrawlJobModel
+from app.models.enums import CrawlJobStatus, CrawlJobType
+from app.settings import settings
+
+
+def run_with_db(test):
+    async def run():
+        await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["app.models"]})
+        await Tortoise.generate_schemas()
+        try:
+            return await test()
+        finally:
+            await Tortoise.close_connections()
+
+    return asyncio.run(run())
+
+
+def controller(worker_id):
+    jobs = DyCrawlJobController()
+    jobs.worker_id = worker_id
+    return jobs
+
+
+async def expire(job_id):
+    await DyCrawlJobModel.filter(id=job_id).update(lease_expires_at=datetime.now() - timedelta(seconds=1))
+
+
+def test_job_is_claimed_by_one_worker():
+    async def test():
+        first, second = controller("a"), controller("b")
+        job = await first.enqueue(CrawlJobType.VIDEO, {"urls": ["u1", "u1", "u2"]}, None)
+        claimed = await asyncio.gather(first.claim(), second.claim())
+        return job, claimed
+
+    job, claimed = run_with_db(test)
+    assert job.total == 2
+    winners = [claim for claim in claimed if claim is not None]
+    assert len(winners) == 1
+    assert winners[0].status == CrawlJobStatus.RUNNING
+    assert winners[0].attempts == 1
+    assert winners[0].lease_token
+
+
+def test_expired_lease_is_reclaimed_and_fences_the_old_holder():
+    async def test():
+        first, second = controller("a"), controller("b")
+        await first.enqueue(CrawlJobType.VIDEO, {"urls": ["u1"]}, None)
+        stale = await first.claim()
+        # 租约未过期时其他 worker 领不到
+        assert await second.claim() is None
+        await expire(stale.id)
+        fresh = await second.claim()
+        renewed = await first._update_leased(stale, progress={"stale": True})
+        return stale, fresh, renewed, await DyCrawlJobModel.get(id=stale.id)
+
+    stale, fresh, renewed, job = run_with_db(test)
+    assert fresh.worker == "b"
+    assert fresh.attempts == 2
+    assert fresh.lease_token != stale.lease_token
+    assert renewed is False
+    assert job.progress is None
+
+
+def test_job_fails_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(settings, "DY_JOB_MAX_ATTEMPTS", 2)
+
+    async def test():
+        jobs = controller("a")
+        await jobs.enqueue(CrawlJobType.VIDEO, {"urls": ["u1"]}, None)
+        for _ in range(2):
+            job = await jobs.claim()
+            await expire(job.id)
+        return await jobs.claim(), await DyCrawlJobModel.get(id=job.id)
+
+    claimed, job = run_with_db(test)
+    assert claimed is None
+    assert job.status == CrawlJobStatus.FAILED
+    assert job.lease_expires_at is None
+
+
+def test_result_is_dropped_when_lease_was_taken_over(monkeypatch):
+    first, second = controller("a"), controller("b")
+
+    async def run_video_task(urls, cookie, **kwargs):
+        # 执行期间租约过期并被其他 worker 接管
+        job = await DyCrawlJobModel.get(worker="a")
+        await expire(job.id)
+        await second.claim()
+        return [{"url": url, "count": 1, "error": None} for url in urls]
+
+    monkeypatch.setattr(dy_controller, "run_video_task", run_video_task)
+
+    async def test():
+        await first.enqueue(CrawlJobType.VIDEO, {"urls": ["u1"]}, None)
+        await first.run_job(await first.claim())
+        return await DyCrawlJobModel.get(worker="b")
+
+    job = run_with_db(test)
+    assert job.status == CrawlJobStatus.RUNNING
+    assert job.result is None
+    assert job.finished_at is None
@@ -0,0 +1,71 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.spiders import rate_limiter
+from app.spiders.rate_limiter import (
+    AdaptiveTokenBucket,
+    RateLimiterRegistry,
+    cookie_key,
+)
+
+
+def fake_clock(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(rate_limiter, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_refill_is_capped_at_burst(monkeypatch):
+    clock = fake_clock(monkeypatch)
+    bucket = AdaptiveTokenBucket(rate=2, burst=3, min_rate=0.5, max_rate=4)
+    assert all(bucket.try_acquire() for _ in range(3))
+    assert not bucket.try_acquire()
+
+    clock.now += 1
+    assert bucket.snapshot()["tokens"] == 2
+    clock.now += 60
+    assert bucket.snapshot()["tokens"] == 3
+
+
+def test_throttle_halves_rate_and_drops_tokens(monkeypatch):
+    fake_clock(monkeypatch)
+    bucket = AdaptiveTokenBucket(rate=2, burst=3, min_rate=0.5, max_rate=4)
+    bucket.on_throttle()
+    assert bucket.rate == 1
+    assert bucket.tokens == 0
+    for _ in range(5):
+        bucket.on_throttle()
+    assert bucket.rate == 0.5
+    assert bucket.throttled == 6
+
+    for _ in range(1000):
+        bucket.on_success()
+    assert bucket.rate == 4
+
+
+def test_acquire_waits_for_refill():
+    async def run():
+        bucket = AdaptiveTokenBucket(rate=50, burst=1, min_rate=1, max_rate=50)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(3):
+            await bucket.acquire()
+        return loop.time() - start
+
+    # 第一个令牌来自初始的 burst, 之后每个等待 1/50 秒
+    assert asyncio.run(run()) >= 0.035
+
+
+def test_registry_shares_cookie_bucket(monkeypatch):
+    monkeypatch.setattr(rate_limiter.settings, "DY_RATE_LIMIT_BURST", 1)
+    limiters = RateLimiterRegistry()
+    first = limiters._buckets("www.douyin.com", "a=1; b=2")
+    second = limiters._buckets("www.douyin.com", {"b": "2", "a": "1"})
+    assert first[0] is second[0]
+    assert first[1] is second[1]
+    assert list(limiters.cookies) == [cookie_key("b=2;a=1")]
+
+    limiters.feedback("www.douyin.com", "a=1; b=2", ok=False)
+    snapshot = limiters.snapshot()
+    assert snapshot["hosts"]["www.douyin.com"]["throttled"] == 1
+    assert snapshot["cookies"][cookie_key("a=1; b=2")]["throttled"] == 1
@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.spiders import retry
+from app.spiders.retry import CircuitBreaker, RetryPolicy
+
+
+def test_retry_budget_per_outcome():
+    policy = RetryPolicy(budgets={"timeout": 2, "throttled": 0}, base_delay=0.5, max_delay=4)
+    assert policy.allows("timeout", 1)
+    assert policy.allows("timeout", 2)
+    assert not policy.allows("timeout", 3)
+    assert not policy.allows("throttled", 1)
+    assert not policy.allows("unknown", 1)
+
+
+def test_backoff_is_capped():
+    policy = RetryPolicy(budgets={}, base_delay=0.5, max_delay=4)
+    for attempt in range(10):
+        assert 0 <= policy.backoff(attempt) <= min(4, 0.5 * 2**attempt)
+
+
+def test_breaker_opens_half_opens_and_closes(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(retry, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.trips == 1
+
+    clock.now += 10
+    assert breaker.state == "half_open"
+    probe = asyncio.run(breaker.wait())
+    assert probe is True
+    # 探测失败重新计时熔断, 不重复计入熔断次数
+    breaker.record_failure(probe)
+    assert breaker.state == "open"
+    assert breaker.trips == 1
+
+    clock.now += 10
+    probe = asyncio.run(breaker.wait())
+    breaker.record_success(probe)
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+    assert asyncio.run(breaker.wait()) is False
+
+
+def test_only_one_probe_while_half_open():
+    async def run():
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.02)
+        breaker.record_failure()
+        await asyncio.sleep(0.03)
+        first = await breaker.wait()
+        second = asyncio.create_task(breaker.wait())
+        await asyncio.sleep(0.01)
+        waiting = not second.done()
+        # 熔断前发出的请求成功返回时同样恢复, 等待中的请求直接放行
+        breaker.record_success(probe=False)
+        return first, waiting, await second
+
+    first, waiting, second = asyncio.run(run())
+    assert first is True
+    assert waiting
+    assert second is False
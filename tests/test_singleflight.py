@@ -0,0 +1,90 @@
+import asyncio
+
+from app.core.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    calls = []
+
+    async def fetch(notify):
+        calls.append(1)
+        notify("half")
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        flights = SingleFlight()
+        events = []
+        return await asyncio.gather(flights.do("key", fetch), flights.do("key", fetch, listener=events.append)), events
+
+    (first, second), events = asyncio.run(run())
+    assert calls == [1]
+    assert first == ("result", "new")
+    assert second == ("result", "shared")
+    assert events == ["half"]
+
+
+def test_fresh_result_within_ttl():
+    calls = []
+
+    async def fetch(notify):
+        calls.append(1)
+        return {"count": len(calls)}
+
+    async def run():
+        flights = SingleFlight(ttl=60, cacheable=lambda result: result["count"] == 1)
+        first = await flights.do("key", fetch)
+        second = await flights.do("key", fetch)
+        # reuse: 其他 key 的结果同样可用
+        third = await flights.do("other", fetch, reuse=["key"])
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first == ({"count": 1}, "new")
+    assert second == ({"count": 1}, "fresh")
+    assert third == ({"count": 1}, "fresh")
+    assert calls == [1]
+
+
+def test_uncacheable_result_is_not_reused():
+    async def fetch(notify):
+        return {"error": "boom"}
+
+    async def run():
+        flights = SingleFlight(ttl=60, cacheable=lambda result: result["error"] is None)
+        await flights.do("key", fetch)
+        return await flights.do("key", fetch)
+
+    assert asyncio.run(run())[1] == "new"
+
+
+def test_cancel_only_when_every_caller_left():
+    started = []
+
+    async def fetch(notify):
+        started.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def run():
+        flights = SingleFlight()
+        first = asyncio.ensure_future(flights.do("key", fetch))
+        second = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        # 还有调用方在等待, 不取消执行
+        result = await second
+        third = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        third.cancel()
+        await asyncio.sleep(0)
+        # 最后一个调用方离开后立即移除(执行尚未响应取消), 随后的调用重新执行而不是共享被取消的调用
+        assert third.cancelled()
+        assert flights._flights == {}
+        fourth = await flights.do("key", fetch)
+        return result, fourth
+
+    result, fourth = asyncio.run(run())
+    assert result == ("result", "shared")
+    assert fourth == ("result", "new")
+    assert len(started) == 3
@@ -0,0 +1,72 @@
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from app.spiders.dy_video_claw.export import VideoExporter
+from app.spiders.dy_video_claw.extract import AwemeRecord
+
+
+def record(video_id, like_count=0, title="title"):
+    return AwemeRecord(
+        video_id=video_id,
+        name="name",
+        dy_user_id="sec",
+        video_url=f"https://www.douyin.com/video/{video_id}",
+        download_url="",
+        title=title,
+        tags="",
+        type="视频",
+        comment_count=0,
+        share_count=0,
+        like_count=like_count,
+        favorite_count=0,
+        duration=10,
+        publish_time=datetime(2024, 1, video_id),
+        is_top=False,
+    )
+
+
+def test_only_changed_rows_are_appended(tmp_path):
+    exporter = VideoExporter(str(tmp_path))
+    first = exporter.export([record(1), record(2)], "sec")
+    assert first["changed"] == 2
+
+    unchanged = exporter.export([record(1), record(2)], "sec")
+    assert unchanged["changed"] == 0
+    assert unchanged["parquet"] is None
+
+    updated = exporter.export([record(1, like_count=5), record(2), record(3)], "sec")
+    assert updated["changed"] == 2
+    assert len(pd.read_parquet(updated["parquet"])) == 2
+
+    loaded = exporter.load("sec")
+    assert sorted(loaded.index) == [1, 2, 3]
+    assert loaded.loc[1, "like_count"] == 5
+    assert len(exporter._parts("sec")) == 2
+
+
+def test_parts_are_compacted(tmp_path):
+    exporter = VideoExporter(str(tmp_path), max_parts=2)
+    for likes in range(4):
+        exporter.export([record(1, like_count=likes), record(2)], "sec")
+    assert len(exporter._parts("sec")) <= 2
+    assert exporter.load("sec").loc[1, "like_count"] == 3
+
+
+def test_stale_csv_is_rebuilt_without_changes(tmp_path):
+    exporter = VideoExporter(str(tmp_path / "parquet"), csv_dir=str(tmp_path / "csv"))
+    path = exporter.export([record(1)], "sec", csv=True)["csv"]
+    assert path == exporter.csv_path("sec")
+
+    # 没有要求 CSV 的导出只追加 part 文件, CSV 落后于 parquet
+    exporter.export([record(1, like_count=7)], "sec")
+    os.utime(path, (0, 0))
+    result = exporter.export([record(1, like_count=7)], "sec", csv=True)
+    assert result["changed"] == 0
+    assert pd.read_csv(result["csv"])["喜欢"].tolist() == [7]
+
+    # CSV 已是最新时不重写
+    mtime = os.path.getmtime(path)
+    exporter.export([record(1, like_count=7)], "sec", csv=True)
+    assert os.path.getmtime(path) == mtime
@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime
+
+from app.controllers import dy as dy_module
+from app.controllers.dy import dy_controller
+from app.core.singleflight import SingleFlight
+from app.models.enums import CrawlMode
+
+URLS = ["https://www.douyin.com/user/good", "https://www.douyin.com/user/bad"]
+
+
+async def resolve_many(urls, concurrency=None):
+    return [{"url": url, "sec_user_id": url.rsplit("/", 1)[1]} for url in urls]
+
+
+class FakeDouyinVideo:
+    async def crawl_creator(self, url, cookies, sink=None, sec_user_id=None, on_progress=None, **kwargs):
+        # 只入队不等待写入, 写库错误在退出写入器时才抛出
+        await sink([sec_user_id])
+        return {
+            "url": url,
+            "sec_user_id": sec_user_id,
+            "pages": 1,
+            "count": 1,
+            "newest_publish_time": datetime(2024, 1, 1),
+            "newest_aweme_id": 1,
+            "error": None,
+            "elapsed": 0,
+        }
+
+
+def test_write_failure_only_fails_its_creator(monkeypatch):
+    watermarks = []
+
+    async def bulk_update_or_create(videos):
+        if videos == ["bad"]:
+            raise RuntimeError("database is down")
+
+    async def update_watermark(sec_user_id, publish_time, aweme_id):
+        watermarks.append(sec_user_id)
+
+    monkeypatch.setattr(dy_module.dy_resolver_controller, "resolve_many", resolve_many)
+    monkeypatch.setattr(dy_module, "DouyinVideo", FakeDouyinVideo)
+    monkeypatch.setattr(dy_controller, "bulk_update_or_create", bulk_update_or_create)
+    monkeypatch.setattr(dy_controller, "update_watermark", update_watermark)
+    monkeypatch.setattr(dy_controller, "creator_flights", SingleFlight())
+
+    progress = []
+    results = asyncio.run(
+        dy_controller.run_video_task(URLS, "uid=1", mode=CrawlMode.INCREMENTAL, on_progress=progress.append)
+    )
+    good, bad = results
+    assert good["error"] is None
+    assert good["count"] == 1
+    assert bad["error"] == repr(RuntimeError("database is down"))
+    assert bad["count"] == 1
+    # 写库失败的博主不推进水位线
+    assert watermarks == ["good"]
+    assert progress == [{"url": URLS[1], "pages": 1, "count": 1, "error": bad["error"], "done": True}]
@@ -0,0 +1,90 @@
+"""
+独立的爬虫 worker: 启动多个进程, 每个进程从 dycrawljob 表领取任务执行, 与 API 进程共用同一个 MySQL
+可以在多台机器上同时运行; 进程意外退出时自动重启, 它持有的任务在租约到期后由其他 worker 接管
+python worker.py --processes 4 --jobs 2
+"""
+import argparse
+import asyncio
+import multiprocessing
+import signal
+import time
+
+from app.log import logger
+
+
+async def serve(jobs: int) -> None:
+    from tortoise import Tortoise
+
+    from app.controllers.dy_cookie import dy_cookie_controller
+    from app.controllers.dy_job import dy_job_controller
+    from app.settings import settings
+    from app.spiders.client import http_clients
+    from app.spiders.dy_comments_claw.signer import signer
+
+    await Tortoise.init(config=settings.TORTOISE_ORM)
+    http_clients.get()
+    await dy_cookie_controller.start_sync()
+    await dy_job_controller.start_workers(jobs)
+    logger.info(f"crawl worker {dy_job_controller.worker_id} started with {jobs} jobs")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    # 正在执行的任务释放租约, 由其他 worker 立即接管
+    await dy_job_controller.stop_workers()
+    await dy_cookie_controller.stop_sync()
+    await http_clients.aclose()
+    await signer.aclose()
+    await Tortoise.close_connections()
+    logger.info(f"crawl worker {dy_job_controller.worker_id} stopped")
+
+
+def run_process(jobs: int) -> None:
+    asyncio.run(serve(jobs))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count(), help="worker 进程数")
+    parser.add_argument("--jobs", type=int, default=None, help="每个进程同时执行的任务数, 默认 DY_JOB_WORKERS")
+    args = parser.parse_args()
+    if args.jobs is None:
+        from app.settings import settings
+
+        args.jobs = settings.DY_JOB_WORKERS or 1
+
+    context = multiprocessing.get_context("spawn")
+    stopping = False
+
+    def start():
+        process = context.Process(target=run_process, args=(args.jobs,))
+        process.start()
+        return process
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    processes = [start() for _ in range(args.processes)]
+    while not stopping:
+        for i, process in enumerate(processes):
+            if not process.is_alive():
+                logger.warning(f"crawl worker process {process.pid} exited with {process.exitcode}, restarting")
+                processes[i] = start()
+        time.sleep(1)
+
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()